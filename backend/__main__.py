@@ -0,0 +1,33 @@
+import argparse
+import os
+
+from dotenv import load_dotenv
+
+# Before the imports below, which read their settings from the environment
+load_dotenv()
+
+from backend.core.logging_config import setup_logging, stop_logging  # noqa: E402
+from backend.core.server import default_workers, serve  # noqa: E402
+
+# Runs the API.
+#
+#   python -m backend                      # one worker per CPU, port 8000
+#   python -m backend --workers 2 --port 8080
+#   python -m backend --reload             # development
+#
+# `kill -HUP <pid>` restarts the workers one by one, picking up new code
+# without dropping requests.
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Qandoon API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: WEB_CONCURRENCY or one per CPU)")
+    parser.add_argument("--reload", action="store_true", help="Restart on code changes (development only)")
+    args = parser.parse_args()
+
+    setup_logging()
+    try:
+        serve(args.host, args.port, args.workers or default_workers(), args.reload)
+    finally:
+        stop_logging()
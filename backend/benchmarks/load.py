@@ -0,0 +1,292 @@
+"""
+Reproducible load test for the API.
+
+Boots `backend.main:app` in process against local stand-ins (a temporary
+SQLite database, fakeredis and a stub email transport), drives a weighted
+mix of login, catalog browse, order create and admin accept traffic, and
+reports p50/p95/p99 latency and throughput per operation.
+
+    python -m backend.benchmarks.load --requests 2000 --concurrency 16 -o after.json
+    python -m backend.benchmarks.load --baseline before.json
+
+With --baseline the run is compared against an earlier result file and the
+command exits with status 1 if any operation regressed beyond --tolerance.
+Pass --database-url to run against a real Postgres instead of SQLite.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List
+
+USER_PASSWORD = "Bench-pass-123"
+
+# Share of each operation in the traffic mix
+DEFAULT_MIX = {
+    "login": 0.05,
+    "browse_catalog": 0.45,
+    "view_pastry": 0.25,
+    "create_order": 0.15,
+    "accept_order": 0.10,
+}
+
+
+def configure_environment(database_url: str):
+    """
+    Must run before anything under `backend` is imported, because the
+    modules read their configuration at import time.
+    """
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+    os.environ.setdefault("JWT_ALGORITHM", "HS256")
+    os.environ.setdefault("JWT_EXPIRE_DAY", "1")
+    os.environ.pop("REDIS_URL", None)
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("ACCESS_LOG_SAMPLE_RATE", "0")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+
+
+def seed(users: int, pastries: int):
+    from backend.core.security import hash_password
+    from backend.database.config import SessionLocal
+    from backend.models.pastry import Pastry
+    from backend.models.user import User
+
+    db = SessionLocal()
+    try:
+        # One bcrypt hash shared by every seeded user keeps seeding fast
+        hashed = hash_password(USER_PASSWORD)
+        admin = User(email="admin@qandoon-bench.com", name="Admin", password=hashed, is_verified=True, is_admin=True)
+        db.add(admin)
+        db.add_all(
+            User(email=f"user{i}@qandoon-bench.com", name=f"User {i}", password=hashed, is_verified=True)
+            for i in range(users)
+        )
+        db.add_all(
+            Pastry(
+                name=f"Pastry {i}", description=f"Benchmark pastry number {i}",
+                image_url=f"uploads/pastries/{i}.jpg", price=1 + i % 50, stock=1_000_000_000,
+            )
+            for i in range(pastries)
+        )
+        db.commit()
+        user_ids = [user_id for (user_id,) in db.query(User.id).filter(User.is_admin == False).all()]  # noqa: E712
+        pastry_ids = [pastry_id for (pastry_id,) in db.query(Pastry.id).all()]
+        return admin.id, user_ids, pastry_ids
+    finally:
+        db.close()
+
+
+class Workload:
+    def __init__(self, client, admin_id: int, user_ids: List[int], pastry_ids: List[int], seed_value: int):
+        from backend.core.security import create_access_token
+
+        self.client = client
+        self.random = random.Random(seed_value)
+        self.pastry_ids = pastry_ids
+        self.user_headers = [
+            {"Authorization": f"Bearer {create_access_token({'sub': f'user{i}@qandoon-bench.com', 'role': 'user', 'user_id': user_id})}"}
+            for i, user_id in enumerate(user_ids)
+        ]
+        self.admin_headers = {
+            "Authorization": f"Bearer {create_access_token({'sub': 'admin@qandoon-bench.com', 'role': 'admin', 'user_id': admin_id})}"
+        }
+        self.pending_orders: List[int] = []
+
+    async def login(self):
+        i = self.random.randrange(len(self.user_headers))
+        return await self.client.post("/users/login", json={"email": f"user{i}@qandoon-bench.com", "password": USER_PASSWORD})
+
+    async def browse_catalog(self):
+        skip = self.random.randrange(max(1, len(self.pastry_ids) - 20))
+        return await self.client.get("/pastries/", params={"skip": skip, "limit": 20})
+
+    async def view_pastry(self):
+        return await self.client.get(f"/pastries/{self.random.choice(self.pastry_ids)}")
+
+    async def create_order(self):
+        items = [
+            {"pastry_id": pastry_id, "quantity": self.random.randint(1, 3)}
+            for pastry_id in self.random.sample(self.pastry_ids, k=min(3, len(self.pastry_ids)))
+        ]
+        response = await self.client.post(
+            "/order/new",
+            headers=self.random.choice(self.user_headers),
+            json={"address": "Benchmark St. 1", "phone_number": "09120000000", "items": items},
+        )
+        if response.status_code == 200:
+            self.pending_orders.append(response.json()["id"])
+        return response
+
+    async def accept_order(self):
+        if not self.pending_orders:
+            return await self.create_order()
+        order_id = self.pending_orders.pop(0)
+        return await self.client.patch(
+            f"/order/orders/{order_id}", headers=self.admin_headers, json={"status": "accepted"}
+        )
+
+
+async def run_load(args) -> dict:
+    import fakeredis
+    import httpx
+    import resend
+
+    from backend.core.metrics import instrument_redis
+    from backend.main import app
+
+    # Stub email transport: no network calls while benchmarking
+    resend.Emails.send = staticmethod(lambda params: {"id": "benchmark"})
+
+    async with app.router.lifespan_context(app):
+        app.state.redis = instrument_redis(fakeredis.aioredis.FakeRedis(decode_responses=True))
+        admin_id, user_ids, pastry_ids = seed(args.users, args.pastries)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            workload = Workload(client, admin_id, user_ids, pastry_ids, args.seed)
+            operations = list(DEFAULT_MIX)
+            weights = [DEFAULT_MIX[name] for name in operations]
+            schedule = workload.random.choices(operations, weights=weights, k=args.requests + args.warmup)
+
+            latencies: Dict[str, List[float]] = defaultdict(list)
+            errors: Dict[str, int] = defaultdict(int)
+            position = 0
+
+            async def worker(record: bool, stop: int):
+                nonlocal position
+                while position < stop:
+                    operation = schedule[position]
+                    position += 1
+                    started = time.perf_counter()
+                    response = await getattr(workload, operation)()
+                    elapsed = time.perf_counter() - started
+                    if record:
+                        latencies[operation].append(elapsed)
+                        if response.status_code >= 400:
+                            errors[operation] += 1
+
+            # Warm-up requests fill caches and connection pools and are not recorded
+            await asyncio.gather(*(worker(False, args.warmup) for _ in range(args.concurrency)))
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(True, len(schedule)) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": args.database_url.split(":", 1)[0],
+        },
+        "config": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "pastries": args.pastries,
+            "seed": args.seed,
+            "mix": DEFAULT_MIX,
+        },
+        "duration_s": round(elapsed, 3),
+        "overall": summarize(all_latencies, sum(errors.values()), elapsed),
+        "operations": {
+            operation: summarize(latencies[operation], errors[operation], elapsed)
+            for operation in operations if latencies[operation]
+        },
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Returns a description of every operation whose p95 latency grew, or whose
+    throughput dropped, by more than `tolerance` (a fraction) against the baseline.
+    """
+    regressions = []
+    sections = {"overall": (result["overall"], baseline.get("overall"))}
+    for operation, stats in result["operations"].items():
+        sections[operation] = (stats, baseline.get("operations", {}).get(operation))
+    for name, (current, previous) in sections.items():
+        if not previous:
+            continue
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if name == "overall" and current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} req/s")
+    return regressions
+
+
+def print_report(result: dict):
+    print(f"{'operation':<16}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    rows = [*result["operations"].items(), ("overall", result["overall"])]
+    for name, stats in rows:
+        print(
+            f"{name:<16}{stats['requests']:>10}{stats['errors']:>8}{stats['throughput_rps']:>10}"
+            f"{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the API against local stand-ins")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--pastries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--database-url", help="Defaults to a fresh SQLite file in a temporary directory")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed regression, as a fraction (default 0.10)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        args.database_url = args.database_url or f"sqlite:///{workdir}/bench.db"
+        configure_environment(args.database_url)
+        result = asyncio.run(run_load(args))
+
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(result, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Cold-start benchmark for the API.
+
+Measures, in fresh interpreters, how long `import backend.main` takes and how
+long `python -m backend` needs from spawn until GET /ready answers 200
+(schema check and catalog warm-up included). Runs against a temporary SQLite
+database without Redis, like the load test.
+
+    python -m backend.benchmarks.startup --runs 5 -o before.json
+    python -m backend.benchmarks.startup --baseline before.json
+
+Also lists the modules with the highest import time (from `python -X
+importtime`). With --baseline it exits with status 1 if the median import or
+ready time regressed beyond --tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+from backend.benchmarks.load import configure_environment
+
+READY_TIMEOUT_SECONDS = 60
+
+
+def _import_times(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """
+    Parses `-X importtime` output into {module: (self us, cumulative us)}.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        times[module.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure_import(env: dict) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return elapsed_ms, _import_times(completed.stderr)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure_ready(env: dict) -> float:
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "backend", "--host", "127.0.0.1", "--port", str(port), "--workers", "1"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < READY_TIMEOUT_SECONDS:
+            if server.poll() is not None:
+                raise RuntimeError(f"Server exited with status {server.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.01)
+        raise RuntimeError("Server did not become ready in time")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "median_ms": round(statistics.median(values), 1),
+        "min_ms": round(min(values), 1),
+        "max_ms": round(max(values), 1),
+    }
+
+
+def run(args) -> dict:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    # One untimed import so every run reads the same (warm) bytecode cache
+    measure_import(env)
+    import_ms, ready_ms, modules = [], [], {}
+    for _ in range(args.runs):
+        elapsed, modules = measure_import(env)
+        import_ms.append(elapsed)
+        ready_ms.append(measure_ready(env))
+
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    return {
+        "meta": {
+            "runs": args.runs,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        "import": summarize(import_ms),
+        "ready": summarize(ready_ms),
+        "import_backend_main_us": modules.get("backend.main", (0, 0))[1],
+        "slowest_imports": [
+            {"module": module, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cumulative_us / 1000, 1)}
+            for module, (self_us, cumulative_us) in slowest
+        ],
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    regressions = []
+    for name in ("import", "ready"):
+        previous, current = baseline.get(name, {}).get("median_ms"), result[name]["median_ms"]
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"{name}: median {previous}ms -> {current}ms")
+    return regressions
+
+
+def print_report(result: dict):
+    print(f"{'phase':<10}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for name in ("import", "ready"):
+        stats = result[name]
+        print(f"{name:<10}{stats['median_ms']:>12}{stats['min_ms']:>10}{stats['max_ms']:>10}")
+    print(f"\n{'slowest imports (self)':<50}{'self ms':>10}{'cumul. ms':>12}")
+    for entry in result["slowest_imports"]:
+        print(f"{entry['module']:<50}{entry['self_ms']:>10}{entry['cumulative_ms']:>12}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import and startup time of the API")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="How many of the slowest imports to list")
+    parser.add_argument("-o", "--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed regression, as a fraction (default 0.15)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        configure_environment(f"sqlite:///{workdir}/startup.db")
+        result = run(args)
+
+    print_report(result)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(result, output, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(result, json.load(baseline_file), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import logging
+import os
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional, Set
+
+access_logger = logging.getLogger("backend.access")
+
+# Successful requests are high volume, so only this fraction is logged.
+# Errors are always logged.
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", 0.1))
+# Incoming X-Request-ID values are reused only when they look sane
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+@dataclass
+class RequestContext:
+    """
+    Per-request bookkeeping shared by the middlewares and the database/Redis
+    instrumentation. It is mutable so updates made in threadpool workers
+    (which run on a copy of the context) are still visible to the request.
+    """
+    method: str = ""
+    path: str = ""
+    request_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    db_queries: int = 0
+    db_time: float = 0.0
+    redis_commands: int = 0
+    # How often each SQL statement ran, for N+1 detection
+    statements: Counter = field(default_factory=Counter)
+    flagged_statements: Set[str] = field(default_factory=set)
+
+
+current_request: ContextVar[Optional[RequestContext]] = ContextVar("current_request", default=None)
+
+
+class RequestContextMiddleware:
+    """
+    Starts a RequestContext for every HTTP request, echoes its id in the
+    X-Request-ID response header and writes a (sampled) access log line.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request = RequestContext(method=scope["method"], path=scope["path"])
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(incoming):
+                    request.request_id = incoming
+                break
+        token = current_request.set(request)
+        response_status = 500
+
+        async def send_with_request_id(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-request-id", request.request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            if response_status >= 400 or random.random() < ACCESS_LOG_SAMPLE_RATE:
+                access_logger.info(
+                    "%s %s %d", request.method, request.path, response_status,
+                    extra={
+                        "status": response_status,
+                        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                        "db_queries": request.db_queries,
+                        "redis_commands": request.redis_commands,
+                    },
+                )
+            current_request.reset(token)
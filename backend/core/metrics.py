@@ -0,0 +1,128 @@
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from backend.core.context import RequestContext, current_request
+# Registers the SQLAlchemy hooks that fill RequestContext.db_queries/db_time
+import backend.database.profiler  # noqa: F401
+
+# With several uvicorn workers every process writes its samples to files in
+# PROMETHEUS_MULTIPROC_DIR and /metrics merges them. The directory must be
+# set before prometheus_client is imported and emptied before the workers start.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+# Time spent in the middleware's own bookkeeping must stay below this budget
+METRICS_OVERHEAD_BUDGET_SECONDS = float(os.getenv("METRICS_OVERHEAD_BUDGET_SECONDS", 0.0005))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS = Counter("http_requests_total", "Requests by route and status code", ["method", "route", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served", multiprocess_mode="livesum")
+DB_QUERIES = Histogram("db_queries_per_request", "SQL statements per request", ["route"], buckets=COUNT_BUCKETS)
+DB_TIME = Histogram(
+    "db_time_per_request_seconds", "Time spent in SQL statements per request",
+    ["route"], buckets=LATENCY_BUCKETS,
+)
+REDIS_COMMANDS = Counter("redis_commands_total", "Redis commands sent", ["command"])
+REDIS_COMMANDS_PER_REQUEST = Histogram(
+    "redis_commands_per_request", "Redis commands per request", ["route"], buckets=COUNT_BUCKETS,
+)
+OVERHEAD = Histogram(
+    "metrics_overhead_seconds", "Time spent recording request metrics",
+    buckets=(0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025),
+)
+OVERHEAD_EXCEEDED = Counter("metrics_overhead_budget_exceeded_total", "Requests whose metrics overhead exceeded the budget")
+
+
+def instrument_redis(redis_client):
+    """
+    Counts every command sent through `redis_client` (pipelines excluded).
+    """
+    execute_command = redis_client.execute_command
+
+    async def counted_execute_command(*args, **options):
+        REDIS_COMMANDS.labels(command=str(args[0]).upper()).inc()
+        request = current_request.get()
+        if request is not None:
+            request.redis_commands += 1
+        return await execute_command(*args, **options)
+
+    redis_client.execute_command = counted_execute_command
+    return redis_client
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status code, in-flight count and the per-request SQL and
+    Redis usage collected in `RequestContext`. Plain ASGI, so it adds no
+    extra task or body buffering per request.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request = current_request.get()
+        token = None
+        if request is None:
+            request = RequestContext(method=scope["method"], path=scope["path"])
+            token = current_request.set(request)
+        response_status = 500
+
+        async def send_with_status(message):
+            nonlocal response_status
+            if message["type"] == "http.response.start":
+                response_status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        overhead = time.perf_counter() - started
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            finished = time.perf_counter()
+            # Label by route template, not raw path, to keep cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route).observe(finished - started)
+            REQUESTS.labels(scope["method"], route, str(response_status)).inc()
+            DB_QUERIES.labels(route).observe(request.db_queries)
+            DB_TIME.labels(route).observe(request.db_time)
+            REDIS_COMMANDS_PER_REQUEST.labels(route).observe(request.redis_commands)
+            IN_FLIGHT.dec()
+            if token is not None:
+                current_request.reset(token)
+
+            overhead += time.perf_counter() - finished
+            OVERHEAD.observe(overhead)
+            if overhead > METRICS_OVERHEAD_BUDGET_SECONDS:
+                OVERHEAD_EXCEEDED.inc()
+
+
+def render_metrics():
+    """
+    Returns (body, content type) in the Prometheus text format.
+    """
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    # Drops this worker's live gauge samples when it exits
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import uuid
+from pathlib import Path
+
+from backend.core.security import verify_access_token
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pyinstrument import Profiler
+    from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+except ImportError:  # profiling is optional
+    Profiler = None
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", "profiles"))
+# Fraction of all requests to profile regardless of the header (0 disables sampling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", 0.001))
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "speedscope")  # or "html"
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 200))
+PROFILE_HEADER = b"x-profile"
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_EXTENSIONS = {"speedscope": ".speedscope.json", "html": ".html"}
+
+
+def profiling_available() -> bool:
+    return Profiler is not None
+
+
+def profile_path(profile_id: str) -> Path:
+    return PROFILE_DIR / f"{profile_id}{_EXTENSIONS.get(PROFILE_FORMAT, '.speedscope.json')}"
+
+
+def _is_admin(headers) -> bool:
+    for name, value in headers:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() != "bearer":
+                return False
+            payload = verify_access_token(token)
+            return payload is not None and payload.get("role") == "admin"
+    return False
+
+
+def _write_profile(profiler, path: Path):
+    renderer = HTMLRenderer() if PROFILE_FORMAT == "html" else SpeedscopeRenderer()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(profiler.output(renderer))
+
+    # Keep the directory bounded, dropping the oldest profiles first
+    profiles = sorted(path.parent.glob("*"), key=lambda p: p.stat().st_mtime)
+    for old in profiles[:-PROFILE_MAX_FILES]:
+        old.unlink(missing_ok=True)
+
+
+class ProfilingMiddleware:
+    """
+    Runs a statistical profiler around a request when an admin sends
+    `X-Profile: 1`, or for a PROFILE_SAMPLE_RATE fraction of requests. The
+    profile is written under PROFILE_DIR and its id is returned in the
+    X-Profile-Id header (download it from GET /profiles/{id}).
+
+    Requests that do not trigger profiling only pay for a header lookup.
+    One request per worker is profiled at a time; others run unprofiled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.busy = False
+
+    def _should_profile(self, scope) -> bool:
+        if self.busy:
+            return False
+        headers = scope["headers"]
+        for name, value in headers:
+            if name == PROFILE_HEADER:
+                return value == b"1" and _is_admin(headers)
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        self.busy = True
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            self.busy = False
+            try:
+                await asyncio.to_thread(_write_profile, profiler, profile_path(profile_id))
+                logger.info("Request profiled", extra={"profile_id": profile_id, "path": scope["path"]})
+            except Exception:
+                logger.exception("Failed to write profile")
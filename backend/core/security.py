@@ -6,11 +6,15 @@ from fastapi.security import OAuth2PasswordBearer
 from passlib.context import CryptContext
 import os
 import secrets
+import uuid
+
+from backend.core.tokens import revocation_list
 
 # Configuration
 SECRET_KEY = os.getenv("JWT_SECRET")
 ALGORITHM = os.getenv("JWT_ALGORITHM")
-ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_EXPIRE_DAY"))
+# Access tokens are short-lived; JWT_EXPIRE_DAY now sets the refresh token lifetime
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_EXPIRE_MINUTES", "15"))
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
@@ -21,34 +25,55 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(days=ACCESS_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # jti identifies the token for revocation
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> Optional[dict]:
+    """
+    Returns the token's claims, or None if it is invalid or expired.
+    """
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+def verify_access_token(token: str) -> Optional[dict]:
+    """
+    Returns the token's claims, or None if it is invalid, expired or revoked.
+    Use this, not decode_access_token, wherever a token grants access.
+    """
+    payload = decode_access_token(token)
+    if payload is None or revocation_list.is_revoked(payload.get("jti")):
+        return None
+    return payload
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        role: str = payload.get("role")
-        user_id: str = payload.get("user_id")
-        if email is None:
-            raise credentials_exception
-        if role is None:
-            raise credentials_exception
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    payload = verify_access_token(token)
+    if payload is None:
+        raise credentials_exception
+    email: str = payload.get("sub")
+    role: str = payload.get("role")
+    user_id: str = payload.get("user_id")
+    if email is None:
+        raise credentials_exception
+    if role is None:
+        raise credentials_exception
+    if user_id is None:
         raise credentials_exception
     return {
         "email": email,
         "role": role,
-        "user_id": user_id
+        "user_id": user_id,
+        "jti": payload.get("jti"),
+        "exp": payload.get("exp")
     }
 
 def hash_password(password: str) -> str:
@@ -0,0 +1,163 @@
+"""
+Production HTTP server settings, used by `python -m backend`.
+
+Workers run under a supervisor that restarts them one at a time on SIGHUP.
+Each replacement is started first, and the old worker is only asked to stop
+once the replacement reports ready (app started and catalog warmed up), so
+no slot is empty during a cold start. The old worker then finishes its
+in-flight requests (up to GRACEFUL_TIMEOUT_SECONDS) while the new one serves
+from the shared listening socket.
+"""
+import importlib.util
+import logging
+import multiprocessing
+import os
+import shutil
+from typing import Optional
+
+import uvicorn
+from uvicorn.supervisors import ChangeReload
+from uvicorn.supervisors.multiprocess import Multiprocess, Process
+
+logger = logging.getLogger(__name__)
+
+APP = "backend.main:app"
+# Longer than the idle timeout of common load balancers (60s), so they never
+# reuse a connection the server has just closed
+KEEP_ALIVE_SECONDS = int(os.getenv("KEEP_ALIVE_SECONDS", "75"))
+BACKLOG = int(os.getenv("BACKLOG", "2048"))
+GRACEFUL_TIMEOUT_SECONDS = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", "30"))
+# How long a rolling restart waits for a replacement before stopping the old worker anyway
+WORKER_READY_TIMEOUT_SECONDS = int(os.getenv("WORKER_READY_TIMEOUT_SECONDS", "60"))
+
+# Set in workers started by RollingMultiprocess; see notify_ready
+_ready_event = None
+
+
+def available_cpus() -> int:
+    # Honors CPU affinity (e.g. taskset, some container runtimes) where supported
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def default_workers() -> int:
+    """
+    WEB_CONCURRENCY when set, else one worker per CPU. The app is async, so
+    more processes than cores only add memory and context switches.
+    """
+    return int(os.getenv("WEB_CONCURRENCY") or available_cpus())
+
+
+def event_loop() -> str:
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def http_protocol() -> str:
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def server_config(host: str, port: int, workers: int, reload: bool = False) -> uvicorn.Config:
+    return uvicorn.Config(
+        APP,
+        host=host,
+        port=port,
+        workers=workers,
+        loop=event_loop(),
+        http=http_protocol(),
+        backlog=BACKLOG,
+        timeout_keep_alive=KEEP_ALIVE_SECONDS,
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT_SECONDS,
+        reload=reload,
+        reload_dirs=["backend"] if reload else None,
+        # Logging is set up by backend.core.logging_config; requests are logged
+        # by RequestContextMiddleware
+        log_config=None,
+        access_log=False,
+        proxy_headers=True,
+        forwarded_allow_ips=os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1"),
+    )
+
+
+def notify_ready():
+    """
+    Called by the app once it can serve traffic. Tells the supervisor that a
+    restarting worker's replacement is up; a no-op outside `serve`.
+    """
+    if _ready_event is not None:
+        _ready_event.set()
+
+
+class ReadyProcess(Process):
+    """
+    A worker process that can report readiness to the supervisor.
+    """
+
+    def __init__(self, config, target, sockets):
+        # Workers are spawned, so the event must come from the spawn context
+        self.ready = multiprocessing.get_context("spawn").Event()
+        super().__init__(config, target, sockets)
+
+    def target(self, sockets=None):
+        global _ready_event
+        _ready_event = self.ready
+        return super().target(sockets)
+
+    def wait_ready(self, timeout: float) -> Optional[bool]:
+        """
+        True once ready, False if the process exited first, None on timeout.
+        """
+        waited = 0.0
+        while waited < timeout:
+            if self.ready.wait(0.1):
+                return True
+            if not self.process.is_alive():
+                return False
+            waited += 0.1
+        return None
+
+
+class RollingMultiprocess(Multiprocess):
+    def restart_all(self) -> None:
+        for idx, old in enumerate(self.processes):
+            replacement = ReadyProcess(self.config, self.target, self.sockets)
+            replacement.start()
+            ready = replacement.wait_ready(WORKER_READY_TIMEOUT_SECONDS)
+            if ready is False:
+                # Keep serving with the old code rather than lose the slot
+                logger.error("Replacement worker exited before it was ready; keeping the old one", extra={"pid": old.pid})
+                replacement.join()
+                continue
+            if ready is None:
+                logger.warning("Replacement worker not ready in time; replacing the old one anyway", extra={"pid": old.pid})
+            self.processes[idx] = replacement
+            old.terminate()
+            old.join()
+
+
+def reset_metrics_dir():
+    """
+    Prometheus multiprocess files from a previous run would be summed into
+    this run's metrics.
+    """
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def serve(host: str, port: int, workers: int, reload: bool = False):
+    """
+    Runs the server until SIGINT/SIGTERM. With `reload` (development) a
+    single worker is restarted whenever a file under backend/ changes.
+    """
+    config = server_config(host, port, 1 if reload else workers, reload)
+    logger.info("Starting server", extra={
+        "host": host, "port": port, "workers": config.workers,
+        "loop": config.loop, "http": config.http, "reload": reload,
+    })
+    reset_metrics_dir()
+    server = uvicorn.Server(config)
+    sock = config.bind_socket()
+    supervisor = ChangeReload if reload else RollingMultiprocess
+    supervisor(config, target=server.run, sockets=[sock]).run()
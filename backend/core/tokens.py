@@ -0,0 +1,170 @@
+"""
+Refresh tokens and access-token revocation.
+
+Refresh tokens are opaque random strings. Only their SHA-256 is stored, under
+`refresh:{hash}` for REFRESH_TOKEN_EXPIRE_DAYS. Each use rotates the token:
+the old one is marked used and a new one is issued in the same family. If a
+used token is presented again, it was copied. The family's live token is then
+dropped, which signs out both the thief and the owner.
+
+Revoked access tokens are tracked by `jti` in the `auth:revoked` sorted set,
+scored by the token's expiry. Every change is also published on
+`auth:revocations`, and each worker mirrors the set in memory. So
+`get_current_user` checks revocation without any network I/O. Access tokens
+are short-lived, so the set stays small and entries are dropped once they
+expire.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import secrets
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_EXPIRE_DAY"))
+REVOKED_KEY = "auth:revoked"
+REVOCATION_CHANNEL = "auth:revocations"
+
+
+def _refresh_key(token: str) -> str:
+    return f"refresh:{hashlib.sha256(token.encode()).hexdigest()}"
+
+
+def _family_key(family: str) -> str:
+    return f"refresh:family:{family}"
+
+
+@dataclass
+class RefreshGrant:
+    user_id: int
+    family: str
+
+
+async def issue_refresh_token(redis, user_id: int, family: Optional[str] = None) -> str:
+    token = secrets.token_urlsafe(32)
+    key, family = _refresh_key(token), family or uuid.uuid4().hex
+    ttl = REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(key, mapping={"user_id": user_id, "family": family})
+        pipe.expire(key, ttl)
+        pipe.set(_family_key(family), key, ex=ttl)
+        await pipe.execute()
+    return token
+
+
+async def rotate_refresh_token(redis, token: str) -> Optional[RefreshGrant]:
+    """
+    Consumes a refresh token. Returns its grant, or None when the token is
+    unknown, expired, already used or from a revoked family. The caller
+    issues the replacement with `issue_refresh_token(redis, user_id, family)`.
+    """
+    key = _refresh_key(token)
+    data = await redis.hgetall(key)
+    if not data:
+        return None
+    if not await redis.hsetnx(key, "used", 1):
+        logger.warning("Refresh token reused; revoking its family", extra={"user_id": data["user_id"]})
+        await revoke_refresh_family(redis, data["family"])
+        return None
+    # A family whose live token is another one was revoked or already rotated past this token
+    if await redis.get(_family_key(data["family"])) != key:
+        return None
+    return RefreshGrant(user_id=int(data["user_id"]), family=data["family"])
+
+
+async def revoke_refresh_token(redis, token: str):
+    data = await redis.hgetall(_refresh_key(token))
+    if data:
+        await revoke_refresh_family(redis, data["family"])
+
+
+async def revoke_refresh_family(redis, family: str):
+    live = await redis.get(_family_key(family))
+    async with redis.pipeline(transaction=True) as pipe:
+        if live:
+            pipe.delete(live)
+        pipe.delete(_family_key(family))
+        await pipe.execute()
+
+
+class RevocationList:
+    """
+    In-memory mirror of the revoked access tokens, kept in sync through
+    Redis pub/sub. Without Redis it only knows about revocations made by
+    this process.
+    """
+
+    def __init__(self):
+        self._revoked: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def add(self, jti: str, expires_at: float):
+        self._revoked[jti] = expires_at
+        # Expired tokens are rejected anyway; drop them every so often
+        if len(self._revoked) % 256 == 0:
+            now = time.time()
+            self._revoked = {j: exp for j, exp in self._revoked.items() if exp > now}
+
+    async def revoke(self, redis, jti: str, expires_at: float):
+        self.add(jti, expires_at)
+        if redis is not None:
+            async with redis.pipeline(transaction=True) as pipe:
+                pipe.zadd(REVOKED_KEY, {jti: expires_at})
+                pipe.zremrangebyscore(REVOKED_KEY, "-inf", time.time())
+                pipe.publish(REVOCATION_CHANNEL, f"{jti} {expires_at}")
+                await pipe.execute()
+
+    async def start(self, redis):
+        """
+        Loads the current list and follows new revocations in the background.
+        """
+        pubsub = redis.pubsub()
+        # Subscribe before loading, so nothing published in between is missed
+        await pubsub.subscribe(REVOCATION_CHANNEL)
+        await self.sync(redis)
+        self._task = asyncio.create_task(self._follow(redis, pubsub))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sync(self, redis):
+        for jti, expires_at in await redis.zrangebyscore(REVOKED_KEY, time.time(), "+inf", withscores=True):
+            self.add(jti, expires_at)
+
+    async def _follow(self, redis, pubsub):
+        while True:
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        jti, _, expires_at = message["data"].partition(" ")
+                        self.add(jti, float(expires_at))
+            except asyncio.CancelledError:
+                await pubsub.aclose()
+                raise
+            except Exception:
+                logger.exception("Lost the revocation channel; resubscribing")
+                await asyncio.sleep(1)
+                try:
+                    await pubsub.aclose()
+                    pubsub = redis.pubsub()
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    await self.sync(redis)
+                except Exception:
+                    logger.exception("Could not resubscribe to the revocation channel")
+
+
+revocation_list = RevocationList()
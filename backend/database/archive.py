@@ -0,0 +1,57 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from backend.models.order import ArchivedOrder, Order, OrderStatus
+
+logger = logging.getLogger(__name__)
+
+ORDER_RETENTION_DAYS = int(os.getenv("ORDER_RETENTION_DAYS", "365"))
+ARCHIVE_BATCH_SIZE = 1000
+
+# Pending orders are never archived, however old they are
+CLOSED_STATUSES = (OrderStatus.ACCEPTED, OrderStatus.REJECTED)
+ARCHIVED_COLUMNS = [
+    "id", "user_id", "address", "phone_number", "items", "total",
+    "status", "admin_message", "created_at", "updated_at", "decided_at",
+]
+
+
+def archive_orders(
+    db: Session,
+    retention_days: int = ORDER_RETENTION_DAYS,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Moves closed orders created more than `retention_days` ago into
+    orders_archive, committing after every batch so locks stay short.
+    Returns the number of orders moved.
+    """
+    cutoff = (now or datetime.now(timezone.utc)).replace(tzinfo=None) - timedelta(days=retention_days)
+    moved = 0
+    while True:
+        ids = db.scalars(
+            select(Order.id)
+            .where(Order.status.in_(CLOSED_STATUSES), Order.created_at < cutoff)
+            .order_by(Order.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not ids:
+            break
+        db.execute(
+            insert(ArchivedOrder).from_select(
+                ARCHIVED_COLUMNS,
+                select(*(getattr(Order, name) for name in ARCHIVED_COLUMNS)).where(Order.id.in_(ids)),
+            )
+        )
+        db.execute(delete(Order).where(Order.id.in_(ids)).execution_options(synchronize_session=False))
+        db.commit()
+        moved += len(ids)
+        logger.info("Archived orders", extra={"batch": len(ids), "total": moved})
+    return moved
@@ -13,10 +13,14 @@ POSTGRES_DB = os.getenv("POSTGRES_DB")
 DB_HOST = os.getenv("DB_HOST", "db")  
 DB_PORT = os.getenv("DB_PORT", "5432")
 
-DATABASE_URL = (f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{POSTGRES_DB}")
+# DATABASE_URL wins when set (docker-compose sets it; benchmarks point it at SQLite)
+DATABASE_URL = os.getenv("DATABASE_URL") or (f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{POSTGRES_DB}")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Objects stay loaded after commit, so returning them doesn't cost another SELECT.
+# Server-generated columns come back through RETURNING (eager_defaults on the models).
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 Base = declarative_base()
 
@@ -1,8 +1,13 @@
+from sqlalchemy import inspect, text
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
 from backend.models.user import User
 from backend.schemas.user import UserCreate
 from backend.core.security import hash_password, verify_password
 from fastapi import HTTPException, status
+import logging
+
+logger = logging.getLogger(__name__)
 
 def create_user(db: Session, user_data: UserCreate):
     db_user = db.query(User).filter(User.email == user_data.email).first()
@@ -21,8 +26,7 @@ def create_user(db: Session, user_data: UserCreate):
     )
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
-    print(f"Created user with ID: {new_user.id}")
+    logger.info("Created user", extra={"user_id": new_user.id})
     return new_user
 
 def login_user(db: Session, email: str, password: str):
@@ -48,10 +52,48 @@ def update_user(db: Session, user_id: int, update_data: dict):
         user.is_admin = update_data["is_admin"]
     
     db.commit()
-    db.refresh(user)
     return user
 
 
+def dialect_insert(db: Session, model):
+    """
+    Returns an INSERT for `model` that supports ON CONFLICT clauses on the
+    session's dialect (PostgreSQL in production, SQLite in tests).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def ensure_indexes(engine, metadata):
+    """
+    Creates indexes declared on tables that already existed before the index
+    was added (create_all only creates indexes together with new tables).
+    """
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+
+def ensure_columns(engine, metadata):
+    """
+    Adds nullable columns declared on tables that already existed before the
+    column was added (create_all never alters existing tables).
+    """
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=conn.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logger.info("Added missing column", extra={"table": table.name, "column": column.name})
+
+
 # end of the line
 
 
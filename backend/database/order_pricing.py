@@ -0,0 +1,60 @@
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from backend.models.order import ArchivedOrder, Order
+from backend.models.pastry import Pastry
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def price_items(items: Iterable[dict], prices: Dict[int, float]) -> Tuple[List[dict], float]:
+    """
+    Returns the items with unit_price and line_total added, and the order
+    total. Items of pastries missing from `prices` keep no price.
+    """
+    priced = []
+    total = 0.0
+    for item in items:
+        line = {"pastry_id": item["pastry_id"], "quantity": item["quantity"]}
+        price = prices.get(item["pastry_id"])
+        if price is not None:
+            line["unit_price"] = price
+            line["line_total"] = round(price * item["quantity"], 2)
+            total += line["line_total"]
+        priced.append(line)
+    return priced, round(total, 2)
+
+
+def _backfill(db: Session, model, prices: Dict[int, float], batch_size: int) -> int:
+    updated = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(model.id, model.items)
+            .where(model.total.is_(None), model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        changes = []
+        for order_id, items in rows:
+            priced, total = price_items(items, prices)
+            changes.append({"id": order_id, "items": priced, "total": total})
+        db.execute(update(model), changes)
+        db.commit()
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+def backfill_order_totals(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Prices orders stored before unit prices were snapshotted, in both the
+    orders and orders_archive tables. The original prices are not known, so
+    current catalog prices are used. Commits per batch; returns the number of
+    orders priced.
+    """
+    prices = dict(db.query(Pastry.id, Pastry.price).all())
+    return sum(_backfill(db, model, prices, batch_size) for model in (Order, ArchivedOrder))
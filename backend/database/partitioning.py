@@ -0,0 +1,105 @@
+"""
+Monthly range partitioning of the orders table on created_at (PostgreSQL only).
+
+create_all() builds `orders` as a plain table; convert_orders_to_partitioned()
+rebuilds it once as a partitioned table (see scripts/partition_orders.py).
+Afterwards ensure_order_partitions() keeps partitions created ahead of time.
+Rows outside every monthly partition land in orders_default.
+"""
+import logging
+from datetime import date, datetime, timezone
+from typing import Iterator, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_AHEAD = 3
+
+
+def _months(start: date, end: date) -> Iterator[Tuple[date, date]]:
+    """
+    Yields (first day, first day of the next month) for every month from
+    start to end, inclusive.
+    """
+    current = start.replace(day=1)
+    while current <= end:
+        following = current.replace(year=current.year + 1, month=1) if current.month == 12 else current.replace(month=current.month + 1)
+        yield current, following
+        current = following
+
+
+def _add_months(value: date, months: int) -> date:
+    month = value.month - 1 + months
+    return value.replace(year=value.year + month // 12, month=month % 12 + 1, day=1)
+
+
+def is_partitioned(conn: Connection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    kind = conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'orders' AND relkind IN ('r', 'p')")).scalar()
+    return kind == "p"
+
+
+def _create_partition(conn: Connection, table: str, start: date, end: date):
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS orders_y{start.year}m{start.month:02d} "
+        f"PARTITION OF {table} FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+
+def ensure_order_partitions(conn: Connection, months_ahead: int = PARTITIONS_AHEAD) -> int:
+    """
+    Creates the partitions for this month and the next `months_ahead` months.
+    Returns the number of months checked, or 0 when orders is not partitioned.
+    """
+    if not is_partitioned(conn):
+        return 0
+    today = datetime.now(timezone.utc).date()
+    months = list(_months(today, _add_months(today, months_ahead)))
+    for start, end in months:
+        _create_partition(conn, "orders", start, end)
+    return len(months)
+
+
+def convert_orders_to_partitioned(conn: Connection, months_ahead: int = PARTITIONS_AHEAD):
+    """
+    Rebuilds `orders` as a table partitioned by month on created_at, copying
+    every row. Runs in the caller's transaction and holds an exclusive lock on
+    orders until it commits. The primary key becomes (id, created_at), since
+    PostgreSQL requires the partition key in every unique constraint.
+    """
+    if conn.dialect.name != "postgresql":
+        raise RuntimeError("Partitioning is only supported on PostgreSQL")
+    if is_partitioned(conn):
+        logger.info("orders is already partitioned")
+        return
+
+    conn.execute(text("LOCK TABLE orders IN ACCESS EXCLUSIVE MODE"))
+    conn.execute(text("UPDATE orders SET created_at = coalesce(updated_at, now()) WHERE created_at IS NULL"))
+    conn.execute(text(
+        "CREATE TABLE orders_partitioned (LIKE orders INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (created_at)"
+    ))
+    conn.execute(text("ALTER TABLE orders_partitioned ALTER COLUMN created_at SET NOT NULL"))
+    conn.execute(text("ALTER TABLE orders_partitioned ADD PRIMARY KEY (id, created_at)"))
+    conn.execute(text("ALTER TABLE orders_partitioned ADD FOREIGN KEY (user_id) REFERENCES users (id)"))
+
+    oldest = conn.execute(text("SELECT min(created_at) FROM orders")).scalar()
+    today = datetime.now(timezone.utc).date()
+    for start, end in _months((oldest.date() if oldest else today), _add_months(today, months_ahead)):
+        _create_partition(conn, "orders_partitioned", start, end)
+    conn.execute(text("CREATE TABLE orders_default PARTITION OF orders_partitioned DEFAULT"))
+
+    conn.execute(text("INSERT INTO orders_partitioned SELECT * FROM orders"))
+    # The id sequence belongs to the old table and would be dropped with it
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence('orders', 'id')")).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY orders_partitioned.id"))
+    conn.execute(text("DROP TABLE orders"))
+    conn.execute(text("ALTER TABLE orders_partitioned RENAME TO orders"))
+    conn.execute(text("CREATE INDEX ix_orders_id ON orders (id)"))
+    conn.execute(text("CREATE INDEX ix_orders_created_at ON orders (created_at)"))
+    conn.execute(text("CREATE INDEX ix_orders_updated_at ON orders (updated_at)"))
+    logger.info("orders converted to a partitioned table")
@@ -0,0 +1,89 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.core.context import current_request
+
+logger = logging.getLogger("backend.sql")
+
+# Statements slower than this are logged with the shape of their parameters
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+# The same statement running this many times in one request is flagged as a likely N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """
+    Describes bound parameters by type only, so values (emails, password
+    hashes, addresses) never end up in the logs.
+    """
+    if executemany:
+        rows = list(parameters or [])
+        return f"{len(rows)} x {parameter_shape(rows[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return tuple(type(value).__name__ for value in parameters)
+    return type(parameters).__name__
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _profile_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    request = current_request.get()
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1fms) in %s %s: %s | params=%s",
+            elapsed * 1000,
+            request.method if request else "-",
+            request.path if request else "-",
+            statement,
+            parameter_shape(parameters, executemany),
+        )
+
+    if request is None:
+        return
+    request.db_queries += 1
+    request.db_time += elapsed
+    request.statements[statement] += 1
+    if request.statements[statement] >= N_PLUS_ONE_THRESHOLD and statement not in request.flagged_statements:
+        request.flagged_statements.add(statement)
+        logger.warning(
+            "Possible N+1 in %s %s: statement ran %d times: %s",
+            request.method, request.path, request.statements[statement], statement,
+        )
+
+
+@contextmanager
+def assert_max_queries(engine: Engine, limit: int):
+    """
+    Test helper: fails if more than `limit` statements run on `engine` inside
+    the block. Yields the list of executed statements for further checks.
+
+        with assert_max_queries(engine, 3):
+            client.get("/order/orders")
+    """
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+    if len(statements) > limit:
+        listing = "\n".join(f"  {i}. {statement}" for i, statement in enumerate(statements, start=1))
+        raise AssertionError(f"Expected at most {limit} queries, {len(statements)} ran:\n{listing}")
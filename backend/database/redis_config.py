@@ -1,5 +1,8 @@
 from fastapi import Request
 from fastapi import HTTPException, status
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def get_redis(request: Request):
@@ -9,9 +12,16 @@ def get_redis(request: Request):
     redis_client = getattr(request.app.state, 'redis', None)
 
     if redis_client is None:
-         print("Redis client not available in app.state. Check lifespan initialization.")
+         logger.error("Redis client not available in app.state. Check lifespan initialization.")
          raise HTTPException(
              status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
              detail="Redis service is not available."
          )
-    return redis_client
\ No newline at end of file
+    return redis_client
+
+def get_optional_redis(request: Request):
+    """
+    Like `get_redis`, but returns None instead of failing when Redis is not
+    available. For features that can degrade gracefully without Redis.
+    """
+    return getattr(request.app.state, 'redis', None)
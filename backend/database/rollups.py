@@ -0,0 +1,187 @@
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select, union_all
+from sqlalchemy.orm import Session
+
+from backend.database.database import dialect_insert
+from backend.models.analytics import DailySalesRollup, OrderStatusRollup, PastrySalesRollup
+from backend.models.order import ArchivedOrder, Order, OrderStatus
+from backend.models.pastry import Pastry
+
+
+def _day(value: Optional[datetime]) -> date:
+    return (value or datetime.now(timezone.utc)).date()
+
+
+def decision_time(decided_at: Optional[datetime], updated_at: Optional[datetime]) -> Optional[datetime]:
+    # Orders decided before decided_at existed fall back to their last update
+    return decided_at or updated_at
+
+
+def _increment(db: Session, model, rows: List[dict], key: str, columns: Iterable[str]):
+    """
+    Adds the given column values to the rollup rows, inserting missing rows.
+    This is a single INSERT ... ON CONFLICT DO UPDATE statement.
+    """
+    if not rows:
+        return
+    stmt = dialect_insert(db, model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={column: getattr(model, column) + stmt.excluded[column] for column in columns},
+    )
+    db.execute(stmt)
+
+
+def order_lines(db: Session, items: List[dict], prices: Optional[Dict[int, float]] = None) -> List[Tuple[int, float, float]]:
+    """
+    Returns (pastry_id, quantity, amount) for every item of an order, using
+    the line totals snapshotted on the order. Items of orders from before
+    snapshots are priced at current prices; items referencing pastries that
+    no longer exist are then skipped.
+    """
+    unpriced = [item for item in items if item.get("line_total") is None]
+    if unpriced and prices is None:
+        pastry_ids = {item["pastry_id"] for item in unpriced}
+        prices = dict(db.query(Pastry.id, Pastry.price).filter(Pastry.id.in_(pastry_ids)).all())
+    lines = []
+    for item in items:
+        if item.get("line_total") is not None:
+            lines.append((item["pastry_id"], item["quantity"], item["line_total"]))
+            continue
+        price = prices.get(item["pastry_id"])
+        if price is None:
+            continue
+        lines.append((item["pastry_id"], item["quantity"], item["quantity"] * price))
+    return lines
+
+
+def _apply_sales(db: Session, lines: List[Tuple[int, float, float]], day: date, sign: int):
+    per_pastry = defaultdict(lambda: [0.0, 0.0])
+    for pastry_id, quantity, amount in lines:
+        per_pastry[pastry_id][0] += quantity
+        per_pastry[pastry_id][1] += amount
+    _increment(
+        db, PastrySalesRollup,
+        [{"pastry_id": pid, "units_sold": sign * units, "revenue": sign * revenue}
+         for pid, (units, revenue) in per_pastry.items()],
+        "pastry_id", ("units_sold", "revenue"),
+    )
+    _increment(
+        db, DailySalesRollup,
+        [{"day": day,
+          "orders_accepted": sign,
+          "units_sold": sign * sum(units for units, _ in per_pastry.values()),
+          "revenue": sign * sum(revenue for _, revenue in per_pastry.values())}],
+        "day", ("orders_accepted", "units_sold", "revenue"),
+    )
+
+
+def record_order_created(db: Session, order: Order):
+    """
+    Counts a new order. Must be called in the same transaction as the insert.
+    """
+    _increment(db, OrderStatusRollup, [{"status": order.status or OrderStatus.PENDING, "count": 1}], "status", ("count",))
+    _increment(db, DailySalesRollup, [{"day": _day(order.created_at), "orders_created": 1}], "day", ("orders_created",))
+
+
+def record_status_change(
+    db: Session,
+    order: Order,
+    old_status: OrderStatus,
+    old_decided_at: Optional[datetime],
+    prices: Optional[Dict[int, float]] = None,
+):
+    """
+    Moves an order between status buckets and adds (or removes) its sales,
+    and stamps `order.decided_at`. Call it after setting the new status,
+    passing the order's `decision_time` from before the change.
+    An order contributes to sales while it is accepted; accept/reject counts
+    are attributed to the day the status changed, matching `rebuild_rollups`.
+    """
+    new_status = order.status
+    if new_status == old_status:
+        return
+    order.decided_at = datetime.now(timezone.utc)
+
+    _increment(
+        db, OrderStatusRollup,
+        [{"status": s, "count": delta} for s, delta in ((old_status, -1), (new_status, 1)) if s is not None],
+        "status", ("count",),
+    )
+
+    today = _day(order.decided_at)
+    old_day = _day(old_decided_at)
+    if old_status == OrderStatus.ACCEPTED:
+        _apply_sales(db, order_lines(db, order.items, prices), old_day, -1)
+    if new_status == OrderStatus.ACCEPTED:
+        _apply_sales(db, order_lines(db, order.items, prices), today, 1)
+    if old_status == OrderStatus.REJECTED:
+        _increment(db, DailySalesRollup, [{"day": old_day, "orders_rejected": -1}], "day", ("orders_rejected",))
+    if new_status == OrderStatus.REJECTED:
+        _increment(db, DailySalesRollup, [{"day": today, "orders_rejected": 1}], "day", ("orders_rejected",))
+
+
+def rebuild_rollups(db: Session, batch_size: int = 1000) -> int:
+    """
+    Recomputes every rollup table from the orders and orders_archive tables
+    and commits.
+    Orders are streamed in batches so memory stays bounded.
+    Returns the number of orders scanned.
+    """
+    prices = dict(db.query(Pastry.id, Pastry.price).all())
+    status_counts = defaultdict(int)
+    daily = defaultdict(lambda: defaultdict(float))
+    pastry_sales = defaultdict(lambda: [0.0, 0.0])
+
+    scanned = 0
+    # Archived orders still count towards the rollups
+    rows = db.execute(
+        union_all(
+            select(Order.status, Order.items, Order.created_at, Order.updated_at, Order.decided_at),
+            select(ArchivedOrder.status, ArchivedOrder.items, ArchivedOrder.created_at, ArchivedOrder.updated_at, ArchivedOrder.decided_at),
+        ).execution_options(yield_per=batch_size)
+    )
+    for order_status, items, created_at, updated_at, decided_at in rows:
+        scanned += 1
+        if order_status is None:
+            continue
+        status_counts[order_status] += 1
+        daily[_day(created_at)]["orders_created"] += 1
+        if order_status == OrderStatus.REJECTED:
+            daily[_day(decision_time(decided_at, updated_at))]["orders_rejected"] += 1
+        elif order_status == OrderStatus.ACCEPTED:
+            day = daily[_day(decision_time(decided_at, updated_at))]
+            day["orders_accepted"] += 1
+            for pastry_id, quantity, amount in order_lines(db, items, prices):
+                pastry_sales[pastry_id][0] += quantity
+                pastry_sales[pastry_id][1] += amount
+                day["units_sold"] += quantity
+                day["revenue"] += amount
+
+    db.execute(delete(OrderStatusRollup))
+    db.execute(delete(PastrySalesRollup))
+    db.execute(delete(DailySalesRollup))
+    if status_counts:
+        db.execute(insert(OrderStatusRollup), [{"status": s, "count": c} for s, c in status_counts.items()])
+    if pastry_sales:
+        db.execute(insert(PastrySalesRollup), [
+            {"pastry_id": pid, "units_sold": units, "revenue": revenue}
+            for pid, (units, revenue) in pastry_sales.items()
+        ])
+    if daily:
+        db.execute(insert(DailySalesRollup), [
+            {
+                "day": day,
+                "orders_created": int(values["orders_created"]),
+                "orders_accepted": int(values["orders_accepted"]),
+                "orders_rejected": int(values["orders_rejected"]),
+                "units_sold": values["units_sold"],
+                "revenue": values["revenue"],
+            }
+            for day, values in daily.items()
+        ])
+    db.commit()
+    return scanned
@@ -0,0 +1,101 @@
+import re
+from typing import List
+
+from sqlalchemy import column, event, func, literal_column, or_, table, text
+from sqlalchemy.orm import Session
+
+from backend.models.pastry import Pastry
+
+# The searched document. Kept as literal SQL so queries match the
+# expression index exactly. 'simple' because names are mostly Persian,
+# which PostgreSQL has no stemmer for.
+SEARCH_DOCUMENT = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+
+POSTGRES_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_pastries_search ON pastries USING gin ({SEARCH_DOCUMENT})",
+    "CREATE INDEX IF NOT EXISTS ix_pastries_name_trgm ON pastries USING gin (name gin_trgm_ops)",
+]
+
+# Tests run on SQLite, where an external-content FTS5 table kept in sync by
+# triggers plays the role of the tsvector index.
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS pastries_fts USING fts5(name, description, content='pastries', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS pastries_fts_insert AFTER INSERT ON pastries BEGIN
+        INSERT INTO pastries_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pastries_fts_delete AFTER DELETE ON pastries BEGIN
+        INSERT INTO pastries_fts(pastries_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pastries_fts_update AFTER UPDATE OF name, description ON pastries BEGIN
+        INSERT INTO pastries_fts(pastries_fts, rowid, name, description) VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO pastries_fts(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    "INSERT INTO pastries_fts(pastries_fts) VALUES ('rebuild')",
+]
+
+_fts = table("pastries_fts", column("rowid"))
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_indexes(target, connection, **kw):
+    """
+    Creates the full-text search indexes for the connection's dialect.
+    Idempotent; runs after `pastries` is created and at every startup, so
+    databases created before search existed get the indexes too.
+    """
+    if connection.dialect.name == "postgresql":
+        statements = POSTGRES_SEARCH_DDL
+    elif connection.dialect.name == "sqlite":
+        statements = SQLITE_SEARCH_DDL
+    else:
+        return
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def drop_search_indexes(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS pastries_fts"))
+
+
+event.listen(Pastry.__table__, "after_create", create_search_indexes)
+event.listen(Pastry.__table__, "before_drop", drop_search_indexes)
+
+
+def ensure_search_indexes(engine):
+    with engine.begin() as connection:
+        create_search_indexes(Pastry.__table__, connection)
+
+
+def search_pastries(db: Session, q: str, limit: int) -> List[Pastry]:
+    """
+    Ranked full-text search over name and description of active pastries.
+    On PostgreSQL trigram similarity on the name also catches typos.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        words = _WORD.findall(q)
+        if not words:
+            return []
+        # Quote every word so user input cannot use FTS5 query syntax
+        match = " ".join('"{}"'.format(word.replace('"', '""')) for word in words)
+        return (
+            db.query(Pastry)
+            .join(_fts, _fts.c.rowid == Pastry.id)
+            .filter(text("pastries_fts MATCH :match"), Pastry.is_deleted == 0)
+            .params(match=match)
+            .order_by(text("bm25(pastries_fts)"), Pastry.id)
+            .limit(limit)
+            .all()
+        )
+
+    document = literal_column(SEARCH_DOCUMENT)
+    tsquery = func.plainto_tsquery(literal_column("'simple'"), q)
+    rank = func.ts_rank(document, tsquery) + func.similarity(Pastry.name, q)
+    return (
+        db.query(Pastry)
+        .filter(Pastry.is_deleted == 0, or_(document.op("@@")(tsquery), Pastry.name.op("%")(q)))
+        .order_by(rank.desc(), Pastry.id)
+        .limit(limit)
+        .all()
+    )
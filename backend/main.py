@@ -1,57 +1,108 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import redis.asyncio as redis
+import asyncio
+import logging
 import os
 from dotenv import load_dotenv
-from backend.routes import users, pastries, order
-from backend.database.config import engine, Base
+from backend.routes import users, pastries, order, analytics, profiles, audit
+from backend.database.config import engine, Base, SessionLocal
+from backend.database.search import ensure_search_indexes
+from backend.database.database import ensure_columns, ensure_indexes
+from backend.database.partitioning import ensure_order_partitions
+from backend.core.metrics import MetricsMiddleware, instrument_redis, mark_process_dead, render_metrics
+from backend.core.context import RequestContextMiddleware
+from backend.core.logging_config import setup_logging
+from backend.core.profiling import ProfilingMiddleware, profiling_available
+from backend.utils.catalog_cache import catalog_cache
+from backend.core.tokens import revocation_list
+from backend.utils.audit import audit_log
+from backend.core.server import notify_ready
 from contextlib import asynccontextmanager
 
 
 load_dotenv()
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def load_catalog():
+    db = SessionLocal()
+    try:
+        return pastries.load_catalog_snapshot(db)
+    finally:
+        db.close()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Application lifespan: Initializes database and Redis clients.
     """
-    print("Application startup: Initializing resources...")
+    logger.info("Application startup: Initializing resources...")
 
     # --- Database Schema Creation ---
     try:
-        print("Attempting to create database schema...")
+        logger.info("Attempting to create database schema...")
         Base.metadata.create_all(bind=engine)
-        print("Database schema check/creation complete.")
-    except Exception as e:
-        print(f"Error during database schema creation: {e}")
+        ensure_columns(engine, Base.metadata)
+        ensure_indexes(engine, Base.metadata)
+        ensure_search_indexes(engine)
+        with engine.begin() as conn:
+            ensure_order_partitions(conn)
+        logger.info("Database schema check/creation complete.")
+    except Exception:
+        logger.exception("Error during database schema creation")
 
     # --- Redis Client Setup ---
     try:
         redis_url = os.getenv("REDIS_URL")
         if not redis_url:
-            print("REDIS_URL environment variable not set. Redis client will not be initialized.")
+            logger.warning("REDIS_URL environment variable not set. Redis client will not be initialized.")
             app.state.redis = None
         else:
-            print(f"Connecting to Redis ...")
+            logger.info("Connecting to Redis ...")
             redis_client = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
             await redis_client.ping()
-            print("Redis connection successful.")
-            app.state.redis = redis_client 
-            print("Redis client stored in app.state.")
+            logger.info("Redis connection successful.")
+            app.state.redis = instrument_redis(redis_client)
+            logger.info("Redis client stored in app.state.")
 
-    except Exception as e:
-        print(f"Error connecting to Redis: {e}")
+    except Exception:
+        logger.exception("Error connecting to Redis")
         app.state.redis = None
 
+    # --- Token Revocation ---
+    if app.state.redis is not None:
+        try:
+            await revocation_list.start(app.state.redis)
+        except Exception:
+            logger.exception("Error subscribing to token revocations")
+
+    # --- Catalog Warm-up ---
+    # Only one worker builds the snapshot; the others load it from Redis.
+    # Runs in the background and retries until it succeeds; /ready reports 503 until then.
+    warm_up = asyncio.create_task(catalog_cache.warm_up(app.state.redis, load_catalog))
+    # During a rolling restart the old worker is stopped once this one is warm
+    warm_up.add_done_callback(lambda task: task.cancelled() or notify_ready())
+
+    # --- Audit Log Flusher ---
+    await audit_log.start()
+
     yield 
 
     # --- Application Shutdown ---
-    print("Application shutdown: Cleaning up resources...")
+    logger.info("Application shutdown: Cleaning up resources...")
+    warm_up.cancel()
+    await revocation_list.stop()
+    # Writes the events still buffered, so a graceful restart loses none
+    await audit_log.stop()
     if hasattr(app.state, 'redis') and app.state.redis is not None:
-        print("Closing Redis client connection...")
+        logger.info("Closing Redis client connection...")
         await app.state.redis.close()
-        print("Redis client connection closed.")
+        logger.info("Redis client connection closed.")
+    mark_process_dead()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -64,12 +115,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added before the metrics and request-context middlewares so profiles leave them out
+if profiling_available():
+    app.add_middleware(ProfilingMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(pastries.router, prefix="/pastries", tags=["pastries"])
 app.include_router(order.router, prefix="/order", tags=["orders"])
+app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(profiles.router, prefix="/profiles", tags=["profiles"])
+app.include_router(audit.router, prefix="/audit", tags=["audit"])
 
 
 @app.get("/")
 async def root():
-    return {"message":  "Welcome to the API for the Qandoon App."}
\ No newline at end of file
+    return {"message":  "Welcome to the API for the Qandoon App."}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """
+    Readiness probe: healthy once the catalog snapshot has been loaded.
+    """
+    if not catalog_cache.ready:
+        return Response(status_code=503)
+    return {"status": "ready"}
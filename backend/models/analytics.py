@@ -0,0 +1,67 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, Enum, ForeignKey, String
+
+from backend.database.config import Base
+from backend.models.order import OrderStatus
+
+# Pre-aggregated rollups for the admin dashboard.
+# They are updated incrementally by the order routes and can be rebuilt
+# from scratch with `python -m backend.scripts.rebuild_rollups`.
+
+class OrderStatusRollup(Base):
+    __tablename__ = "rollup_order_status"
+
+    status = Column(Enum(OrderStatus), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class PastrySalesRollup(Base):
+    __tablename__ = "rollup_pastry_sales"
+
+    pastry_id = Column(Integer, ForeignKey("pastries.id"), primary_key=True)
+    units_sold = Column(Float, nullable=False, default=0, index=True)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+class DailySalesRollup(Base):
+    __tablename__ = "rollup_daily_sales"
+
+    day = Column(Date, primary_key=True)
+    orders_created = Column(Integer, nullable=False, default=0)
+    orders_accepted = Column(Integer, nullable=False, default=0)
+    orders_rejected = Column(Integer, nullable=False, default=0)
+    units_sold = Column(Float, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+# Offline sales report, built by backend.utils.sales_report. Orders are
+# attributed to the day they were placed, whatever day they were decided on.
+
+class SalesReportDay(Base):
+    __tablename__ = "sales_report_days"
+
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    accepted = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)
+    units_sold = Column(Float, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    acceptance_rate = Column(Float, nullable=True)  # accepted / decided; NULL while nothing was decided
+
+
+class SalesReportPastryDay(Base):
+    __tablename__ = "sales_report_pastry_days"
+
+    day = Column(Date, primary_key=True)
+    pastry_id = Column(Integer, primary_key=True)
+    units_sold = Column(Float, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
+
+class ReportWatermark(Base):
+    """
+    How far a report job has read: orders updated up to `value` are included.
+    """
+    __tablename__ = "report_watermarks"
+
+    name = Column(String, primary_key=True)
+    value = Column(DateTime, nullable=False)
@@ -0,0 +1,32 @@
+import enum
+
+from sqlalchemy import Column, Integer, String, JSON, DateTime, Index
+
+from backend.database.config import Base
+
+
+class AuditEntity(str, enum.Enum):
+    ORDER = "order"
+    PASTRY = "pastry"
+
+
+class AuditEvent(Base):
+    """
+    Append-only change log, written in batches by backend.utils.audit.
+    Rows are never updated or deleted by the application.
+    """
+    __tablename__ = "audit_events"
+
+    id = Column(Integer, primary_key=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)
+    # No foreign keys: the trail must outlive the rows it describes, and inserts skip the checks
+    actor_id = Column(Integer, nullable=True)  # NULL for changes made by scripts and jobs
+    changes = Column(JSON, nullable=False)  # {field: [old, new]}
+    created_at = Column(DateTime, nullable=False)  # when the change was made, not when it was flushed
+
+    # An entity's history, newest first, is a range scan of this index
+    __table_args__ = (
+        Index("ix_audit_events_entity", "entity_type", "entity_id", "id"),
+    )
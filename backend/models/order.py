@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Enum, JSON, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, Enum, JSON, DateTime, Float, func
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 
@@ -19,14 +19,39 @@ class Order(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     address = Column(String, nullable=False)
     phone_number = Column(String, nullable=False)
-    items = Column(JSON, nullable=False)  # List of sweets with quantities
+    items = Column(JSON, nullable=False)  # List of sweets with quantities and prices at order time
+    total = Column(Float, nullable=True)  # NULL only for orders not yet backfilled
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
     admin_message = Column(String, nullable=True)
-    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
-    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC), index=True)
+    # Indexed for the incremental sales report, which reads orders changed since its watermark
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), index=True)
+    # When the status last changed; unlike updated_at, other edits don't move it.
+    # NULL for pending orders and for orders decided before the column existed.
+    decided_at = Column(DateTime, nullable=True)
 
     # Relationships
     user = relationship("User", back_populates="orders") 
+
+class ArchivedOrder(Base):
+    """
+    Closed orders moved out of `orders` once they are older than the
+    retention window (see backend.database.archive). Ids are kept as they were.
+    """
+    __tablename__ = "orders_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    address = Column(String, nullable=False)
+    phone_number = Column(String, nullable=False)
+    items = Column(JSON, nullable=False)
+    total = Column(Float, nullable=True)
+    status = Column(Enum(OrderStatus))
+    admin_message = Column(String, nullable=True)
+    created_at = Column(DateTime, index=True)
+    updated_at = Column(DateTime)
+    decided_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, server_default=func.now())
     
     #end of the line
     
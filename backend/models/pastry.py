@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Index, text
 from sqlalchemy.sql import func
 from backend.database.config import Base
 
+ACTIVE = "is_deleted = 0"
+IN_STOCK = "is_deleted = 0 AND stock > 0"
+
 class Pastry(Base):
     __tablename__ = "pastries"
 
@@ -14,6 +17,19 @@ class Pastry(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     is_deleted = Column(Integer, default=0)  # 0: not deleted, 1: deleted
+
+    # Partial indexes behind the catalog filters and sort orders in GET /pastries/.
+    # Queries must compare is_deleted/stock against a literal 0 to match them.
+    __table_args__ = (
+        Index("ix_pastries_active_price", "price", "id", postgresql_where=text(ACTIVE), sqlite_where=text(ACTIVE)),
+        Index("ix_pastries_active_created", "created_at", "id", postgresql_where=text(ACTIVE), sqlite_where=text(ACTIVE)),
+        Index("ix_pastries_active_name", "name", "id", postgresql_where=text(ACTIVE), sqlite_where=text(ACTIVE)),
+        Index("ix_pastries_in_stock_price", "price", "id", postgresql_where=text(IN_STOCK), sqlite_where=text(IN_STOCK)),
+        Index("ix_pastries_in_stock_created", "created_at", "id", postgresql_where=text(IN_STOCK), sqlite_where=text(IN_STOCK)),
+        Index("ix_pastries_in_stock_name", "name", "id", postgresql_where=text(IN_STOCK), sqlite_where=text(IN_STOCK)),
+    )
+    # Fetch created_at/updated_at with RETURNING on the INSERT/UPDATE itself
+    __mapper_args__ = {"eager_defaults": True}
     
     
     #end of the line 
\ No newline at end of file
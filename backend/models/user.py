@@ -14,6 +14,9 @@ class User(Base):
     is_admin = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    # Fetch created_at with RETURNING on the INSERT itself
+    __mapper_args__ = {"eager_defaults": True}
+
     # Relationships
     orders = relationship("Order", back_populates="user")
     
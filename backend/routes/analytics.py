@@ -0,0 +1,67 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+
+from backend.database.config import get_db
+from backend.models.analytics import DailySalesRollup, OrderStatusRollup, PastrySalesRollup
+from backend.models.order import OrderStatus
+from backend.models.pastry import Pastry
+from backend.schemas.analytics import DashboardResponse, DailySales, PastrySales
+from backend.core.security import get_current_user
+
+router = APIRouter()
+
+@router.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(
+    days: int = Query(30, ge=1, le=366),
+    top: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view analytics"
+        )
+
+    # Every query below reads a bounded number of rollup rows,
+    # independent of how many orders exist.
+    orders_by_status = {s.value: 0 for s in OrderStatus}
+    for row in db.query(OrderStatusRollup).all():
+        orders_by_status[row.status.value] = row.count
+
+    top_pastries = (
+        db.query(PastrySalesRollup, Pastry.name)
+        .join(Pastry, Pastry.id == PastrySalesRollup.pastry_id)
+        .order_by(PastrySalesRollup.units_sold.desc())
+        .limit(top)
+        .all()
+    )
+
+    # Rollup days are UTC days, whatever the server's local time zone
+    since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+    daily = (
+        db.query(DailySalesRollup)
+        .filter(DailySalesRollup.day >= since)
+        .order_by(DailySalesRollup.day)
+        .all()
+    )
+
+    return DashboardResponse(
+        orders_by_status=orders_by_status,
+        top_pastries=[
+            PastrySales(pastry_id=row.pastry_id, name=name, units_sold=row.units_sold, revenue=row.revenue)
+            for row, name in top_pastries
+        ],
+        daily=[
+            DailySales(
+                day=row.day,
+                orders_created=row.orders_created,
+                orders_accepted=row.orders_accepted,
+                orders_rejected=row.orders_rejected,
+                units_sold=row.units_sold,
+                revenue=row.revenue,
+            )
+            for row in daily
+        ],
+    )
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from backend.database.config import get_db
+from backend.models.audit import AuditEntity, AuditEvent
+from backend.schemas.audit import AuditEventResponse
+from backend.core.security import get_current_user
+
+router = APIRouter()
+
+@router.get("/{entity_type}/{entity_id}", response_model=List[AuditEventResponse])
+async def get_audit_trail(
+    entity_type: AuditEntity,
+    entity_id: int,
+    before_id: Optional[int] = Query(None, description="Return events older than this event id (for paging)"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Changes to one order or pastry, newest first. Events show up a few
+    seconds after the change, once the audit buffer has been flushed.
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can view the audit trail"
+        )
+    # Keyset paging on (entity_type, entity_id, id), which ix_audit_events_entity covers
+    query = db.query(AuditEvent).filter(
+        AuditEvent.entity_type == entity_type.value,
+        AuditEvent.entity_id == entity_id
+    )
+    if before_id is not None:
+        query = query.filter(AuditEvent.id < before_id)
+    return query.order_by(AuditEvent.id.desc()).limit(limit).all()
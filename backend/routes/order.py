@@ -1,63 +1,204 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import case, update
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime, timezone
 from backend.database.config import get_db
-from backend.models.order import Order, OrderStatus
+from backend.models.order import ArchivedOrder, Order, OrderStatus
 from backend.models.user import User
-from backend.schemas.order import OrderCreate, OrderResponse, OrderUpdate
+from backend.schemas.order import OrderCreate, OrderResponse, OrderUpdate, OrderBulkUpdate, OrderBulkResult, OrderExpand, OrderPastry
 from backend.core.security import get_current_user
 from backend.models.pastry import Pastry
+from backend.database.rollups import decision_time, record_order_created, record_status_change
+from backend.database.order_pricing import price_items
+from backend.database.redis_config import get_optional_redis
+from backend.utils.idempotency import IdempotentRequest
+from backend.utils.catalog_cache import catalog_cache
+from backend.utils.audit import audit_log, diff
+from backend.models.audit import AuditEntity
+from backend.utils.stock_holds import attach_hold, commit_holds, hold_stock, new_hold_id, release_hold
+from backend.utils.order_export import ORDER_EXPORT_FIELDS, iter_orders
+from backend.utils.streaming import MEDIA_TYPES, ExportFormat, export_chunks
 
 router = APIRouter()
 
-@router.post("/new", response_model=OrderResponse)
-async def create_order(
-    order: OrderCreate,
-    db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
-):
-    # Check if all pastries exist and have sufficient quantity
+async def _create_order(order: OrderCreate, db: Session, user_id: int, redis_client=None) -> Order:
+    # One plain read prices every line and finds unknown pastries
+    pastry_ids = {item.pastry_id for item in order.items}
+    pastries = {
+        row.id: row
+        for row in db.query(Pastry.id, Pastry.name, Pastry.price, Pastry.stock).filter(Pastry.id.in_(pastry_ids))
+    }
     for item in order.items:
-        pastry = db.query(Pastry).filter(Pastry.id == item.pastry_id).first()
-        if not pastry:
+        if item.pastry_id not in pastries:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Pastry with id {item.pastry_id} not found"
             )
-        if pastry.stock < item.quantity:
+    items, total = price_items(
+        [{"pastry_id": item.pastry_id, "quantity": item.quantity} for item in order.items],
+        {pastry_id: pastry.price for pastry_id, pastry in pastries.items()}
+    )
+
+    hold_id = None
+    if redis_client is not None:
+        # Free stock is checked against the Redis holds, not pastries.stock
+        hold_id = new_hold_id()
+        held = await hold_stock(redis_client, db, hold_id, items)
+        if held.missing:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Pastry with id {held.missing[0]} not found"
+            )
+        if not held.ok:
+            name = pastries[held.short].name
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient quantity for pastry {pastry.name}"
+                detail=f"Insufficient quantity for pastry {name}"
             )
+    else:
+        # Check if all pastries have sufficient quantity
+        for item in order.items:
+            pastry = pastries[item.pastry_id]
+            if pastry.stock < item.quantity:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Insufficient quantity for pastry {pastry.name}"
+                )
 
-    # Create new order
-    db_order = Order(
-        user_id=current_user.get("user_id"),
-        address=order.address,
-        phone_number=order.phone_number,
-        items=[{"pastry_id": item.pastry_id, "quantity": item.quantity} for item in order.items]
-    )
-    db.add(db_order)
-    db.commit()
-    db.refresh(db_order)
+    try:
+        # Create new order
+        db_order = Order(
+            user_id=user_id,
+            address=order.address,
+            phone_number=order.phone_number,
+            items=items,
+            total=total
+        )
+        db.add(db_order)
+        record_order_created(db, db_order)
+        db.commit()
+    except BaseException:
+        # Nothing was stored, so give the held stock back right away
+        if hold_id is not None:
+            await release_hold(redis_client, hold_id)
+        raise
+    if hold_id is not None:
+        await attach_hold(redis_client, hold_id, db_order.id)
     return db_order
 
+@router.post("/new", response_model=OrderResponse)
+async def create_order(
+    order: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    redis_client = Depends(get_optional_redis)
+):
+    user_id = current_user.get("user_id")
+    # Without Redis the key cannot be honoured, so orders are created as usual
+    if idempotency_key is None or redis_client is None:
+        return await _create_order(order, db, user_id, redis_client)
+
+    idempotent = IdempotentRequest(redis_client, f"order:new:{user_id}", idempotency_key, order.model_dump_json())
+    replay = await idempotent.begin()
+    if replay is not None:
+        return replay
+    try:
+        db_order = await _create_order(order, db, user_id, redis_client)
+    except BaseException:
+        await idempotent.release()
+        raise
+    response = OrderResponse.model_validate(db_order)
+    await idempotent.save(response.model_dump(mode="json"))
+    return response
+
+def _expand_pastries(db: Session, orders) -> List[OrderResponse]:
+    """
+    Embeds the pastry of every line, resolving all of them with one IN query.
+    """
+    responses = [OrderResponse.model_validate(order) for order in orders]
+    pastry_ids = {line.pastry_id for response in responses for line in response.items}
+    pastries = {}
+    if pastry_ids:
+        rows = db.query(Pastry.id, Pastry.name, Pastry.price, Pastry.image_url, Pastry.is_deleted).filter(Pastry.id.in_(pastry_ids))
+        pastries = {row.id: OrderPastry.model_validate(row) for row in rows}
+    for response in responses:
+        for line in response.items:
+            line.pastry = pastries.get(line.pastry_id)
+    return responses
+
 @router.get("/orders", response_model=List[OrderResponse])
 async def get_orders(
+    expand: List[OrderExpand] = Query([]),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     if current_user.get("role") == "admin":
-        return db.query(Order).all()
-    return db.query(Order).filter(Order.user_id == int(current_user.get("user_id"))).all()
+        orders = db.query(Order).all()
+    else:
+        orders = db.query(Order).filter(Order.user_id == int(current_user.get("user_id"))).all()
+    if OrderExpand.PASTRIES in expand:
+        return _expand_pastries(db, orders)
+    return orders
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get("/export")
+async def export_orders(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    order_status: Optional[List[OrderStatus]] = Query(None, alias="status"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Streams orders created in [start, end), optionally limited to some
+    statuses, as CSV or NDJSON.
+    """
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can export orders"
+        )
+    start, end = _as_utc(start), _as_utc(end)
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="start must be before end"
+        )
+
+    def chunks():
+        try:
+            rows = iter_orders(db, export_format, start, end, order_status)
+            yield from export_chunks(rows, ORDER_EXPORT_FIELDS, export_format)
+        finally:
+            # The response outlives the request dependencies, so close the session here
+            db.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{export_format.value}"'}
+    )
 
 @router.get("/orders/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
+    expand: List[OrderExpand] = Query([]),
     db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     order = db.query(Order).filter(Order.id == order_id).first()
+    if not order:
+        # Old closed orders live in the archive
+        order = db.query(ArchivedOrder).filter(ArchivedOrder.id == order_id).first()
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -68,14 +209,138 @@ async def get_order(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this order"
         )
+    if OrderExpand.PASTRIES in expand:
+        return _expand_pastries(db, [order])[0]
     return order
 
+def _order_changes(order: Order, new_status: OrderStatus, admin_message: Optional[str]) -> dict:
+    return diff(
+        {"status": order.status.value, "admin_message": order.admin_message},
+        {"status": new_status.value, "admin_message": admin_message}
+    )
+
+@router.patch("/orders", response_model=List[OrderBulkResult])
+async def bulk_update_orders(
+    bulk_update: OrderBulkUpdate,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    redis_client = Depends(get_optional_redis)
+):
+    """
+    Applies many status changes in one transaction. Each order succeeds or
+    fails on its own; stock for all accepted orders is decremented with a
+    single UPDATE.
+    """
+    if not current_user.get("role") == "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can update orders"
+        )
+
+    order_ids = [item.order_id for item in bulk_update.updates]
+    orders = {
+        order.id: order
+        for order in db.query(Order).filter(Order.id.in_(order_ids)).with_for_update()
+    }
+
+    # Load every pastry that an accepted order may need, in one query
+    pastry_ids = {
+        item["pastry_id"]
+        for update_item in bulk_update.updates
+        if update_item.status == OrderStatus.ACCEPTED and update_item.order_id in orders
+        for item in orders[update_item.order_id].items
+    }
+    pastries = {}
+    if pastry_ids:
+        rows = db.query(Pastry.id, Pastry.name, Pastry.stock, Pastry.price).filter(Pastry.id.in_(pastry_ids)).with_for_update()
+        pastries = {row.id: row for row in rows}
+    remaining = {pastry_id: pastry.stock for pastry_id, pastry in pastries.items()}
+    prices = {pastry_id: pastry.price for pastry_id, pastry in pastries.items()}
+    decrements = {}
+
+    results = []
+    updated = []
+    accepted, rejected = [], []
+    seen = set()
+    for update_item in bulk_update.updates:
+        order = orders.get(update_item.order_id)
+        if order is None:
+            results.append(OrderBulkResult(order_id=update_item.order_id, success=False, detail="Order not found"))
+            continue
+        if order.id in seen:
+            results.append(OrderBulkResult(order_id=order.id, success=False, detail="Order appears more than once in the request"))
+            continue
+        seen.add(order.id)
+
+        # If order is being accepted, reserve pastry quantities
+        if update_item.status == OrderStatus.ACCEPTED and order.status == OrderStatus.PENDING:
+            needed = {}
+            for item in order.items:
+                needed[item["pastry_id"]] = needed.get(item["pastry_id"], 0) + item["quantity"]
+            shortage = next(
+                (pastry_id for pastry_id, quantity in needed.items()
+                 if pastry_id not in remaining or remaining[pastry_id] < quantity),
+                None
+            )
+            if shortage is not None:
+                detail = (
+                    f"Insufficient quantity for pastry {pastries[shortage].name}"
+                    if shortage in pastries else f"Pastry with id {shortage} not found"
+                )
+                results.append(OrderBulkResult(order_id=order.id, success=False, detail=detail))
+                continue
+            for pastry_id, quantity in needed.items():
+                remaining[pastry_id] -= quantity
+                decrements[pastry_id] = decrements.get(pastry_id, 0) + quantity
+            accepted.append(order.id)
+        elif update_item.status == OrderStatus.REJECTED:
+            rejected.append(order.id)
+
+        old_status, old_decided_at = order.status, decision_time(order.decided_at, order.updated_at)
+        changes = _order_changes(order, update_item.status, update_item.admin_message)
+        order.status = update_item.status
+        order.admin_message = update_item.admin_message
+        record_status_change(db, order, old_status, old_decided_at, prices)
+        updated.append((order, changes))
+        results.append(OrderBulkResult(order_id=order.id, success=True))
+
+    if decrements:
+        db.execute(
+            update(Pastry)
+            .where(Pastry.id.in_(decrements))
+            .values(stock=Pastry.stock - case(decrements, value=Pastry.id))
+            .execution_options(synchronize_session=False)
+        )
+    db.flush()
+    responses = {order.id: OrderResponse.model_validate(order) for order, _ in updated}
+    db.commit()
+
+    actor_id = current_user.get("user_id")
+    for order, changes in updated:
+        audit_log.record(AuditEntity.ORDER, order.id, "status_changed", actor_id, changes)
+    for pastry_id, quantity in decrements.items():
+        stock = pastries[pastry_id].stock
+        audit_log.record(AuditEntity.PASTRY, pastry_id, "stock_decremented", actor_id, {"stock": (stock, stock - quantity)})
+
+    if decrements:
+        await catalog_cache.invalidate(redis_client)
+    if redis_client is not None:
+        await commit_holds(redis_client, accepted, decrements)
+        for order_id in rejected:
+            await release_hold(redis_client, order_id)
+
+    for result in results:
+        if result.success:
+            result.order = responses[result.order_id]
+    return results
+
 @router.patch("/orders/{order_id}", response_model=OrderResponse)
 async def update_order(
     order_id: int,
     order_update: OrderUpdate,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    redis_client = Depends(get_optional_redis)
 ):
     if not current_user.get("role") == "admin":
         raise HTTPException(
@@ -90,8 +355,14 @@ async def update_order(
             detail="Order not found"
         )
 
+    old_status, old_decided_at = order.status, decision_time(order.decided_at, order.updated_at)
+    changes = _order_changes(order, order_update.status, order_update.admin_message)
+    prices = None
+    stock_changes = {}
+
     # If order is being accepted, update pastry quantities
     if order_update.status == OrderStatus.ACCEPTED and order.status == OrderStatus.PENDING:
+        prices = {}
         for item in order.items:
             pastry = db.query(Pastry).filter(Pastry.id == item["pastry_id"]).first()
             if pastry.stock < item["quantity"]:
@@ -99,10 +370,26 @@ async def update_order(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"Insufficient quantity for pastry {pastry.name}"
                 )
+            stock_changes.setdefault(pastry.id, [pastry.stock, None])
             pastry.stock -= item["quantity"]
+            stock_changes[pastry.id][1] = pastry.stock
+            prices[pastry.id] = pastry.price
 
     order.status = order_update.status
     order.admin_message = order_update.admin_message
+    record_status_change(db, order, old_status, old_decided_at, prices)
     db.commit()
-    db.refresh(order)
+
+    actor_id = current_user.get("user_id")
+    audit_log.record(AuditEntity.ORDER, order.id, "status_changed", actor_id, changes)
+    for pastry_id, stock in stock_changes.items():
+        audit_log.record(AuditEntity.PASTRY, pastry_id, "stock_decremented", actor_id, {"stock": tuple(stock)})
+
+    if prices is not None:
+        await catalog_cache.invalidate(redis_client)
+    if redis_client is not None:
+        if prices is not None:
+            await commit_holds(redis_client, [order.id], prices)
+        elif order.status == OrderStatus.REJECTED:
+            await release_hold(redis_client, order.id)
     return order 
\ No newline at end of file
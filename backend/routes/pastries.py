@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, status, UploadFile, File, Form, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from sqlalchemy import literal_column
+from sqlalchemy.orm import Session, Query as OrmQuery
+from typing import List, Optional
+from dataclasses import asdict
+import io
 import os
 import shutil
 from pathlib import Path
@@ -8,8 +13,17 @@ from datetime import datetime
 
 from backend.database.config import get_db
 from backend.models.pastry import Pastry
-from backend.schemas.pastry import PastryCreate, PastryUpdate, PastryResponse
+from backend.schemas.pastry import PastryCreate, PastryUpdate, PastryResponse, PastryImportResponse, PastrySearchResult, SearchMode, PastrySort, PastryBatchResponse, MAX_BATCH_PASTRIES
 from backend.core.security import get_current_user
+from backend.utils.catalog_io import CATALOG_FIELDS, detect_format, import_pastries, iter_catalog, read_records
+from backend.utils.streaming import MEDIA_TYPES, ExportFormat, export_chunks
+from backend.utils.typeahead import typeahead_index
+from backend.utils.catalog_cache import DEFAULT_ORDER, DEFAULT_PAGE_SIZE, CatalogSnapshot, catalog_cache
+from backend.utils.stock_holds import invalidate_all_levels, invalidate_levels
+from backend.utils.audit import audit_log, diff
+from backend.models.audit import AuditEntity
+from backend.database.redis_config import get_optional_redis
+from backend.database.search import search_pastries
 
 router = APIRouter()
 
@@ -19,6 +33,21 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB in bytes
 
+# Compared against literal 0 (not a bound parameter) so the planner can use
+# the partial indexes declared on Pastry
+ACTIVE_FILTER = Pastry.is_deleted == literal_column("0")
+IN_STOCK_FILTER = Pastry.stock > literal_column("0")
+
+# Every order ends with id, matching the (column, id) indexes and keeping paging stable.
+# The default is insertion order, as before sorting was supported.
+SORT_ORDERS = {
+    None: (Pastry.created_at, Pastry.id),
+    PastrySort.PRICE_ASC: (Pastry.price, Pastry.id),
+    PastrySort.PRICE_DESC: (Pastry.price.desc(), Pastry.id.desc()),
+    PastrySort.NEWEST: (Pastry.created_at.desc(), Pastry.id.desc()),
+    PastrySort.NAME: (Pastry.name, Pastry.id),
+}
+
 async def save_upload_file(upload_file: UploadFile) -> str:
     # Validate file size
     file_size = 0
@@ -55,7 +84,8 @@ async def create_pastry(
     stock: float = Form(...),
     image: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    redis_client = Depends(get_optional_redis)
 ):
     if current_user.get("role") != "admin":
         raise HTTPException(
@@ -72,29 +102,189 @@ async def create_pastry(
         "description": description,
         "image_url": image_url,
         "price": price,
-        "stock": stock
+        "stock": stock,
+        # Known to be NULL on insert; set it so the response needn't load it back
+        "updated_at": None
     }
     
     db_pastry = Pastry(**pastry_data)
     db.add(db_pastry)
     db.commit()
-    db.refresh(db_pastry)
+    typeahead_index.invalidate()
+    await catalog_cache.invalidate(redis_client)
     return db_pastry
 
+def filter_catalog(
+    query: OrmQuery,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: bool = False,
+    sort: Optional[PastrySort] = None
+) -> OrmQuery:
+    query = query.filter(ACTIVE_FILTER)
+    if in_stock:
+        query = query.filter(IN_STOCK_FILTER)
+    if min_price is not None:
+        query = query.filter(Pastry.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Pastry.price <= max_price)
+    return query.order_by(*SORT_ORDERS[sort])
+
+def load_catalog_snapshot(db: Session) -> CatalogSnapshot:
+    """
+    Builds the catalog snapshot: every active pastry once, plus the id order
+    for each sort, taken from the same queries the listing would run.
+    """
+    pastries = [
+        PastryResponse.model_validate(pastry).model_dump(mode="json")
+        for pastry in filter_catalog(db.query(Pastry))
+    ]
+    orders = {
+        sort.value if sort else DEFAULT_ORDER: [pastry_id for (pastry_id,) in filter_catalog(db.query(Pastry.id), sort=sort)]
+        for sort in SORT_ORDERS
+    }
+    return CatalogSnapshot(pastries, orders)
+
 @router.get("/", response_model=List[PastryResponse])
 async def get_pastries(
-    skip: int = 0,
-    limit: int = 100,
+    request: Request,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=0),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: bool = False,
+    sort: Optional[PastrySort] = None,
+    db: Session = Depends(get_db),
+    redis_client = Depends(get_optional_redis)
+):
+    snapshot = await catalog_cache.get(redis_client, lambda: load_catalog_snapshot(db))
+    if (skip, limit, min_price, max_price, in_stock, sort) == (0, DEFAULT_PAGE_SIZE, None, None, False, None):
+        # The default page is encoded and compressed once per snapshot
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(
+                snapshot.default_page_gzip,
+                media_type="application/json",
+                headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+            )
+        return Response(snapshot.default_page, media_type="application/json", headers={"Vary": "Accept-Encoding"})
+    return JSONResponse(snapshot.listing(skip, limit, min_price, max_price, in_stock, sort.value if sort else None))
+
+@router.get("/search", response_model=List[PastrySearchResult])
+async def search_catalog(
+    q: str = Query(..., min_length=1, max_length=100),
+    mode: SearchMode = SearchMode.FULL,
+    limit: int = Query(20, ge=1, le=50),
     db: Session = Depends(get_db)
 ):
-    pastries = db.query(Pastry).filter(Pastry.is_deleted == 0).offset(skip).limit(limit).all()
-    return pastries
+    if mode == SearchMode.PREFIX:
+        return typeahead_index.suggest(db, q, limit)
+    return search_pastries(db, q, limit)
+
+def deleted_description(description: str) -> str:
+    return f"this pastry was deleted {description}"
+
+@router.get("/batch", response_model=PastryBatchResponse)
+async def get_pastries_batch(
+    ids: str = Query(..., description=f"Comma-separated pastry ids, at most {MAX_BATCH_PASTRIES}"),
+    db: Session = Depends(get_db)
+):
+    try:
+        requested = list(dict.fromkeys(int(pastry_id) for pastry_id in ids.split(",") if pastry_id.strip()))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="ids must be a comma-separated list of integers"
+        )
+    if not requested or len(requested) > MAX_BATCH_PASTRIES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Pass between 1 and {MAX_BATCH_PASTRIES} ids"
+        )
+
+    found = {pastry.id: pastry for pastry in db.query(Pastry).filter(Pastry.id.in_(requested))}
+    pastries, missing, deleted = [], [], []
+    for pastry_id in requested:
+        pastry = found.get(pastry_id)
+        if pastry is None:
+            missing.append(pastry_id)
+            continue
+        response = PastryResponse.model_validate(pastry)
+        if pastry.is_deleted:
+            # Same marking as get_pastry, applied to the response rather than the ORM object
+            response.description = deleted_description(pastry.description)
+            deleted.append(pastry_id)
+        pastries.append(response)
+    return PastryBatchResponse(pastries=pastries, missing=missing, deleted=deleted)
+
+@router.post("/import", response_model=PastryImportResponse)
+async def import_catalog(
+    file: UploadFile = File(...),
+    import_format: Optional[ExportFormat] = Query(None, alias="format"),
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+    redis_client = Depends(get_optional_redis)
+):
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can import pastries"
+        )
+
+    import_format = import_format or detect_format(file.filename)
+    if import_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown file format. Use a .csv or .jsonl file or pass ?format="
+        )
+
+    # The upload is already spooled to disk; parse it line by line off the event loop
+    lines = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    report = await run_in_threadpool(
+        import_pastries, db, read_records(lines, import_format), actor_id=current_user.get("user_id")
+    )
+    typeahead_index.invalidate()
+    await catalog_cache.invalidate(redis_client)
+    if redis_client is not None and report.updated:
+        await invalidate_all_levels(redis_client)
+    return PastryImportResponse(**asdict(report))
+
+@router.get("/export")
+async def export_catalog(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    include_deleted: bool = False,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can export pastries"
+        )
+
+    def chunks():
+        try:
+            yield from export_chunks(iter_catalog(db, include_deleted), CATALOG_FIELDS, export_format)
+        finally:
+            # The response outlives the request dependencies, so close the session here
+            db.close()
+
+    return StreamingResponse(
+        chunks(),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="pastries.{export_format.value}"'}
+    )
 
 @router.get("/{pastry_id}", response_model=PastryResponse)
 async def get_pastry(
     pastry_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    redis_client = Depends(get_optional_redis)
 ):
+    snapshot = await catalog_cache.get(redis_client, lambda: load_catalog_snapshot(db))
+    cached = snapshot.by_id.get(pastry_id)
+    if cached is not None:
+        return JSONResponse(cached)
+    # Deleted pastries, and ones created since the snapshot was built
     pastry = db.query(Pastry).filter(Pastry.id == pastry_id).first()
     if not pastry:
         raise HTTPException(
@@ -102,7 +292,7 @@ async def get_pastry(
             detail="Pastry not found"
         )
     if pastry.is_deleted:
-        pastry.description = f"this pastry was deleted {pastry.description}"
+        pastry.description = deleted_description(pastry.description)
     return pastry
 
 @router.put("/{pastry_id}", response_model=PastryResponse)
@@ -114,7 +304,8 @@ async def update_pastry(
     stock: int = Form(None),
     image: UploadFile = File(None),
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    redis_client = Depends(get_optional_redis)
 ):
     if current_user.get("role") != "admin":
         raise HTTPException(
@@ -129,6 +320,9 @@ async def update_pastry(
             detail="Pastry not found"
         )
     
+    fields = ("name", "description", "price", "stock", "image_url")
+    old_values = {field: getattr(db_pastry, field) for field in fields}
+
     # Update fields if provided
     if name is not None:
         db_pastry.name = name
@@ -150,14 +344,22 @@ async def update_pastry(
         db_pastry.image_url = image_url
     
     db.commit()
-    db.refresh(db_pastry)
+    audit_log.record(
+        AuditEntity.PASTRY, pastry_id, "updated", current_user.get("user_id"),
+        diff(old_values, {field: getattr(db_pastry, field) for field in fields})
+    )
+    typeahead_index.invalidate()
+    await catalog_cache.invalidate(redis_client)
+    if stock is not None and redis_client is not None:
+        await invalidate_levels(redis_client, [pastry_id])
     return db_pastry
 
 @router.delete("/{pastry_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_pastry(
     pastry_id: int,
     db: Session = Depends(get_db),
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    redis_client = Depends(get_optional_redis)
 ):
     if current_user.get("role") != "admin":
         raise HTTPException(
@@ -170,6 +372,10 @@ async def delete_pastry(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Pastry not found"
         )
+    changes = diff({"is_deleted": db_pastry.is_deleted}, {"is_deleted": 1})
     db_pastry.is_deleted = 1
     db.commit()
+    audit_log.record(AuditEntity.PASTRY, pastry_id, "deleted", current_user.get("user_id"), changes)
+    typeahead_index.invalidate()
+    await catalog_cache.invalidate(redis_client)
     return status.HTTP_200_OK
\ No newline at end of file
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from backend.core.profiling import PROFILE_ID_PATTERN, profile_path
+from backend.core.security import get_current_user
+
+router = APIRouter()
+
+@router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    if current_user.get("role") != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only admins can download profiles"
+        )
+    path = profile_path(profile_id)
+    if not PROFILE_ID_PATTERN.match(profile_id) or not path.exists():
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return FileResponse(path, filename=path.name)
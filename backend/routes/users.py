@@ -8,12 +8,13 @@ from backend.database.config import get_db
 from backend.models.user import User
 from backend.schemas.otp import *
 from backend.schemas.user import *
-from backend.utils.email_service import email_service
-from backend.core.security import create_access_token, get_current_user
+from backend.worker.tasks import send_otp_email
+from backend.core.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token, get_current_user
+from backend.core.tokens import issue_refresh_token, revocation_list, revoke_refresh_token, rotate_refresh_token
 from backend.database.database import create_user
 from backend.core.security import hash_password, verify_password
 from redis.client import Redis
-from backend.database.redis_config import get_redis
+from backend.database.redis_config import get_optional_redis, get_redis
 from backend.core.security import generate_otp
 
 
@@ -21,6 +22,22 @@ router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+async def issue_tokens(redis_client, user: User, family: str = None) -> TokenResponse:
+    """
+    A short-lived access token, plus a refresh token when Redis is available.
+    """
+    role = "admin" if user.is_admin else "user"
+    access_token = create_access_token(data={"sub": user.email, "role": role, "user_id": user.id})
+    refresh_token = None
+    if redis_client is not None:
+        refresh_token = await issue_refresh_token(redis_client, user.id, family)
+    return TokenResponse(
+        access_token=access_token,
+        token_type="bearer",
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        refresh_token=refresh_token,
+    )
+
 @router.post("/register", response_model=UserResponse)
 async def register(user_data: UserCreate, db: Session = Depends(get_db), redis_client: Redis = Depends(get_redis)):
     new_user = create_user(db, user_data)
@@ -49,7 +66,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db), redis_c
     await redis_client.hset(redis_key, mapping=otp_data)
     await redis_client.expire(redis_key, expires_in_seconds)
     
-    await email_service.send_otp_email(user_data.email, otp_code, 3)
+    await send_otp_email.enqueue(redis_client, new_user.email, 3)
     return new_user
 
 @router.post("/request-otp", response_model=OTPResponse)
@@ -104,7 +121,7 @@ async def request_otp(otp_request: OTPRequest, db: Session = Depends(get_db), re
     await redis_client.hset(redis_key, mapping=otp_data)
     await redis_client.expire(redis_key, expires_in_seconds)
 
-    await email_service.send_otp_email(otp_request.email, otp_code, 3)
+    await send_otp_email.enqueue(redis_client, user.email, 3)
     return OTPResponse(
         message="OTP sent successfully",
         expires_in=expires_in_seconds
@@ -146,18 +163,13 @@ async def verify_email(verify_data: OTPVerifyRequest, db: Session = Depends(get_
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
-    # Create JWT token
-    access_token = create_access_token(data={"sub": verify_data.email, "role": "user", "user_id": user.id})
-    return TokenResponse(
-        access_token=access_token,
-        token_type="bearer",
-    )
+    return await issue_tokens(redis_client, user)
     
 
     
 
 @router.post("/login", response_model=TokenResponse)
-async def login(request: LoginRequest, db: Session = Depends(get_db)):
+async def login(request: LoginRequest, db: Session = Depends(get_db), redis_client: Redis = Depends(get_optional_redis)):
     # Find user
     user = db.query(User).filter(User.email == request.email).first()
     if user:
@@ -173,10 +185,25 @@ async def login(request: LoginRequest, db: Session = Depends(get_db)):
             detail="User not found"
         )
 
-    role = "admin" if user.is_admin else "user"
-    # Create JWT token
-    access_token = create_access_token(data={"sub": user.email, "role": role, "user_id": user.id})
-    return TokenResponse(access_token=access_token, token_type="bearer")
+    return await issue_tokens(redis_client, user)
+
+@router.post("/refresh", response_model=TokenResponse)
+async def refresh(request: RefreshRequest, db: Session = Depends(get_db), redis_client: Redis = Depends(get_redis)):
+    grant = await rotate_refresh_token(redis_client, request.refresh_token)
+    user = db.query(User).filter(User.id == grant.user_id).first() if grant else None
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token"
+        )
+    return await issue_tokens(redis_client, user, grant.family)
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(request: LogoutRequest, current_user: dict = Depends(get_current_user), redis_client: Redis = Depends(get_optional_redis)):
+    if current_user.get("jti"):
+        await revocation_list.revoke(redis_client, current_user["jti"], current_user["exp"])
+    if request.refresh_token and redis_client is not None:
+        await revoke_refresh_token(redis_client, request.refresh_token)
 
 @router.post("/reset-password", response_model=OTPResponse)
 async def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db), redis_client: Redis = Depends(get_redis)):
@@ -243,6 +270,5 @@ async def update_name(request: UserUpdateUsername, current_user: dict = Depends(
         
     user.name = request.name
     db.commit()
-    db.refresh(user)
     
     return user
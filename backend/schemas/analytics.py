@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Dict, List
+from datetime import date
+
+class PastrySales(BaseModel):
+    pastry_id: int
+    name: str
+    units_sold: float
+    revenue: float
+
+class DailySales(BaseModel):
+    day: date
+    orders_created: int
+    orders_accepted: int
+    orders_rejected: int
+    units_sold: float
+    revenue: float
+
+class DashboardResponse(BaseModel):
+    orders_by_status: Dict[str, int]
+    top_pastries: List[PastrySales]
+    daily: List[DailySales]
@@ -0,0 +1,14 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+class AuditEventResponse(BaseModel):
+    id: int
+    entity_type: str
+    entity_id: int
+    action: str
+    actor_id: Optional[int] = None
+    changes: Dict[str, List[Any]]
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
@@ -1,23 +1,54 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List, Dict, Optional
+from pydantic import BaseModel, ConfigDict, Field, model_serializer
+from typing import List, Optional
 from datetime import datetime
+from enum import Enum
 from backend.models.order import OrderStatus
 
 class OrderItem(BaseModel):
     pastry_id: int
-    quantity: int
+    quantity: int = Field(gt=0)
 
 class OrderCreate(BaseModel):
     address: str
     phone_number: str
-    items: List[OrderItem]
+    items: List[OrderItem] = Field(..., min_length=1)
+
+class OrderExpand(str, Enum):
+    PASTRIES = "pastries"
+
+class OrderPastry(BaseModel):
+    id: int
+    name: str
+    price: float
+    image_url: Optional[str] = None
+    is_deleted: bool
+
+    model_config = ConfigDict(from_attributes=True)
+
+class OrderLine(BaseModel):
+    # Not an OrderItem: stored orders are returned as they are, without re-validating them
+    pastry_id: int
+    quantity: int
+    # Snapshotted when the order is created; absent only on orders not yet backfilled
+    unit_price: Optional[float] = None
+    line_total: Optional[float] = None
+    # Only filled in with ?expand=pastries
+    pastry: Optional[OrderPastry] = None
+
+    @model_serializer(mode="wrap")
+    def _omit_unexpanded_pastry(self, handler):
+        data = handler(self)
+        if self.pastry is None:
+            data.pop("pastry", None)
+        return data
 
 class OrderResponse(BaseModel):
     id: int
     user_id: int
     address: str
     phone_number: str
-    items: List[Dict]
+    items: List[OrderLine]
+    total: Optional[float] = None
     status: OrderStatus
     admin_message: Optional[str] = None
     created_at: datetime
@@ -28,4 +59,18 @@ class OrderResponse(BaseModel):
 
 class OrderUpdate(BaseModel):
     status: OrderStatus
-    admin_message: Optional[str] = None 
\ No newline at end of file
+    admin_message: Optional[str] = None
+
+MAX_BULK_ORDER_UPDATES = 200
+
+class OrderBulkUpdateItem(OrderUpdate):
+    order_id: int
+
+class OrderBulkUpdate(BaseModel):
+    updates: List[OrderBulkUpdateItem] = Field(..., min_length=1, max_length=MAX_BULK_ORDER_UPDATES)
+
+class OrderBulkResult(BaseModel):
+    order_id: int
+    success: bool
+    detail: Optional[str] = None
+    order: Optional[OrderResponse] = None
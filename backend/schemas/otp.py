@@ -1,4 +1,5 @@
 from pydantic import BaseModel, EmailStr
+from typing import Optional
 import enum
 class OTPPurpose(enum.Enum):
     REGISTRATION = "registration"
@@ -15,6 +16,15 @@ class OTPResponse(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str
+    expires_in: int
+    # Missing when Redis is unavailable
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 class ResetPasswordRequest(BaseModel):
     email: EmailStr
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, ConfigDict
+import enum
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List
 
 class PastryBase(BaseModel):
     name: str
@@ -24,4 +25,43 @@ class PastryResponse(PastryBase):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
-    model_config = ConfigDict(from_attributes=True) 
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class PastryImportError(BaseModel):
+    line: int
+    error: str
+
+class PastryImportResponse(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    errors: List[PastryImportError]
+
+class PastrySort(enum.Enum):
+    PRICE_ASC = "price_asc"
+    PRICE_DESC = "price_desc"
+    NEWEST = "newest"
+    NAME = "name"
+
+class SearchMode(enum.Enum):
+    FULL = "full"
+    PREFIX = "prefix"
+
+class PastrySearchResult(BaseModel):
+    id: int
+    name: str
+    image_url: str
+    price: float
+    # Only filled in full-text mode; typeahead answers from memory
+    description: Optional[str] = None
+    stock: Optional[float] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+MAX_BATCH_PASTRIES = 100
+
+class PastryBatchResponse(BaseModel):
+    # In the order requested; deleted pastries are included and also listed in `deleted`
+    pastries: List[PastryResponse]
+    missing: List[int]
+    deleted: List[int]
@@ -0,0 +1,31 @@
+from backend.database.config import engine, get_db
+from backend.database.archive import ARCHIVE_BATCH_SIZE, ORDER_RETENTION_DAYS, archive_orders
+from backend.database.partitioning import ensure_order_partitions
+import backend.models.user  # noqa: F401  (registers the User mapper for Order.user)
+import argparse
+
+# Moves closed orders older than the retention window into orders_archive and,
+# on a partitioned PostgreSQL orders table, creates the upcoming monthly partitions.
+# Meant to run on a schedule, e.g. nightly from cron:
+#
+#   0 3 * * * python -m backend.scripts.archive_orders --retention-days 365
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive closed orders older than the retention window")
+    parser.add_argument("--retention-days", type=int, default=ORDER_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = next(get_db())
+    try:
+        moved = archive_orders(db, args.retention_days, args.batch_size)
+    finally:
+        db.close()
+    print(f"Archived {moved} orders older than {args.retention_days} days.")
+
+    with engine.begin() as conn:
+        if ensure_order_partitions(conn):
+            print("Upcoming order partitions are in place.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from backend.database.config import get_db
+from backend.database.order_pricing import BACKFILL_BATCH_SIZE, backfill_order_totals
+import backend.models.user  # noqa: F401  (registers the User mapper for Order.user)
+import argparse
+
+# Adds unit prices, line totals and the order total to orders created before
+# prices were snapshotted. The orders.total column itself is added at startup.
+#
+#   python -m backend.scripts.backfill_order_totals
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot prices on orders that have none")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = next(get_db())
+    try:
+        print("Pricing orders without a total at current catalog prices...")
+        updated = backfill_order_totals(db, args.batch_size)
+    finally:
+        db.close()
+    print(f"Done. Priced {updated} orders.")
+
+if __name__ == "__main__":
+    main()
@@ -77,7 +77,6 @@ def create_first_admin():
     # Add to database
     db.add(new_admin)
     db.commit()
-    db.refresh(new_admin)
     
     print("\nFirst admin user created successfully!")
     print(f"Email: {email}")
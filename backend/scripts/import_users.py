@@ -0,0 +1,53 @@
+from backend.database.config import get_db
+from backend.utils.catalog_io import detect_format, read_records
+from backend.utils.streaming import ExportFormat
+from backend.utils.user_import import USER_IMPORT_BATCH_SIZE, import_users
+import backend.models.order  # noqa: F401  (registers the Order mapper for User.orders)
+import argparse
+import sys
+
+# Non-interactive bulk creation of user accounts, e.g. staff onboarding or a
+# legacy customer list. Columns: email, name, password, is_admin, is_verified.
+#
+#   python -m backend.scripts.import_users staff.csv
+#   python -m backend.scripts.import_users customers.jsonl --update-existing --workers 8
+
+def print_progress(report):
+    print(f"  {report.processed} rows, {report.rate:.0f} rows/s", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Create users from a CSV/JSON Lines file")
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=[f.value for f in ExportFormat])
+    parser.add_argument("--batch-size", type=int, default=USER_IMPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, help="Password hashing processes (default: one per core)")
+    parser.add_argument("--update-existing", action="store_true", help="Replace name, password and flags of users that already exist")
+    args = parser.parse_args()
+
+    import_format = ExportFormat(args.format) if args.format else detect_format(args.file)
+    if import_format is None:
+        sys.exit("Unknown file format. Use a .csv or .jsonl file or pass --format.")
+
+    db = next(get_db())
+    try:
+        with open(args.file, encoding="utf-8-sig", newline="") as lines:
+            report = import_users(
+                db,
+                read_records(lines, import_format),
+                workers=args.workers,
+                batch_size=args.batch_size,
+                update_existing=args.update_existing,
+                progress=print_progress,
+            )
+    finally:
+        db.close()
+
+    print(
+        f"Created {report.created}, updated {report.updated}, skipped {report.skipped}, failed {report.failed} "
+        f"in {report.elapsed:.1f}s ({report.rate:.0f} rows/s)"
+    )
+    for error in report.errors:
+        print(f"  line {error['line']}: {error['error']}")
+
+if __name__ == "__main__":
+    main()
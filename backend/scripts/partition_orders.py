@@ -0,0 +1,21 @@
+from backend.database.config import engine
+from backend.database.partitioning import PARTITIONS_AHEAD, convert_orders_to_partitioned
+import argparse
+
+# One-off conversion of the orders table to monthly range partitions on
+# created_at (PostgreSQL only). Locks orders for the duration of the copy,
+# so run it during a maintenance window:
+#
+#   python -m backend.scripts.partition_orders
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert orders into a table partitioned by month")
+    parser.add_argument("--months-ahead", type=int, default=PARTITIONS_AHEAD, help="Future months to create partitions for")
+    args = parser.parse_args()
+
+    with engine.begin() as conn:
+        convert_orders_to_partitioned(conn, args.months_ahead)
+    print("orders is partitioned by month.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from backend.database.config import get_db
+from backend.utils.catalog_io import CATALOG_FIELDS, detect_format, import_pastries, iter_catalog, read_records
+from backend.utils.streaming import ExportFormat, export_chunks
+import argparse
+import sys
+import time
+
+# Bulk import/export of the pastry catalog.
+#
+#   python -m backend.scripts.pastry_catalog import menu.csv
+#   python -m backend.scripts.pastry_catalog export --format ndjson -o menu.jsonl
+
+def import_catalog(args):
+    import_format = ExportFormat(args.format) if args.format else detect_format(args.file)
+    if import_format is None:
+        sys.exit("Unknown file format. Use a .csv or .jsonl file or pass --format.")
+
+    db = next(get_db())
+    started = time.perf_counter()
+    with open(args.file, encoding="utf-8-sig", newline="") as lines:
+        report = import_pastries(db, read_records(lines, import_format), batch_size=args.batch_size)
+    elapsed = time.perf_counter() - started
+
+    print(f"Created {report.created}, updated {report.updated}, failed {report.failed} in {elapsed:.1f}s")
+    for error in report.errors:
+        print(f"  line {error['line']}: {error['error']}")
+
+def export_catalog(args):
+    export_format = ExportFormat(args.format)
+    db = next(get_db())
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        for chunk in export_chunks(iter_catalog(db, args.include_deleted), CATALOG_FIELDS, export_format):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of the pastry catalog")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Create or update pastries from a CSV/JSON Lines file")
+    importer.add_argument("file")
+    importer.add_argument("--format", choices=[f.value for f in ExportFormat])
+    importer.add_argument("--batch-size", type=int, default=500)
+    importer.set_defaults(handler=import_catalog)
+
+    exporter = commands.add_parser("export", help="Write the catalog as CSV/JSON Lines")
+    exporter.add_argument("--format", choices=[f.value for f in ExportFormat], default=ExportFormat.CSV.value)
+    exporter.add_argument("-o", "--output", help="Output file (default: stdout)")
+    exporter.add_argument("--include-deleted", action="store_true")
+    exporter.set_defaults(handler=export_catalog)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+from backend.database.config import get_db
+from backend.database.rollups import rebuild_rollups
+import backend.models.user  # noqa: F401  (registers the User mapper for Order.user)
+
+
+def main():
+    # Get database session
+    db = next(get_db())
+
+    print("Rebuilding analytics rollups from the orders table...")
+    scanned = rebuild_rollups(db)
+    print(f"Done. Scanned {scanned} orders.")
+
+if __name__ == "__main__":
+    main()
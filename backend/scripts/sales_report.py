@@ -0,0 +1,29 @@
+from backend.database.config import get_db
+from backend.utils.sales_report import REPORT_BATCH_SIZE, SALES_REPORT_DIR, build_sales_report
+import backend.models.user  # noqa: F401  (registers the User mapper for Order.user)
+import argparse
+from pathlib import Path
+
+# Brings the offline sales report up to date. The worker also runs this every
+# SALES_REPORT_INTERVAL_SECONDS; run it by hand after a bulk change or with
+# --full to rebuild every day.
+#
+#   python -m backend.scripts.sales_report
+#   python -m backend.scripts.sales_report --full --output /data/reports/sales
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the daily/monthly sales report")
+    parser.add_argument("--output", type=Path, default=SALES_REPORT_DIR)
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and rebuild every day")
+    parser.add_argument("--batch-size", type=int, default=REPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = next(get_db())
+    try:
+        result = build_sales_report(db, args.output, full=args.full, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Done. Rebuilt {result.days} days from {result.orders} orders into {args.output}.")
+
+if __name__ == "__main__":
+    main()
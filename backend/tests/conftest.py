@@ -1,4 +1,6 @@
+import anyio
 import pytest
+import fakeredis
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -7,8 +9,13 @@ from backend.database.config import Base
 from backend.main import app
 from backend.database.config import get_db
 from backend.models.user import User
+from backend.models.pastry import Pastry
 from backend.core.security import hash_password, create_access_token
 from backend.core.security import create_access_token
+from backend.database.profiler import assert_max_queries as _assert_max_queries
+from backend.utils.catalog_cache import catalog_cache
+from backend.utils.audit import audit_log
+from functools import partial
 
 # Create test database
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -18,7 +25,21 @@ engine = create_engine(
     connect_args={"check_same_thread": False},
     poolclass=StaticPool,
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+@pytest.fixture(autouse=True)
+def reset_catalog_cache():
+    # Every test starts with a fresh database, so no snapshot may carry over
+    catalog_cache.invalidate_local()
+    yield
+    catalog_cache.invalidate_local()
+
+@pytest.fixture(autouse=True)
+def reset_audit_log():
+    # The flusher isn't running in tests; tests drain the buffer themselves
+    audit_log.drain()
+    yield
+    audit_log.drain()
 
 @pytest.fixture(scope="function")
 def db():
@@ -39,9 +60,28 @@ def client(db):
             db.close()
     
     app.dependency_overrides[get_db] = override_get_db
-    yield TestClient(app)
+    # Run every request on one event loop, so loop-bound async clients
+    # (such as the fake Redis below) can be shared between requests.
+    with anyio.from_thread.start_blocking_portal() as portal:
+        test_client = TestClient(app)
+        test_client.portal = portal
+        yield test_client
     app.dependency_overrides.clear()
 
+@pytest.fixture(scope="function")
+def assert_max_queries(db):
+    """
+    `with assert_max_queries(n): ...` fails when the block runs more than n SQL statements.
+    """
+    return partial(_assert_max_queries, engine)
+
+@pytest.fixture(scope="function")
+def redis_client():
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    app.state.redis = redis_client
+    yield redis_client
+    app.state.redis = None
+
 @pytest.fixture(scope="function")
 def test_user(db):
     user_data = {
@@ -76,4 +116,33 @@ def authorized_client(client, test_user_token):
         **client.headers,
         "Authorization": f"Bearer {test_user_token}"
     }
-    return client 
\ No newline at end of file
+    return client 
+
+@pytest.fixture(scope="function")
+def auth_headers(test_user):
+    token = create_access_token(data={"sub": test_user["email"], "role": "user", "user_id": test_user["id"]})
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture(scope="function")
+def admin_headers(db):
+    admin = User(
+        email="admin@resend.dev",
+        password=hash_password("adminpass123"),
+        name="Admin User",
+        is_verified=True,
+        is_admin=True
+    )
+    db.add(admin)
+    db.commit()
+    token = create_access_token(data={"sub": admin.email, "role": "admin", "user_id": admin.id})
+    return {"Authorization": f"Bearer {token}"}
+
+@pytest.fixture(scope="function")
+def test_pastries(db):
+    pastries = [
+        Pastry(name="Baklava", description="Walnut and honey", image_url="uploads/pastries/baklava.jpg", price=12.5, stock=10),
+        Pastry(name="Zoolbia", description="Saffron syrup", image_url="uploads/pastries/zoolbia.jpg", price=4.0, stock=3),
+    ]
+    db.add_all(pastries)
+    db.commit()
+    return [{"id": p.id, "name": p.name, "price": p.price, "stock": p.stock} for p in pastries]
@@ -0,0 +1,326 @@
+import csv
+import io
+import json
+import time
+
+import pytest
+
+from backend.database.rollups import rebuild_rollups
+
+
+def _new_order(client, headers, items):
+    return client.post("/order/new", headers=headers, json={
+        "address": "Tehran, Enghelab St.",
+        "phone_number": "09120000000",
+        "items": items,
+    })
+
+def test_dashboard_tracks_orders_incrementally(client, db, auth_headers, admin_headers, test_pastries):
+    baklava, zoolbia = test_pastries
+    first = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 2}, {"pastry_id": zoolbia["id"], "quantity": 1}])
+    second = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 1}])
+    assert first.status_code == 200 and second.status_code == 200
+
+    response = client.patch(f"/order/orders/{first.json()['id']}", headers=admin_headers, json={"status": "accepted"})
+    assert response.status_code == 200
+    response = client.patch(f"/order/orders/{second.json()['id']}", headers=admin_headers, json={"status": "rejected"})
+    assert response.status_code == 200
+
+    dashboard = client.get("/analytics/dashboard", headers=admin_headers).json()
+    assert dashboard["orders_by_status"] == {"pending": 0, "accepted": 1, "rejected": 1}
+    assert dashboard["top_pastries"][0] == {"pastry_id": baklava["id"], "name": "Baklava", "units_sold": 2, "revenue": 25.0}
+    [today] = dashboard["daily"]
+    assert (today["orders_created"], today["orders_accepted"], today["orders_rejected"]) == (2, 1, 1)
+    assert today["revenue"] == 29.0
+
+    # A rebuild from scratch must agree with the incremental rollups
+    rebuild_rollups(db)
+    assert client.get("/analytics/dashboard", headers=admin_headers).json() == dashboard
+
+def test_dashboard_window_uses_utc_days(client, db, admin_headers, monkeypatch):
+    from datetime import date, datetime, timezone
+    import backend.routes.analytics as analytics_routes
+    from backend.models.analytics import DailySalesRollup
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            # 01:30 on March 2nd in Tehran, still March 1st in UTC
+            return datetime(2026, 3, 1, 22, 0, tzinfo=timezone.utc).astimezone(tz)
+
+    monkeypatch.setattr(analytics_routes, "datetime", Clock)
+    db.add_all([DailySalesRollup(day=date(2026, 2, day)) for day in (27, 28)] + [DailySalesRollup(day=date(2026, 3, 1))])
+    db.commit()
+
+    dashboard = client.get("/analytics/dashboard?days=2", headers=admin_headers).json()
+    assert [row["day"] for row in dashboard["daily"]] == ["2026-02-28", "2026-03-01"]
+
+def test_message_edits_do_not_move_a_decision_to_another_day(client, db, auth_headers, admin_headers, test_pastries, monkeypatch):
+    from datetime import datetime, timezone
+    import backend.database.rollups as rollups
+    import backend.models.order as order_model
+    import backend.routes.analytics as analytics_routes
+
+    now = [datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)]
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now[0].astimezone(tz)
+
+    for module in (rollups, order_model, analytics_routes):
+        monkeypatch.setattr(module, "datetime", Clock)
+
+    order_id = _new_order(client, auth_headers, [{"pastry_id": test_pastries[0]["id"], "quantity": 2}]).json()["id"]
+    client.patch(f"/order/orders/{order_id}", headers=admin_headers, json={"status": "accepted"})
+    now[0] = datetime(2026, 3, 2, 10, 0, tzinfo=timezone.utc)
+    client.patch(f"/order/orders/{order_id}", headers=admin_headers, json={"status": "accepted", "admin_message": "On its way"})
+    now[0] = datetime(2026, 3, 3, 10, 0, tzinfo=timezone.utc)
+    client.patch(f"/order/orders/{order_id}", headers=admin_headers, json={"status": "rejected"})
+
+    dashboard = client.get("/analytics/dashboard", headers=admin_headers).json()
+    days = {row["day"]: (row["orders_accepted"], row["orders_rejected"], row["revenue"]) for row in dashboard["daily"]}
+    assert days == {"2026-03-01": (0, 0, 0.0), "2026-03-03": (0, 1, 0.0)}
+
+    rebuild_rollups(db)
+    rebuilt = client.get("/analytics/dashboard", headers=admin_headers).json()
+    assert {row["day"]: (row["orders_accepted"], row["orders_rejected"], row["revenue"]) for row in rebuilt["daily"]} == days
+
+def test_dashboard_requires_admin(client, auth_headers):
+    response = client.get("/analytics/dashboard", headers=auth_headers)
+    assert response.status_code == 403
+
+def test_idempotency_key_replays_first_response(client, db, auth_headers, redis_client, test_pastries):
+    from backend.models.order import Order
+
+    headers = {**auth_headers, "Idempotency-Key": "checkout-42"}
+    items = [{"pastry_id": test_pastries[0]["id"], "quantity": 1}]
+    first = _new_order(client, headers, items)
+    retry = _new_order(client, headers, items)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.query(Order).count() == 1
+
+    # Reusing the key for a different order is a client error
+    other = _new_order(client, headers, [{"pastry_id": test_pastries[0]["id"], "quantity": 2}])
+    assert other.status_code == 422
+
+def test_idempotency_key_is_not_stored_for_failed_requests(client, auth_headers, redis_client, test_pastries):
+    headers = {**auth_headers, "Idempotency-Key": "checkout-43"}
+    too_many = [{"pastry_id": test_pastries[1]["id"], "quantity": 50}]
+    assert _new_order(client, headers, too_many).status_code == 400
+    assert _new_order(client, headers, too_many).status_code == 400
+
+def test_bulk_update_reports_each_order(client, db, auth_headers, admin_headers, test_pastries):
+    from backend.models.pastry import Pastry
+
+    baklava, zoolbia = test_pastries
+    ids = [
+        _new_order(client, auth_headers, [{"pastry_id": zoolbia["id"], "quantity": 2}, {"pastry_id": baklava["id"], "quantity": 1}]).json()["id"],
+        _new_order(client, auth_headers, [{"pastry_id": zoolbia["id"], "quantity": 2}]).json()["id"],
+        _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 4}]).json()["id"],
+    ]
+
+    response = client.patch("/order/orders", headers=admin_headers, json={"updates": [
+        {"order_id": ids[0], "status": "accepted"},
+        {"order_id": ids[1], "status": "accepted"},  # only 1 zoolbia left
+        {"order_id": ids[2], "status": "rejected", "admin_message": "Closed today"},
+        {"order_id": 9999, "status": "accepted"},
+    ]})
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["success"] for r in results] == [True, False, True, False]
+    assert results[1]["detail"] == "Insufficient quantity for pastry Zoolbia"
+    assert results[2]["order"]["admin_message"] == "Closed today"
+    assert results[3]["detail"] == "Order not found"
+
+    db.expire_all()
+    assert db.get(Pastry, zoolbia["id"]).stock == 1
+    assert db.get(Pastry, baklava["id"]).stock == 9
+
+def test_order_listing_runs_one_query(client, auth_headers, test_pastries, assert_max_queries):
+    for _ in range(3):
+        _new_order(client, auth_headers, [{"pastry_id": test_pastries[0]["id"], "quantity": 1}])
+
+    with assert_max_queries(1):
+        response = client.get("/order/orders", headers=auth_headers)
+    assert len(response.json()) == 3
+
+def test_expanded_orders_resolve_pastries_in_one_query(client, auth_headers, test_pastries, assert_max_queries):
+    baklava, zoolbia = test_pastries
+    for _ in range(3):
+        _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 1}, {"pastry_id": zoolbia["id"], "quantity": 2}])
+
+    with assert_max_queries(2):
+        response = client.get("/order/orders", params={"expand": "pastries"}, headers=auth_headers)
+    lines = [line for order in response.json() for line in order["items"]]
+    assert len(lines) == 6
+    assert {line["pastry"]["name"] for line in lines} == {"Baklava", "Zoolbia"}
+    assert lines[0]["pastry"] == {"id": baklava["id"], "name": "Baklava", "price": 12.5, "image_url": "uploads/pastries/baklava.jpg", "is_deleted": False}
+
+    order_id = response.json()[0]["id"]
+    assert "pastry" not in client.get(f"/order/orders/{order_id}", headers=auth_headers).json()["items"][0]
+    expanded = client.get(f"/order/orders/{order_id}", params={"expand": "pastries"}, headers=auth_headers).json()
+    assert expanded["items"][1]["pastry"]["name"] == "Zoolbia"
+
+def test_export_streams_filtered_orders(client, auth_headers, admin_headers, test_pastries):
+    baklava = test_pastries[0]
+    first = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 1}]).json()
+    second = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 2}]).json()
+    client.patch(f"/order/orders/{second['id']}", headers=admin_headers, json={"status": "accepted"})
+
+    response = client.get("/order/export", params={"format": "ndjson", "status": "accepted"}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(row["id"], row["status"], row["items"], row["total"]) for row in rows] == [
+        (second["id"], "accepted", second["items"], 25.0)
+    ]
+
+    response = client.get("/order/export", params={"start": first["created_at"]}, headers=admin_headers)
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(row["id"]) for row in rows] == [first["id"], second["id"]]
+    assert json.loads(rows[0]["items"]) == first["items"]
+
+    response = client.get("/order/export", params={"start": second["created_at"], "end": first["created_at"]}, headers=admin_headers)
+    assert response.status_code == 400
+
+def test_export_requires_admin(client, auth_headers):
+    assert client.get("/order/export", headers=auth_headers).status_code == 403
+
+def test_archived_orders_are_still_readable(client, db, auth_headers, admin_headers, test_pastries):
+    from backend.database.archive import archive_orders
+
+    baklava = test_pastries[0]
+    closed = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 2}]).json()
+    pending = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 1}]).json()
+    client.patch(f"/order/orders/{closed['id']}", headers=admin_headers, json={"status": "accepted"})
+    dashboard = client.get("/analytics/dashboard", headers=admin_headers).json()
+
+    # Pending orders stay put however old they are
+    assert archive_orders(db, retention_days=0) == 1
+    assert [order["id"] for order in client.get("/order/orders", headers=admin_headers).json()] == [pending["id"]]
+
+    response = client.get(f"/order/orders/{closed['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["items"]) == ("accepted", closed["items"])
+
+    rebuild_rollups(db)
+    assert client.get("/analytics/dashboard", headers=admin_headers).json() == dashboard
+
+def test_pending_orders_hold_stock(client, db, auth_headers, admin_headers, redis_client, test_pastries):
+    from backend.models.pastry import Pastry
+    from backend.utils.stock_holds import held_key, release_expired_holds
+
+    zoolbia = test_pastries[1]  # 3 in stock
+    two = [{"pastry_id": zoolbia["id"], "quantity": 2}]
+    first = _new_order(client, auth_headers, two)
+    assert first.status_code == 200
+    # Only one is left unheld, although the database still says 3
+    assert _new_order(client, auth_headers, two).status_code == 400
+    assert _new_order(client, auth_headers, [{"pastry_id": 999, "quantity": 1}]).status_code == 404
+
+    client.patch(f"/order/orders/{first.json()['id']}", headers=admin_headers, json={"status": "rejected"})
+    second = _new_order(client, auth_headers, two)
+    assert second.status_code == 200
+
+    client.patch(f"/order/orders/{second.json()['id']}", headers=admin_headers, json={"status": "accepted"})
+    db.expire_all()
+    assert db.get(Pastry, zoolbia["id"]).stock == 1
+    assert client.portal.call(redis_client.get, held_key(zoolbia["id"])) == "0"
+    assert _new_order(client, auth_headers, two).status_code == 400
+
+    assert _new_order(client, auth_headers, [{"pastry_id": zoolbia["id"], "quantity": 1}]).status_code == 200
+    assert client.portal.call(redis_client.get, held_key(zoolbia["id"])) == "1"
+    assert client.portal.call(release_expired_holds, redis_client, time.time() + 10 ** 6) == 1
+    assert client.portal.call(redis_client.get, held_key(zoolbia["id"])) == "0"
+
+def test_orders_need_positive_quantities(client, auth_headers, redis_client, test_pastries):
+    from backend.utils.stock_holds import held_key
+
+    baklava = test_pastries[0]
+    for quantity in (0, -10):
+        assert _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": quantity}]).status_code == 422
+    assert _new_order(client, auth_headers, []).status_code == 422
+    assert client.portal.call(redis_client.get, held_key(baklava["id"])) is None
+
+def test_failed_order_insert_releases_its_hold(client, auth_headers, redis_client, test_pastries, monkeypatch):
+    import backend.routes.order as order_routes
+    from backend.utils.stock_holds import held_key
+
+    def failing_rollup(db, order):
+        raise RuntimeError("rollup upsert failed")
+
+    monkeypatch.setattr(order_routes, "record_order_created", failing_rollup)
+    baklava = test_pastries[0]
+    with pytest.raises(RuntimeError):
+        _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 2}])
+    assert client.portal.call(redis_client.get, held_key(baklava["id"])) == "0"
+
+def test_orders_snapshot_prices(client, db, auth_headers, admin_headers, test_pastries):
+    from backend.database.order_pricing import backfill_order_totals
+    from backend.models.order import Order
+
+    baklava, zoolbia = test_pastries
+    order = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 2}, {"pastry_id": zoolbia["id"], "quantity": 1}]).json()
+    assert order["items"] == [
+        {"pastry_id": baklava["id"], "quantity": 2, "unit_price": 12.5, "line_total": 25.0},
+        {"pastry_id": zoolbia["id"], "quantity": 1, "unit_price": 4.0, "line_total": 4.0},
+    ]
+    assert order["total"] == 29.0
+
+    # Later price changes do not touch existing orders or their revenue
+    client.put(f"/pastries/{baklava['id']}", headers=admin_headers, data={"price": 20})
+    client.patch(f"/order/orders/{order['id']}", headers=admin_headers, json={"status": "accepted"})
+    assert client.get(f"/order/orders/{order['id']}", headers=auth_headers).json()["total"] == 29.0
+    assert client.get("/analytics/dashboard", headers=admin_headers).json()["daily"][0]["revenue"] == 29.0
+
+    # Orders from before snapshots are priced by the backfill
+    legacy = Order(user_id=order["user_id"], address="Old St.", phone_number="0912", items=[{"pastry_id": zoolbia["id"], "quantity": 3}])
+    db.add(legacy)
+    db.commit()
+    assert backfill_order_totals(db) == 1
+    response = client.get(f"/order/orders/{legacy.id}", headers=auth_headers).json()
+    assert (response["items"][0]["line_total"], response["total"]) == (12.0, 12.0)
+
+def test_order_writes_skip_the_refresh_select(client, auth_headers, admin_headers, test_pastries, assert_max_queries):
+    baklava = test_pastries[0]
+    # Pastry lookup, two rollup upserts and the INSERT
+    with assert_max_queries(4):
+        created = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 1}])
+    assert created.json()["created_at"] is not None
+    # Order and pastry lookups, three rollup upserts and the two UPDATEs
+    with assert_max_queries(7):
+        accepted = client.patch(f"/order/orders/{created.json()['id']}", headers=admin_headers, json={"status": "accepted"})
+    assert accepted.json()["status"] == "accepted"
+
+def test_status_and_stock_changes_are_audited(client, db, auth_headers, admin_headers, test_pastries):
+    from backend.utils.audit import audit_log, write_events
+
+    baklava, zoolbia = test_pastries
+    order_id = _new_order(client, auth_headers, [{"pastry_id": baklava["id"], "quantity": 2}, {"pastry_id": baklava["id"], "quantity": 1}]).json()["id"]
+    other_id = _new_order(client, auth_headers, [{"pastry_id": zoolbia["id"], "quantity": 1}]).json()["id"]
+    client.patch(f"/order/orders/{order_id}", headers=admin_headers, json={"status": "accepted"})
+    client.patch("/order/orders", headers=admin_headers, json={"updates": [
+        {"order_id": other_id, "status": "accepted", "admin_message": "Enjoy"},
+    ]})
+
+    # Requests only buffer the events; write them as the flusher would
+    events = audit_log.drain()
+    assert [(e["entity_type"], e["action"]) for e in events] == [
+        ("order", "status_changed"), ("pastry", "stock_decremented"),
+        ("order", "status_changed"), ("pastry", "stock_decremented"),
+    ]
+    write_events(db, events)
+    db.commit()
+
+    trail = client.get(f"/audit/pastry/{baklava['id']}", headers=admin_headers).json()
+    assert [(e["action"], e["changes"]) for e in trail] == [("stock_decremented", {"stock": [10, 7]})]
+    trail = client.get(f"/audit/order/{other_id}", headers=admin_headers).json()
+    assert trail[0]["changes"] == {"status": ["pending", "accepted"], "admin_message": [None, "Enjoy"]}
+    assert trail[0]["actor_id"] is not None
+
+    assert client.get(f"/audit/order/{other_id}", headers=auth_headers).status_code == 403
+    assert client.get(f"/audit/user/{other_id}", headers=admin_headers).status_code == 422
@@ -0,0 +1,248 @@
+import json
+from functools import partial
+
+import pytest
+
+from backend.utils.typeahead import typeahead_index
+
+
+@pytest.fixture(autouse=True)
+def fresh_typeahead_index():
+    # The index is process-wide; don't let it outlive a test's database
+    typeahead_index.invalidate()
+
+
+def test_import_upserts_and_reports_errors(client, admin_headers, test_pastries):
+    baklava = test_pastries[0]
+    csv_file = (
+        "id,name,description,image_url,price,stock\n"
+        f"{baklava['id']},,,,13.0,\n"
+        ",Gaz,Pistachio nougat,,20,5\n"
+        ",Sohan,,,not-a-number,1\n"
+        "9999,Ghost,,,1,1\n"
+    )
+    response = client.post(
+        "/pastries/import",
+        headers=admin_headers,
+        files={"file": ("menu.csv", csv_file, "text/csv")},
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 2)
+    assert [e["line"] for e in report["errors"]] == [4, 5]
+
+    updated = client.get(f"/pastries/{baklava['id']}").json()
+    assert updated["price"] == 13.0 and updated["name"] == "Baklava"
+
+    # Audited in the import's own transaction, no flush needed
+    trail = client.get(f"/audit/pastry/{baklava['id']}", headers=admin_headers).json()
+    assert [(e["action"], e["changes"]) for e in trail] == [("imported", {"price": [12.5, 13.0]})]
+
+def test_pastry_updates_and_deletes_are_audited(client, admin_headers, test_pastries):
+    from backend.utils.audit import audit_log
+
+    baklava = test_pastries[0]
+    client.put(f"/pastries/{baklava['id']}", headers=admin_headers, data={"stock": 4, "name": "Baklava"})
+    client.delete(f"/pastries/{baklava['id']}", headers=admin_headers)
+
+    events = audit_log.drain()
+    assert [(e["action"], e["changes"]) for e in events] == [
+        ("updated", {"stock": [10, 4]}),
+        ("deleted", {"is_deleted": [0, 1]}),
+    ]
+
+def test_export_streams_active_catalog(client, admin_headers, test_pastries):
+    client.delete(f"/pastries/{test_pastries[1]['id']}", headers=admin_headers)
+
+    response = client.get("/pastries/export?format=ndjson", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["name"] for row in rows] == ["Baklava"]
+
+def test_full_text_search_ranks_and_skips_deleted(client, admin_headers, test_pastries):
+    client.post(
+        "/pastries/import",
+        headers=admin_headers,
+        files={"file": ("menu.jsonl", '{"name": "Walnut cookie", "description": "Crunchy", "price": 3, "stock": 9}\n', "application/x-ndjson")},
+    )
+    results = client.get("/pastries/search", params={"q": "walnut"}).json()
+    assert [r["name"] for r in results] == ["Walnut cookie", "Baklava"]
+
+    client.delete(f"/pastries/{test_pastries[0]['id']}", headers=admin_headers)
+    results = client.get("/pastries/search", params={"q": "walnut"}).json()
+    assert [r["name"] for r in results] == ["Walnut cookie"]
+
+def test_prefix_typeahead_refreshes_on_catalog_changes(client, admin_headers, test_pastries):
+    assert [r["name"] for r in client.get("/pastries/search", params={"q": "ba", "mode": "prefix"}).json()] == ["Baklava"]
+
+    client.post(
+        "/pastries/import",
+        headers=admin_headers,
+        files={"file": ("menu.csv", "name,price,stock\nBamieh Shirazi,5,5\n", "text/csv")},
+    )
+    results = client.get("/pastries/search", params={"q": "ba", "mode": "prefix"}).json()
+    assert [r["name"] for r in results] == ["Baklava", "Bamieh Shirazi"]
+    assert [r["name"] for r in client.get("/pastries/search", params={"q": "bam shi", "mode": "prefix"}).json()] == ["Bamieh Shirazi"]
+
+def test_catalog_filters_and_sorts(client, db, admin_headers, test_pastries):
+    from backend.models.pastry import Pastry
+
+    db.add(Pastry(name="Gaz", description="Nougat", image_url="", price=20.0, stock=0))
+    db.commit()
+
+    names = lambda **params: [p["name"] for p in client.get("/pastries/", params=params).json()]
+    assert names(sort="price_desc") == ["Gaz", "Baklava", "Zoolbia"]
+    assert names(sort="price_asc", in_stock=True) == ["Zoolbia", "Baklava"]
+    assert names(min_price=5, max_price=15) == ["Baklava"]
+    assert names(sort="name", limit=2, skip=1) == ["Gaz", "Zoolbia"]
+
+def test_no_catalog_query_falls_back_to_a_table_scan(db):
+    import itertools
+    from sqlalchemy import insert, text
+    from sqlalchemy.dialects import sqlite
+    from backend.models.pastry import Pastry
+    from backend.routes.pastries import filter_catalog
+    from backend.schemas.pastry import PastrySort
+
+    db.execute(insert(Pastry), [
+        {"name": f"Pastry {i}", "description": "", "image_url": "", "price": i % 500,
+         "stock": i % 7, "is_deleted": int(i % 10 == 0)}
+        for i in range(100_000)
+    ])
+    db.execute(text("ANALYZE"))
+
+    for min_price, max_price, in_stock, sort in itertools.product(
+        (None, 10), (None, 200), (False, True), (None, *PastrySort)
+    ):
+        query = filter_catalog(db.query(Pastry), min_price, max_price, in_stock, sort).offset(20).limit(20)
+        compiled = query.statement.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True})
+        plan = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        details = [row[-1] for row in plan]
+        assert not any(d.startswith("SCAN pastries") and "INDEX" not in d for d in details), (
+            min_price, max_price, in_stock, sort, details
+        )
+
+def test_batch_lookup_keeps_order_and_reports_gaps(client, db, admin_headers, test_pastries, assert_max_queries):
+    from backend.models.pastry import Pastry
+
+    baklava, zoolbia = test_pastries
+    client.delete(f"/pastries/{zoolbia['id']}", headers=admin_headers)
+
+    with assert_max_queries(1):
+        response = client.get("/pastries/batch", params={"ids": f"{zoolbia['id']},999,{baklava['id']},{zoolbia['id']}"})
+    body = response.json()
+    assert [pastry["name"] for pastry in body["pastries"]] == ["Zoolbia", "Baklava"]
+    assert body["pastries"][0]["description"] == "this pastry was deleted Saffron syrup"
+    assert (body["missing"], body["deleted"]) == ([999], [zoolbia["id"]])
+
+    # The marking is never written back to the database
+    db.expire_all()
+    assert db.get(Pastry, zoolbia["id"]).description == "Saffron syrup"
+
+    assert client.get("/pastries/batch", params={"ids": "1,x"}).status_code == 422
+    assert client.get("/pastries/batch", params={"ids": ",".join(map(str, range(101)))}).status_code == 422
+
+def test_admin_creates_pastry_with_image(client, admin_headers, tmp_path, monkeypatch):
+    import backend.routes.pastries as pastries_routes
+
+    monkeypatch.setattr(pastries_routes, "UPLOAD_DIR", tmp_path)
+    response = client.post(
+        "/pastries/",
+        headers=admin_headers,
+        data={"name": "Gaz", "description": "Nougat", "price": 20, "stock": 5},
+        files={"image": ("gaz.jpg", b"\xff\xd8\xff", "image/jpeg")},
+    )
+    assert response.status_code == 201
+    assert client.get(f"/pastries/{response.json()['id']}").json()["name"] == "Gaz"
+
+def test_catalog_snapshot_is_shared_and_refreshed_on_writes(client, db, admin_headers, test_pastries, redis_client, assert_max_queries):
+    default_page = client.get("/pastries/", headers={"Accept-Encoding": "gzip"})
+    assert default_page.headers["content-encoding"] == "gzip"
+    assert [p["name"] for p in default_page.json()] == ["Baklava", "Zoolbia"]
+    assert client.get("/pastries/").json() == default_page.json()
+
+    with assert_max_queries(0):
+        assert client.get(f"/pastries/{test_pastries[0]['id']}").json()["price"] == 12.5
+        assert [p["name"] for p in client.get("/pastries/", params={"sort": "price_asc"}).json()] == ["Zoolbia", "Baklava"]
+
+    client.put(f"/pastries/{test_pastries[0]['id']}", headers=admin_headers, data={"price": 3})
+    assert [p["name"] for p in client.get("/pastries/", params={"sort": "price_asc"}).json()] == ["Baklava", "Zoolbia"]
+    client.delete(f"/pastries/{test_pastries[1]['id']}", headers=admin_headers)
+    assert [p["name"] for p in client.get("/pastries/").json()] == ["Baklava"]
+    assert client.get(f"/pastries/{test_pastries[1]['id']}").json()["description"].startswith("this pastry was deleted")
+
+@pytest.mark.asyncio
+async def test_concurrent_catalog_misses_build_the_snapshot_once():
+    import asyncio
+
+    import fakeredis
+
+    from backend.utils.catalog_cache import CatalogCache, CatalogSnapshot
+
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    builds = []
+
+    def loader():
+        builds.append(1)
+        return CatalogSnapshot([{"id": 1, "name": "Baklava", "price": 12.5, "stock": 10}], {"default": [1]})
+
+    # Two workers, each with several requests missing at once
+    workers = [CatalogCache(), CatalogCache()]
+    assert not any(worker.ready for worker in workers)
+    snapshots = await asyncio.gather(*(worker.get(redis, loader) for worker in workers for _ in range(5)))
+
+    assert len(builds) == 1
+    assert {s.by_id[1]["name"] for s in snapshots} == {"Baklava"}
+    assert all(worker.ready for worker in workers)
+
+    await workers[0].invalidate(redis)
+    await workers[0].get(redis, loader)
+    assert len(builds) == 2
+
+def test_ready_after_catalog_warm_up(client, db, test_pastries):
+    from backend.routes.pastries import load_catalog_snapshot
+    from backend.utils.catalog_cache import catalog_cache
+
+    catalog_cache.ready = False
+    assert client.get("/ready").status_code == 503
+    client.portal.call(catalog_cache.warm_up, None, lambda: load_catalog_snapshot(db))
+    assert client.get("/ready").status_code == 200
+
+def test_catalog_warm_up_retries_until_it_succeeds(client, db, test_pastries):
+    from backend.routes.pastries import load_catalog_snapshot
+    from backend.utils.catalog_cache import catalog_cache
+
+    attempts = []
+
+    def loader():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("the database system is starting up")
+        return load_catalog_snapshot(db)
+
+    catalog_cache.ready = False
+    client.portal.call(partial(catalog_cache.warm_up, None, loader, retry_seconds=0.01))
+    assert len(attempts) == 2
+    assert client.get("/ready").status_code == 200
+
+def test_pastry_writes_run_one_statement_each(client, admin_headers, test_pastries, tmp_path, monkeypatch, assert_max_queries):
+    import backend.routes.pastries as pastries_routes
+
+    monkeypatch.setattr(pastries_routes, "UPLOAD_DIR", tmp_path)
+    baklava, zoolbia = test_pastries
+    # INSERT ... RETURNING; no SELECT to refresh the new row
+    with assert_max_queries(1):
+        created = client.post(
+            "/pastries/",
+            headers=admin_headers,
+            data={"name": "Gaz", "description": "Nougat", "price": 20, "stock": 5},
+            files={"image": ("gaz.jpg", b"\xff\xd8\xff", "image/jpeg")},
+        )
+    assert created.json()["created_at"] is not None
+    # The lookup, then UPDATE ... RETURNING
+    with assert_max_queries(2):
+        updated = client.put(f"/pastries/{baklava['id']}", headers=admin_headers, data={"price": 13})
+    assert updated.json()["updated_at"] is not None
+    with assert_max_queries(2):
+        assert client.delete(f"/pastries/{zoolbia['id']}", headers=admin_headers).status_code == 204
@@ -1,3 +1,10 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from backend.core.tokens import RevocationList
+
 # import pytest
 # from fastapi import status
 # from datetime import datetime, timedelta, timezone
@@ -170,4 +177,59 @@
     
 #     response = client.post("/users/verify-email", json=verify_data)
 #     assert response.status_code == 400
-#     assert "Invalid or expired OTP" in response.json()["detail"] 
\ No newline at end of file
+#     assert "Invalid or expired OTP" in response.json()["detail"] 
+
+def _login(client, test_user):
+    response = client.post("/users/login", json={"email": test_user["email"], "password": test_user["password"]})
+    assert response.status_code == 200
+    return response.json()
+
+def test_refresh_tokens_rotate_and_reuse_revokes_the_family(client, test_user, redis_client):
+    tokens = _login(client, test_user)
+    assert tokens["expires_in"] == 15 * 60
+
+    rotated = client.post("/users/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert rotated.status_code == 200
+    rotated = rotated.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert client.get("/users/me", headers={"Authorization": f"Bearer {rotated['access_token']}"}).json()["email"] == test_user["email"]
+
+    # Replaying the old token signs out the whole family
+    assert client.post("/users/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/users/refresh", json={"refresh_token": rotated["refresh_token"]}).status_code == 401
+
+def test_logout_revokes_access_and_refresh_tokens(client, test_user, redis_client):
+    tokens = _login(client, test_user)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/users/me", headers=headers).status_code == 200
+
+    assert client.post("/users/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert client.get("/users/me", headers=headers).status_code == 401
+    assert client.post("/users/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+@pytest.mark.asyncio
+async def test_revocations_reach_other_workers_through_pubsub():
+    redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    first, second = RevocationList(), RevocationList()
+    await first.revoke(redis, "before-start", 4102444800)
+    await second.start(redis)
+    try:
+        assert second.is_revoked("before-start")
+        await first.revoke(redis, "after-start", 4102444800)
+        for _ in range(50):
+            if second.is_revoked("after-start"):
+                break
+            await asyncio.sleep(0.01)
+        assert second.is_revoked("after-start")
+        assert not second.is_revoked("never-revoked")
+    finally:
+        await second.stop()
+
+def test_user_writes_skip_the_refresh_select(client, auth_headers, redis_client, assert_max_queries):
+    # The email check, then INSERT ... RETURNING
+    with assert_max_queries(2):
+        response = client.post("/users/register", json={"email": "new@resend.dev", "name": "New User", "password": "newpass123"})
+    assert response.status_code == 200 and response.json()["id"]
+    # The lookup, then the UPDATE
+    with assert_max_queries(2):
+        assert client.put("/users/username", headers=auth_headers, json={"name": "Renamed"}).json()["name"] == "Renamed"
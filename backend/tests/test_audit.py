@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from backend.models.audit import AuditEntity, AuditEvent
+from backend.utils.audit import AuditLog
+
+
+@pytest.mark.asyncio
+async def test_full_batch_is_flushed_without_waiting_for_the_timer(db, assert_max_queries):
+    log = AuditLog(session_factory=sessionmaker(bind=db.get_bind()), batch_size=3, flush_seconds=3600)
+    await log.start()
+    try:
+        with assert_max_queries(1) as statements:
+            for order_id in (1, 2, 3):
+                log.record(AuditEntity.ORDER, order_id, "status_changed", 7, {"status": ("pending", "accepted")})
+            for _ in range(100):
+                if not log.pending:
+                    break
+                await asyncio.sleep(0.01)
+        # One multi-row INSERT for the whole batch
+        assert len(statements) == 1 and statements[0].lstrip().upper().startswith("INSERT")
+    finally:
+        await log.stop()
+
+    events = db.query(AuditEvent).order_by(AuditEvent.id).all()
+    assert [event.entity_id for event in events] == [1, 2, 3]
+    assert events[0].changes == {"status": ["pending", "accepted"]} and events[0].actor_id == 7
+
+
+@pytest.mark.asyncio
+async def test_stop_writes_what_is_buffered_and_failures_are_retried(db):
+    failing = AuditLog(session_factory=lambda: None, batch_size=10, flush_seconds=3600)
+    failing.record(AuditEntity.PASTRY, 1, "deleted", None, {"is_deleted": (0, 1)})
+    failing.record(AuditEntity.PASTRY, 2, "updated", None, {})  # nothing changed, not recorded
+    assert not await failing.flush()
+    assert failing.pending == 1
+
+    failing.session_factory = sessionmaker(bind=db.get_bind())
+    await failing.stop()
+    assert failing.pending == 0
+    assert db.query(AuditEvent.entity_id, AuditEvent.action).all() == [(1, "deleted")]
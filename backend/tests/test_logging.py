@@ -0,0 +1,38 @@
+import json
+import logging
+import queue
+
+from backend.core.context import RequestContext, current_request
+from backend.core.logging_config import JSONFormatter, NonBlockingQueueHandler, RequestIdFilter, SamplingFilter
+
+
+def test_request_id_is_echoed_or_generated(client):
+    response = client.get("/", headers={"X-Request-ID": "checkout-123"})
+    assert response.headers["X-Request-ID"] == "checkout-123"
+
+    generated = client.get("/", headers={"X-Request-ID": "not valid!"}).headers["X-Request-ID"]
+    assert generated != "not valid!" and len(generated) == 32
+
+def test_records_are_json_with_request_id_and_extras():
+    record = logging.LogRecord("backend.test", logging.INFO, __file__, 1, "Created %s", ("order",), None)
+    record.order_id = 7
+    token = current_request.set(RequestContext(request_id="req-1"))
+    try:
+        assert RequestIdFilter().filter(record)
+    finally:
+        current_request.reset(token)
+
+    payload = json.loads(JSONFormatter().format(record))
+    assert payload["message"] == "Created order"
+    assert payload["request_id"] == "req-1"
+    assert payload["order_id"] == 7
+
+def test_sampling_and_full_queue_never_block():
+    record = logging.LogRecord("backend.test", logging.INFO, __file__, 1, "hot path", (), None)
+    record.sample_rate = 0.0
+    assert not SamplingFilter().filter(record)
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.emit(logging.LogRecord("backend.test", logging.INFO, __file__, 1, "one", (), None))
+    handler.emit(logging.LogRecord("backend.test", logging.INFO, __file__, 1, "two", (), None))
+    assert handler.dropped == 1
@@ -0,0 +1,33 @@
+from prometheus_client import REGISTRY
+
+from backend.core.metrics import METRICS_OVERHEAD_BUDGET_SECONDS
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_metrics_are_labelled_by_route_template(client, test_pastries):
+    pastry_id = test_pastries[0]["id"]
+    before = _sample("http_requests_total", method="GET", route="/pastries/{pastry_id}", status="200")
+    queries_before = _sample("db_queries_per_request_sum", route="/pastries/{pastry_id}")
+
+    assert client.get(f"/pastries/{pastry_id}").status_code == 200
+    assert client.get("/pastries/999").status_code == 404
+
+    assert _sample("http_requests_total", method="GET", route="/pastries/{pastry_id}", status="200") == before + 1
+    assert _sample("http_requests_total", method="GET", route="/pastries/{pastry_id}", status="404") >= 1
+    assert _sample("db_queries_per_request_sum", route="/pastries/{pastry_id}") >= queries_before + 2
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_bucket{le="0.005",method="GET",route="/pastries/{pastry_id}"}' in body
+    assert "http_requests_in_flight" in body
+
+def test_metrics_overhead_stays_within_budget(client):
+    count_before = _sample("metrics_overhead_seconds_count")
+    sum_before = _sample("metrics_overhead_seconds_sum")
+    for _ in range(200):
+        client.get("/")
+    count = _sample("metrics_overhead_seconds_count") - count_before
+    total = _sample("metrics_overhead_seconds_sum") - sum_before
+    assert count == 200
+    assert total / count < METRICS_OVERHEAD_BUDGET_SECONDS
@@ -0,0 +1,40 @@
+import logging
+
+import pytest
+
+from backend.core.context import RequestContext, current_request
+from backend.database import profiler
+from backend.models.pastry import Pastry
+
+
+@pytest.fixture
+def request_context():
+    request = RequestContext(method="GET", path="/test")
+    token = current_request.set(request)
+    yield request
+    current_request.reset(token)
+
+def test_repeated_statement_is_flagged_once(db, test_pastries, request_context, caplog):
+    with caplog.at_level(logging.WARNING, logger="backend.sql"):
+        for _ in range(profiler.N_PLUS_ONE_THRESHOLD + 2):
+            db.query(Pastry).filter(Pastry.id == test_pastries[0]["id"]).first()
+
+    flagged = [r for r in caplog.records if "Possible N+1" in r.getMessage()]
+    assert len(flagged) == 1
+    assert "GET /test" in flagged[0].getMessage()
+    assert request_context.db_queries == profiler.N_PLUS_ONE_THRESHOLD + 2
+
+def test_slow_query_logs_parameter_shapes_not_values(db, test_pastries, monkeypatch, caplog):
+    monkeypatch.setattr(profiler, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="backend.sql"):
+        db.query(Pastry).filter(Pastry.name == "Baklava").first()
+
+    [record] = [r for r in caplog.records if "Slow query" in r.getMessage()]
+    assert "('str', 'int', 'int')" in record.getMessage()
+    assert "Baklava" not in record.getMessage()
+
+def test_assert_max_queries_reports_statements(db, test_pastries, assert_max_queries):
+    with pytest.raises(AssertionError, match="Expected at most 1 queries, 2 ran"):
+        with assert_max_queries(1):
+            db.query(Pastry).all()
+            db.query(Pastry).all()
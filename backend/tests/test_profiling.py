@@ -0,0 +1,37 @@
+import pytest
+
+from backend.core import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", tmp_path)
+    return tmp_path
+
+def test_admin_header_profiles_request(client, admin_headers, test_pastries, profile_dir):
+    response = client.get("/pastries/", headers={**admin_headers, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert (profile_dir / f"{profile_id}.speedscope.json").exists()
+
+    download = client.get(f"/profiles/{profile_id}", headers=admin_headers)
+    assert download.status_code == 200
+    assert "speedscope" in download.json()["$schema"]
+
+def test_requests_without_admin_header_are_not_profiled(client, auth_headers, profile_dir):
+    assert "X-Profile-Id" not in client.get("/pastries/").headers
+    assert "X-Profile-Id" not in client.get("/pastries/", headers={**auth_headers, "X-Profile": "1"}).headers
+    assert list(profile_dir.iterdir()) == []
+
+def test_revoked_admin_tokens_cannot_profile(monkeypatch):
+    from backend.core import security
+    from backend.core.tokens import RevocationList
+
+    monkeypatch.setattr(security, "revocation_list", RevocationList())
+    token = security.create_access_token(data={"sub": "admin@resend.dev", "role": "admin", "user_id": 1})
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    assert profiling._is_admin(headers)
+
+    claims = security.decode_access_token(token)
+    security.revocation_list.add(claims["jti"], claims["exp"])
+    assert not profiling._is_admin(headers)
@@ -0,0 +1,50 @@
+import csv
+from datetime import datetime
+
+from backend.models.analytics import SalesReportDay, SalesReportPastryDay
+from backend.models.order import Order, OrderStatus
+from backend.utils import sales_report
+from backend.utils.sales_report import build_sales_report
+
+
+def _order(created_at, status, *lines):
+    return Order(
+        user_id=None, address="Tehran", phone_number="0912", status=status,
+        items=[{"pastry_id": pid, "quantity": qty, "unit_price": price, "line_total": qty * price} for pid, qty, price in lines],
+        total=sum(qty * price for _, qty, price in lines), created_at=created_at, updated_at=created_at,
+    )
+
+def _read(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+def test_report_rebuilds_only_days_with_changed_orders(db, tmp_path, monkeypatch):
+    # CSV output, whether or not pyarrow is installed
+    monkeypatch.setattr(sales_report, "pa", None)
+    monday, tuesday = datetime(2026, 3, 2, 10), datetime(2026, 3, 3, 10)
+    pending = _order(tuesday, OrderStatus.PENDING, (2, 1, 4.0))
+    db.add_all([
+        _order(monday, OrderStatus.ACCEPTED, (1, 2, 12.5), (2, 1, 4.0)),
+        _order(monday, OrderStatus.REJECTED, (1, 1, 12.5)),
+        _order(tuesday, OrderStatus.ACCEPTED, (1, 1, 12.5)),
+        pending,
+    ])
+    db.commit()
+
+    result = build_sales_report(db, tmp_path, now=datetime(2026, 3, 4))
+    assert (result.days, result.orders) == (2, 4)
+    day = db.get(SalesReportDay, monday.date())
+    assert (day.orders, day.accepted, day.rejected, day.units_sold, day.revenue, day.acceptance_rate) == (2, 1, 1, 3, 29.0, 0.5)
+    assert [(r["pastry_id"], r["units_sold"]) for r in _read(tmp_path / "pastries/day=2026-03-02/part-0.csv")] == [("1", "2.0"), ("2", "1.0")]
+
+    # Nothing changed: nothing is rebuilt
+    assert build_sales_report(db, tmp_path, now=datetime(2026, 3, 4, 1)).days == 0
+
+    pending.status, pending.updated_at = OrderStatus.ACCEPTED, datetime(2026, 3, 4, 2)
+    db.commit()
+    result = build_sales_report(db, tmp_path, now=datetime(2026, 3, 4, 3))
+    assert (result.days, result.orders) == (1, 2)
+    assert db.get(SalesReportPastryDay, (tuesday.date(), 2)).units_sold == 1
+    monthly = {r["pastry_id"]: float(r["revenue"]) for r in _read(tmp_path / "pastries_monthly/month=2026-03/part-0.csv")}
+    assert monthly == {"1": 37.5, "2": 8.0}
+    assert [r["acceptance_rate"] for r in _read(tmp_path / "days/month=2026-03/part-0.csv")] == ["0.5", "1.0"]
@@ -0,0 +1,81 @@
+import signal
+
+import pytest
+import uvicorn
+
+import backend.core.server as server
+
+
+class FakeProcess:
+    """
+    Stands in for a worker process; records what the supervisor does to it.
+    """
+    events = []
+    outcomes = []
+    created = 0
+
+    def __init__(self, config=None, target=None, sockets=None, name=None):
+        if name is None:
+            FakeProcess.created += 1
+            name = f"new{FakeProcess.created}"
+        self.name = name
+
+    def start(self):
+        self.events.append(("start", self.name))
+
+    def wait_ready(self, timeout):
+        self.events.append(("ready", self.name))
+        return self.outcomes.pop(0)
+
+    def terminate(self):
+        self.events.append(("terminate", self.name))
+
+    def join(self):
+        self.events.append(("join", self.name))
+
+    @property
+    def pid(self):
+        return self.name
+
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    # Don't let the supervisor take over the test process's signal handlers
+    monkeypatch.setattr(signal, "signal", lambda *args: None)
+    monkeypatch.setattr(server, "ReadyProcess", FakeProcess)
+    FakeProcess.events, FakeProcess.outcomes, FakeProcess.created = [], [], 0
+    config = uvicorn.Config(server.APP, workers=2)
+    supervisor = server.RollingMultiprocess(config, target=lambda sockets: None, sockets=[])
+    supervisor.processes = [FakeProcess(name="old0"), FakeProcess(name="old1")]
+    return supervisor
+
+
+def test_sighup_stops_each_worker_only_after_its_replacement_is_ready(supervisor):
+    FakeProcess.outcomes = [True, True]
+    supervisor.signal_queue.append(signal.SIGHUP)
+    supervisor.handle_signals()
+
+    assert FakeProcess.events == [
+        ("start", "new1"), ("ready", "new1"), ("terminate", "old0"), ("join", "old0"),
+        ("start", "new2"), ("ready", "new2"), ("terminate", "old1"), ("join", "old1"),
+    ]
+    assert [process.name for process in supervisor.processes] == ["new1", "new2"]
+
+
+def test_sighup_keeps_a_worker_whose_replacement_dies(supervisor):
+    # The first replacement exits during startup, the second one is slow
+    FakeProcess.outcomes = [False, None]
+    supervisor.restart_all()
+
+    assert ("terminate", "old0") not in FakeProcess.events
+    assert ("terminate", "old1") in FakeProcess.events
+    assert [process.name for process in supervisor.processes] == ["old0", "new2"]
+
+
+def test_notify_ready_sets_the_event_of_a_restarting_worker(monkeypatch):
+    server.notify_ready()  # no supervisor: nothing to tell
+
+    event = server.multiprocessing.get_context("spawn").Event()
+    monkeypatch.setattr(server, "_ready_event", event)
+    server.notify_ready()
+    assert event.is_set()
@@ -0,0 +1,58 @@
+import io
+
+from backend.core.security import verify_password
+from backend.models.user import User
+from backend.utils.catalog_io import read_records
+from backend.utils.streaming import ExportFormat
+from backend.utils.user_import import import_users
+
+
+def _records(text, import_format=ExportFormat.CSV):
+    return read_records(io.StringIO(text), import_format)
+
+def test_import_hashes_in_a_pool_and_skips_existing_emails(db, test_user):
+    batches = []
+    report = import_users(
+        db,
+        _records(
+            "email,name,password,is_admin\n"
+            "Staff@Qandoon.ir,Staff,staffpass1,yes\n"
+            f"{test_user['email']},Taken,otherpass1,\n"
+            "not-an-email,Broken,pass,\n"
+            "baker@qandoon.ir,Baker,bakerpass1,\n"
+            "Staff@QANDOON.ir,Again,staffpass2,\n"
+        ),
+        workers=2,
+        batch_size=2,
+        progress=lambda r: batches.append(r.processed),
+    )
+
+    # The repeated email lands in a later batch, after the first one was created
+    assert (report.created, report.skipped, report.failed) == (2, 2, 1)
+    assert batches == [2, 5]
+    staff = db.query(User).filter(User.email == "Staff@qandoon.ir").one()
+    assert staff.is_admin and staff.is_verified
+    assert verify_password("staffpass1", staff.password)
+    assert verify_password(test_user["password"], db.query(User).filter(User.email == test_user["email"]).one().password)
+
+def test_import_can_update_existing_users(db, test_user):
+    report = import_users(
+        db,
+        _records(f'{{"email": "{test_user["email"]}", "name": "Renamed", "password": "newpass123"}}\n', ExportFormat.NDJSON),
+        workers=1,
+        update_existing=True,
+    )
+
+    assert (report.created, report.updated) == (0, 1)
+    db.expire_all()
+    user = db.query(User).filter(User.email == test_user["email"]).one()
+    assert user.name == "Renamed" and verify_password("newpass123", user.password)
+
+def test_import_matches_existing_emails_as_registration_stores_them(db):
+    db.add(User(email="John.Doe@example.com", name="John", password="x", is_verified=True))
+    db.commit()
+
+    report = import_users(db, _records("email,name,password\nJohn.Doe@Example.com,John,newpass12\n"), workers=1)
+
+    assert (report.created, report.skipped) == (0, 1)
+    assert [email for (email,) in db.query(User.email)] == ["John.Doe@example.com"]
@@ -0,0 +1,124 @@
+import fakeredis
+import pytest
+import resend
+
+from backend.worker.queue import DEFAULT_QUEUE, Job, QueueKeys, enqueue, requeue_dead, task
+from backend.worker.runner import Worker
+
+calls = []
+
+
+@task(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="tests.record_async")
+async def record_async(value):
+    calls.append(value)
+
+
+@task(name="tests.flaky", max_retries=2)
+def flaky():
+    calls.append("attempt")
+    raise RuntimeError("upstream is down")
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def queue_redis():
+    calls.clear()
+    return fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+
+@pytest.mark.asyncio
+async def test_sync_and_async_tasks_run(queue_redis):
+    await record.enqueue(queue_redis, "sync")
+    await record_async.enqueue(queue_redis, "async")
+
+    assert await Worker(queue_redis).run_until_idle() == 2
+    assert calls == ["sync", "async"]
+
+@pytest.mark.asyncio
+async def test_delayed_jobs_wait_until_due(queue_redis):
+    clock = Clock()
+    worker = Worker(queue_redis, clock=clock)
+    await enqueue(queue_redis, "tests.record", ["later"], delay=60, now=clock.now)
+
+    assert await worker.run_until_idle() == 0
+    clock.now += 60
+    assert await worker.run_until_idle() == 1
+    assert calls == ["later"]
+
+@pytest.mark.asyncio
+async def test_failing_jobs_back_off_then_go_to_dead_letter(queue_redis):
+    clock = Clock()
+    worker = Worker(queue_redis, clock=clock)
+    keys = QueueKeys("default")
+    await flaky.enqueue(queue_redis)
+
+    await worker.run_until_idle()
+    [(raw, due)] = await queue_redis.zrange(keys.scheduled, 0, -1, withscores=True)
+    assert due == clock.now + 5 and Job.loads(raw).error == "RuntimeError: upstream is down"
+
+    clock.now += 5
+    await worker.run_until_idle()
+    clock.now += 10
+    await worker.run_until_idle()
+
+    assert calls == ["attempt"] * 3
+    assert await queue_redis.zcard(keys.scheduled) == 0
+    [dead] = await queue_redis.lrange(keys.dead, 0, -1)
+    assert Job.loads(dead).attempts == 3
+    assert await queue_redis.llen(worker.processing) == 0
+
+    assert await requeue_dead(queue_redis) == 1
+    assert await queue_redis.llen(keys.ready) == 1
+
+@pytest.mark.asyncio
+async def test_jobs_of_dead_workers_are_recovered(queue_redis):
+    crashed = Worker(queue_redis)
+    await crashed._heartbeat()
+    await record.enqueue(queue_redis, "orphan")
+    await queue_redis.lmove(crashed.keys.ready, crashed.processing, "LEFT", "RIGHT")
+    await queue_redis.delete(crashed.keys.heartbeat(crashed.id))
+
+    worker = Worker(queue_redis)
+    assert await worker.recover_orphans() == 1
+    await worker.run_until_idle()
+    assert calls == ["orphan"]
+
+def test_registration_sends_otp_through_the_queue(client, redis_client, monkeypatch):
+    sent = []
+    monkeypatch.setattr(resend.Emails, "send", lambda params: sent.append(params) or {"id": "test"})
+
+    response = client.post("/users/register", json={"email": "new@resend.dev", "name": "New User", "password": "secret123"})
+    assert response.status_code == 200
+    assert sent == []
+
+    code = client.portal.call(redis_client.hget, "otp:new@resend.dev", "code")
+    [raw] = client.portal.call(redis_client.lrange, QueueKeys(DEFAULT_QUEUE).ready, 0, -1)
+    assert code not in raw
+
+    assert client.portal.call(Worker(redis_client).run_until_idle) == 1
+    assert [params["to"] for params in sent] == [["new@resend.dev"]]
+    assert code in sent[0]["html"]
+
+
+def test_otp_email_is_skipped_once_the_code_has_expired(client, redis_client, monkeypatch):
+    sent = []
+    monkeypatch.setattr(resend.Emails, "send", lambda params: sent.append(params) or {"id": "test"})
+
+    client.post("/users/register", json={"email": "late@resend.dev", "name": "Late User", "password": "secret123"})
+    client.portal.call(redis_client.delete, "otp:late@resend.dev")
+
+    assert client.portal.call(Worker(redis_client).run_until_idle) == 1
+    assert sent == []
+    assert client.portal.call(redis_client.llen, QueueKeys(DEFAULT_QUEUE).dead) == 0
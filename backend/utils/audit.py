@@ -0,0 +1,156 @@
+"""
+Audit trail of order and pastry changes.
+
+Request handlers don't insert audit rows inside their own transactions.
+`audit_log.record()` only appends the event to an in-process buffer. A
+background task writes the buffer to `audit_events` with one multi-row
+INSERT per AUDIT_BATCH_SIZE events. It flushes every AUDIT_FLUSH_SECONDS,
+or as soon as a full batch is waiting, and once more at shutdown.
+
+Events are visible after the next flush. If a worker is killed without a
+graceful shutdown, it loses at most the events recorded since its last
+flush. Bulk jobs that already write in batches, such as the catalog import,
+call `write_events` in their own transactions instead.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from backend.database.config import SessionLocal
+from backend.models.audit import AuditEntity, AuditEvent
+
+logger = logging.getLogger(__name__)
+
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", "2"))
+# Beyond this, while the database is unreachable, the oldest events are dropped
+AUDIT_MAX_PENDING = int(os.getenv("AUDIT_MAX_PENDING", "100000"))
+
+
+def audit_event(entity_type: AuditEntity, entity_id: int, action: str, actor_id: Optional[int], changes: Dict[str, Tuple]) -> dict:
+    # created_at is taken now, not at flush time; stored as naive UTC like the other timestamps
+    return {
+        "entity_type": entity_type.value,
+        "entity_id": entity_id,
+        "action": action,
+        "actor_id": actor_id,
+        "changes": {name: list(values) for name, values in changes.items()},
+        "created_at": datetime.now(timezone.utc).replace(tzinfo=None),
+    }
+
+
+def diff(old: dict, new: dict) -> Dict[str, Tuple]:
+    """
+    {field: (old, new)} for every field in `new` whose value differs from `old`.
+    """
+    return {name: (old.get(name), value) for name, value in new.items() if old.get(name) != value}
+
+
+def write_events(db: Session, events: List[dict], batch_size: int = AUDIT_BATCH_SIZE):
+    """
+    Inserts events with one multi-row INSERT per batch. Does not commit.
+    """
+    for start in range(0, len(events), batch_size):
+        db.execute(insert(AuditEvent), events[start:start + batch_size])
+
+
+class AuditLog:
+    """
+    In-process buffer of audit events. `record` must be called from the
+    event loop thread.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = AUDIT_BATCH_SIZE,
+        flush_seconds: float = AUDIT_FLUSH_SECONDS,
+        max_pending: int = AUDIT_MAX_PENDING,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._pending: List[dict] = []
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, entity_type: AuditEntity, entity_id: int, action: str, actor_id: Optional[int], changes: Dict[str, Tuple]):
+        if not changes:
+            return
+        self._pending.append(audit_event(entity_type, entity_id, action, actor_id, changes))
+        if len(self._pending) > self.max_pending:
+            dropped = len(self._pending) - self.max_pending
+            del self._pending[:dropped]
+            logger.error("Audit buffer full; dropped the oldest events", extra={"dropped": dropped})
+        if len(self._pending) >= self.batch_size and self._full is not None:
+            self._full.set()
+
+    def drain(self) -> List[dict]:
+        events, self._pending = self._pending, []
+        return events
+
+    def _write(self, events: List[dict]):
+        db = self.session_factory()
+        try:
+            write_events(db, events, self.batch_size)
+            db.commit()
+        finally:
+            db.close()
+
+    async def flush(self) -> bool:
+        """
+        Writes everything buffered so far. On failure the events are put back
+        to be retried by the next flush, and False is returned.
+        """
+        events = self.drain()
+        if not events:
+            return True
+        try:
+            await asyncio.to_thread(self._write, events)
+        except Exception:
+            logger.exception("Could not write audit events; will retry", extra={"events": len(events)})
+            self._pending[:0] = events
+            return False
+        return True
+
+    async def start(self):
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """
+        Stops the flusher and writes whatever is still buffered.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._full = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            if not await self.flush():
+                # The buffer is still full; don't retry in a tight loop
+                await asyncio.sleep(self.flush_seconds)
+
+
+audit_log = AuditLog()
@@ -0,0 +1,187 @@
+"""
+Snapshot of the active catalog, built once and shared by every worker.
+
+The snapshot holds each active pastry as it is serialized in API responses,
+the id order for every catalog sort, and the default listing page already
+encoded and gzip-compressed. It lives in each worker's memory for
+CATALOG_SNAPSHOT_SECONDS and in Redis under a versioned key:
+
+    catalog:version              bumped by every catalog write
+    catalog:snapshot:{version}   gzip + base64 snapshot (the client decodes responses)
+    catalog:lock:{version}       held by the one worker building that version
+
+so after a deploy or a write only one worker queries the database and the
+rest load its result from Redis. Within a worker, concurrent misses share a
+single load.
+"""
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from backend.utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+CATALOG_SNAPSHOT_SECONDS = int(os.getenv("CATALOG_SNAPSHOT_SECONDS", "30"))
+BUILD_LOCK_SECONDS = 30
+WAIT_FOR_BUILDER_SECONDS = 5
+# Warm-up retries back off from the first delay up to the maximum
+WARM_UP_RETRY_SECONDS = 0.5
+WARM_UP_MAX_RETRY_SECONDS = 30
+DEFAULT_PAGE_SIZE = 100
+DEFAULT_ORDER = "default"
+
+VERSION_KEY = "catalog:version"
+
+
+def _encode(content) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass
+class CatalogSnapshot:
+    pastries: List[dict]  # serialized PastryResponse objects, in the default order
+    orders: Dict[str, List[int]]  # pastry ids for every sort
+    built_at: float = field(default_factory=time.time)
+    by_id: Dict[int, dict] = field(init=False, repr=False)
+    default_page: bytes = field(init=False, repr=False)
+    default_page_gzip: bytes = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.by_id = {pastry["id"]: pastry for pastry in self.pastries}
+        self.default_page = _encode(self.pastries[:DEFAULT_PAGE_SIZE])
+        self.default_page_gzip = gzip.compress(self.default_page, compresslevel=6)
+
+    def listing(self, skip: int, limit: int, min_price: Optional[float], max_price: Optional[float], in_stock: bool, sort: Optional[str]) -> List[dict]:
+        """
+        Same rows as filter_catalog() in backend.routes.pastries would return.
+        """
+        rows = (self.by_id[pastry_id] for pastry_id in self.orders[sort or DEFAULT_ORDER])
+        matches = (
+            pastry for pastry in rows
+            if (not in_stock or pastry["stock"] > 0)
+            and (min_price is None or pastry["price"] >= min_price)
+            and (max_price is None or pastry["price"] <= max_price)
+        )
+        return list(islice(matches, skip, skip + limit))
+
+    def dumps(self) -> str:
+        payload = _encode({"pastries": self.pastries, "orders": self.orders, "built_at": self.built_at})
+        return base64.b64encode(gzip.compress(payload)).decode("ascii")
+
+    @classmethod
+    def loads(cls, raw: str) -> "CatalogSnapshot":
+        payload = json.loads(gzip.decompress(base64.b64decode(raw)))
+        return cls(payload["pastries"], payload["orders"], payload["built_at"])
+
+
+class CatalogCache:
+    def __init__(self, ttl: float = CATALOG_SNAPSHOT_SECONDS):
+        self.ttl = ttl
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._loaded_at = 0.0
+        self._generation = 0
+        self._flight = SingleFlight()
+        self.ready = False
+
+    def invalidate_local(self):
+        self._snapshot = None
+        self._generation += 1
+
+    async def invalidate(self, redis):
+        """
+        Call after any catalog write. Other workers pick up the new version
+        once their local copy expires.
+        """
+        self.invalidate_local()
+        if redis is not None:
+            await redis.incr(VERSION_KEY)
+
+    async def get(self, redis, loader: Callable[[], CatalogSnapshot]) -> CatalogSnapshot:
+        """
+        Returns the current snapshot. `loader` builds one from the database
+        and runs in the thread pool, only if neither memory nor Redis has it.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return snapshot
+        return await self._flight.do("catalog", lambda: self._refresh(redis, loader))
+
+    async def warm_up(
+        self,
+        redis,
+        loader: Callable[[], CatalogSnapshot],
+        retry_seconds: float = WARM_UP_RETRY_SECONDS,
+        max_retry_seconds: float = WARM_UP_MAX_RETRY_SECONDS,
+    ):
+        """
+        Loads the first snapshot, retrying with exponential backoff until it
+        succeeds (e.g. while the database is still starting). Nothing else
+        sets `ready` on a worker that receives no traffic until it is ready.
+        """
+        started = time.perf_counter()
+        while True:
+            try:
+                snapshot = await self.get(redis, loader)
+                break
+            except Exception:
+                logger.exception("Catalog warm-up failed; retrying", extra={"retry_in_seconds": retry_seconds})
+                await asyncio.sleep(retry_seconds)
+                retry_seconds = min(retry_seconds * 2, max_retry_seconds)
+        logger.info("Catalog snapshot warmed up", extra={
+            "pastries": len(snapshot.pastries),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+        })
+
+    async def _refresh(self, redis, loader) -> CatalogSnapshot:
+        generation = self._generation
+        snapshot = await self._fetch(redis, loader)
+        # A write during the load makes this snapshot stale; serve it once but do not keep it
+        if generation == self._generation:
+            self._snapshot, self._loaded_at = snapshot, time.monotonic()
+        self.ready = True
+        return snapshot
+
+    async def _fetch(self, redis, loader) -> CatalogSnapshot:
+        if redis is None:
+            return await run_in_threadpool(loader)
+
+        version = await redis.get(VERSION_KEY) or "0"
+        snapshot_key, lock_key = f"catalog:snapshot:{version}", f"catalog:lock:{version}"
+        raw = await redis.get(snapshot_key)
+        if raw is not None:
+            return CatalogSnapshot.loads(raw)
+
+        token = uuid.uuid4().hex
+        if await redis.set(lock_key, token, nx=True, ex=BUILD_LOCK_SECONDS):
+            try:
+                snapshot = await run_in_threadpool(loader)
+                await redis.set(snapshot_key, snapshot.dumps(), ex=max(1, int(self.ttl)))
+                return snapshot
+            finally:
+                if await redis.get(lock_key) == token:
+                    await redis.delete(lock_key)
+
+        # Another worker is building this version; wait for it instead of querying too
+        deadline = time.monotonic() + WAIT_FOR_BUILDER_SECONDS
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            raw = await redis.get(snapshot_key)
+            if raw is not None:
+                return CatalogSnapshot.loads(raw)
+        logger.warning("Timed out waiting for the catalog snapshot; building it locally")
+        return await run_in_threadpool(loader)
+
+
+catalog_cache = CatalogCache()
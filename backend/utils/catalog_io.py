@@ -0,0 +1,159 @@
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from backend.models.audit import AuditEntity
+from backend.models.pastry import Pastry
+from backend.utils.audit import audit_event, diff, write_events
+from backend.utils.streaming import ExportFormat
+
+CATALOG_FIELDS = ["id", "name", "description", "image_url", "price", "stock"]
+IMPORT_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def add_error(self, line: int, error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+
+def detect_format(filename: Optional[str]) -> Optional[ExportFormat]:
+    if not filename:
+        return None
+    if filename.endswith(".csv"):
+        return ExportFormat.CSV
+    if filename.endswith((".jsonl", ".ndjson")):
+        return ExportFormat.NDJSON
+    return None
+
+
+def read_records(lines: Iterable[str], import_format: ExportFormat) -> Iterator[Tuple[int, object]]:
+    """
+    Yields (line number, raw record) pairs without reading the whole input.
+    A record is an exception instance when its line could not be parsed.
+    """
+    if import_format == ExportFormat.CSV:
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, e
+
+
+def _clean(record) -> dict:
+    """
+    Validates one raw record and converts it to column values.
+    Missing or empty values are left out, so updates only touch given fields.
+    """
+    if isinstance(record, Exception):
+        raise ValueError(f"Invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object")
+    values = {}
+    for name in CATALOG_FIELDS:
+        value = record.get(name)
+        if value is None or value == "":
+            continue
+        if name == "id":
+            value = int(value)
+        elif name in ("price", "stock"):
+            value = float(value)
+            if value < 0:
+                raise ValueError(f"{name} must not be negative")
+        else:
+            value = str(value)
+        values[name] = value
+    if "id" not in values:
+        missing = [name for name in ("name", "price", "stock") if name not in values]
+        if missing:
+            raise ValueError(f"New pastries need {', '.join(missing)}")
+    return values
+
+
+def _flush(db: Session, batch: List[Tuple[int, dict]], report: ImportReport, actor_id: Optional[int]):
+    ids = [values["id"] for _, values in batch if "id" in values]
+    existing = {}
+    if ids:
+        # Current values come with the existence check, for the audit trail
+        columns = [getattr(Pastry, name) for name in CATALOG_FIELDS]
+        existing = {row.id: row._asdict() for row in db.execute(select(*columns).where(Pastry.id.in_(ids)))}
+
+    inserts, updates = [], []
+    for line_number, values in batch:
+        if "id" not in values:
+            inserts.append({"description": "", "image_url": "", **values})
+        elif values["id"] in existing:
+            updates.append(values)
+        else:
+            report.add_error(line_number, f"Pastry with id {values['id']} not found")
+
+    if inserts:
+        db.execute(insert(Pastry), inserts)
+    if updates:
+        # ORM bulk UPDATE by primary key; rows with the same keys are batched
+        db.execute(update(Pastry), updates)
+        events = []
+        for values in updates:
+            changes = diff(existing[values["id"]], values)
+            # A pastry listed twice in one batch is compared against its latest values
+            existing[values["id"]].update(values)
+            if changes:
+                events.append(audit_event(AuditEntity.PASTRY, values["id"], "imported", actor_id, changes))
+        # Written in the import's own transaction, one multi-row INSERT per batch
+        write_events(db, events)
+    db.commit()
+    report.created += len(inserts)
+    report.updated += len(updates)
+
+
+def import_pastries(db: Session, records: Iterable[Tuple[int, object]], batch_size: int = IMPORT_BATCH_SIZE, actor_id: Optional[int] = None) -> ImportReport:
+    """
+    Upserts pastries from parsed records in batches. Records with an id
+    update that pastry, records without one create a new pastry. Each batch
+    is committed on its own, so memory stays bounded for any input size.
+    Changes to existing pastries are audited as made by `actor_id`.
+    """
+    report = ImportReport()
+    batch = []
+    for line_number, record in records:
+        try:
+            batch.append((line_number, _clean(record)))
+        except (TypeError, ValueError) as e:
+            report.add_error(line_number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            _flush(db, batch, report, actor_id)
+            batch = []
+    if batch:
+        _flush(db, batch, report, actor_id)
+    return report
+
+
+def iter_catalog(db: Session, include_deleted: bool = False, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Streams the catalog with a server-side cursor, `batch_size` rows at a time.
+    """
+    query = select(*(getattr(Pastry, name) for name in CATALOG_FIELDS)).order_by(Pastry.id)
+    if not include_deleted:
+        query = query.where(Pastry.is_deleted == 0)
+    for row in db.execute(query.execution_options(yield_per=batch_size)):
+        yield row._asdict()
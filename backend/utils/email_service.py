@@ -1,28 +1,30 @@
+import logging
 import os
 import resend
-from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
 
 class EmailService:
     def __init__(self):
         resend.api_key = os.getenv("EMAIL_KEY")
 
-    async def send_otp_email(self, email: str, otp: str, expire: str) -> bool:
-        try:
-            params: resend.Emails.SendParams = {
-                "from": "admin <noreply@abtinfi.ir>",
-                "to": [email],
-                "subject": "OTP Code",
-                "html": f"""
-                <h1>Your OTP Code</h1>
-                <p>Your one-time password is: <strong>{otp}</strong></p>
-                <p>This code will expire in <strong>{expire}</strong> minutes.</p>
-                """
-            }
-            response = resend.Emails.send(params)
-            print(response)
-            return True
-        except Exception as e:
-            print(e)
-            raise HTTPException(status_code=500, detail="Failed to send email")
+    def send_otp_email(self, email: str, otp: str, expire: str) -> bool:
+        """
+        Sends the OTP through Resend. Runs on the background worker (see
+        backend.worker.tasks); errors propagate so the job is retried.
+        """
+        params: resend.Emails.SendParams = {
+            "from": "admin <noreply@abtinfi.ir>",
+            "to": [email],
+            "subject": "OTP Code",
+            "html": f"""
+            <h1>Your OTP Code</h1>
+            <p>Your one-time password is: <strong>{otp}</strong></p>
+            <p>This code will expire in <strong>{expire}</strong> minutes.</p>
+            """
+        }
+        response = resend.Emails.send(params)
+        logger.info("OTP email sent", extra={"email_id": response.get("id")})
+        return True
 
 email_service = EmailService()
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import secrets
+from typing import Optional
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", 24 * 60 * 60))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", 10))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+class IdempotentRequest:
+    """
+    Stores the first response for an `Idempotency-Key` in Redis and replays it
+    on retries. While the first request is in flight a short lock makes
+    concurrent duplicates fail fast with 409 instead of running twice.
+
+    Usage:
+        idempotent = IdempotentRequest(redis_client, scope, key, body)
+        replay = await idempotent.begin()
+        if replay is not None:
+            return replay
+        try:
+            ...handle the request...
+        except BaseException:
+            await idempotent.release()
+            raise
+        await idempotent.save(response_body)
+    """
+
+    def __init__(self, redis_client, scope: str, key: str, body: str):
+        if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Idempotency-Key must be at most {MAX_IDEMPOTENCY_KEY_LENGTH} characters"
+            )
+        self.redis = redis_client
+        self.response_key = f"idempotency:{scope}:{key}"
+        self.lock_key = f"{self.response_key}:lock"
+        self.fingerprint = hashlib.sha256(body.encode()).hexdigest()
+        self.lock_token: Optional[str] = None
+
+    async def _cached_response(self) -> Optional[JSONResponse]:
+        cached = await self.redis.get(self.response_key)
+        if cached is None:
+            return None
+        cached = json.loads(cached)
+        if cached["fingerprint"] != self.fingerprint:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request body"
+            )
+        return JSONResponse(
+            content=cached["body"],
+            status_code=cached["status_code"],
+            headers={"Idempotent-Replayed": "true"},
+        )
+
+    async def begin(self) -> Optional[JSONResponse]:
+        """
+        Returns the stored response for a retry, or None once this request
+        holds the lock and should be processed.
+        """
+        replay = await self._cached_response()
+        if replay is not None:
+            return replay
+
+        token = secrets.token_hex(8)
+        if not await self.redis.set(self.lock_key, token, nx=True, ex=IDEMPOTENCY_LOCK_SECONDS):
+            # The first request may have finished between the two checks
+            replay = await self._cached_response()
+            if replay is not None:
+                return replay
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is already being processed",
+                headers={"Retry-After": str(IDEMPOTENCY_LOCK_SECONDS)},
+            )
+        self.lock_token = token
+        return None
+
+    async def save(self, body, status_code: int = status.HTTP_200_OK):
+        """
+        Stores the response for later retries and releases the lock.
+        """
+        payload = {"fingerprint": self.fingerprint, "status_code": status_code, "body": body}
+        await self.redis.set(self.response_key, json.dumps(payload), ex=IDEMPOTENCY_TTL_SECONDS)
+        await self.release()
+
+    async def release(self):
+        """
+        Releases the lock without storing a response, so the client may retry.
+        """
+        if self.lock_token is None:
+            return
+        if await self.redis.get(self.lock_key) == self.lock_token:
+            await self.redis.delete(self.lock_key)
+        self.lock_token = None
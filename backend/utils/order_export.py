@@ -0,0 +1,43 @@
+import json
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models.order import Order, OrderStatus
+from backend.utils.streaming import ExportFormat
+
+ORDER_EXPORT_FIELDS = [
+    "id", "user_id", "status", "address", "phone_number", "items", "total",
+    "admin_message", "created_at", "updated_at",
+]
+EXPORT_BATCH_SIZE = 1000
+
+
+def iter_orders(
+    db: Session,
+    export_format: ExportFormat,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    statuses: Optional[List[OrderStatus]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[dict]:
+    """
+    Streams orders created in [start, end) with a server-side cursor,
+    `batch_size` rows at a time. CSV has no nested values, so there the
+    items list is written as a JSON string.
+    """
+    query = select(*(getattr(Order, name) for name in ORDER_EXPORT_FIELDS)).order_by(Order.id)
+    if start is not None:
+        query = query.where(Order.created_at >= start)
+    if end is not None:
+        query = query.where(Order.created_at < end)
+    if statuses:
+        query = query.where(Order.status.in_(statuses))
+    for row in db.execute(query.execution_options(yield_per=batch_size)):
+        record = row._asdict()
+        record["status"] = record["status"].value if record["status"] else None
+        if export_format == ExportFormat.CSV:
+            record["items"] = json.dumps(record["items"])
+        yield record
@@ -0,0 +1,297 @@
+"""
+Offline sales report: units sold per pastry, acceptance rate and revenue,
+per day and per month.
+
+Each run reads only the orders changed since the last run (the watermark on
+orders.updated_at), finds the days those orders were placed on, and rebuilds
+just those days. The orders of those days are streamed with a server-side
+cursor and aggregated in columns. The results go to the sales_report_* tables
+and to files partitioned by day and month under SALES_REPORT_DIR:
+
+    pastries/day=YYYY-MM-DD/part-0.parquet          per pastry, per day
+    pastries_monthly/month=YYYY-MM/part-0.parquet   per pastry, per month
+    days/month=YYYY-MM/part-0.parquet               day totals of a month
+
+Parquet needs pyarrow; without it the files are CSV and aggregation falls
+back to plain Python.
+"""
+import csv
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, func, insert, select, union_all
+from sqlalchemy.orm import Session
+
+from backend.database.database import dialect_insert
+from backend.database.rollups import order_lines
+from backend.models.analytics import ReportWatermark, SalesReportDay, SalesReportPastryDay
+from backend.models.order import ArchivedOrder, Order, OrderStatus
+from backend.models.pastry import Pastry
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = None
+
+SALES_REPORT_DIR = Path(os.getenv("SALES_REPORT_DIR", "reports/sales"))
+WATERMARK_NAME = "sales_report"
+REPORT_BATCH_SIZE = 1000
+# Days rebuilt per pass, bounding memory on the first (full) run
+REPORT_CHUNK_DAYS = 31
+# Orders updated in the last minute are left for the next run, so transactions
+# still in flight when the run starts are not skipped
+REPORT_SETTLE_SECONDS = 60
+
+DAY_FIELDS = ["day", "orders", "accepted", "rejected", "units_sold", "revenue", "acceptance_rate"]
+PASTRY_FIELDS = ["day", "pastry_id", "units_sold", "revenue"]
+MONTHLY_PASTRY_FIELDS = ["month", "pastry_id", "units_sold", "revenue"]
+
+
+@dataclass
+class ReportColumns:
+    """
+    Orders of the days being rebuilt, one list per column.
+    """
+    order_day: List[date] = field(default_factory=list)
+    order_status: List[str] = field(default_factory=list)
+    line_day: List[date] = field(default_factory=list)
+    line_pastry: List[int] = field(default_factory=list)
+    line_quantity: List[float] = field(default_factory=list)
+    line_amount: List[float] = field(default_factory=list)
+
+
+@dataclass
+class SalesReportResult:
+    days: int = 0
+    orders: int = 0
+    watermark: Optional[datetime] = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _month(day: date) -> str:
+    return day.strftime("%Y-%m")
+
+
+def _month_range(month: str) -> Tuple[date, date]:
+    start = datetime.strptime(month, "%Y-%m").date()
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, end
+
+
+def _chunks(days: Iterable[date]) -> Iterable[Tuple[date, date, Set[date]]]:
+    """
+    Groups sorted days into [start, end) ranges of at most REPORT_CHUNK_DAYS.
+    """
+    chunk: List[date] = []
+    for day in sorted(days):
+        if chunk and (day - chunk[0]).days >= REPORT_CHUNK_DAYS:
+            yield chunk[0], chunk[-1] + timedelta(days=1), set(chunk)
+            chunk = []
+        chunk.append(day)
+    if chunk:
+        yield chunk[0], chunk[-1] + timedelta(days=1), set(chunk)
+
+
+def _changed_days(db: Session, since: Optional[datetime], until: datetime, batch_size: int) -> Set[date]:
+    """
+    Days on which orders changed in (since, until] were placed. With no
+    watermark, every day with orders (archived ones included).
+    """
+    if since is None:
+        query = union_all(
+            select(func.min(Order.created_at), func.max(Order.created_at)),
+            select(func.min(ArchivedOrder.created_at), func.max(ArchivedOrder.created_at)),
+        )
+        bounds = [value for row in db.execute(query) for value in row if value is not None]
+        if not bounds:
+            return set()
+        first, last = min(bounds).date(), max(bounds).date()
+        return {first + timedelta(days=n) for n in range((last - first).days + 1)}
+    query = select(Order.created_at).where(Order.updated_at > since, Order.updated_at <= until)
+    return {created_at.date() for (created_at,) in db.execute(query.execution_options(yield_per=batch_size))}
+
+
+def _read_orders(db: Session, start: date, end: date, days: Set[date], prices: Dict[int, float], batch_size: int) -> ReportColumns:
+    columns = ReportColumns()
+    start_at, end_at = datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time())
+    rows = db.execute(
+        union_all(
+            select(Order.status, Order.items, Order.created_at).where(Order.created_at >= start_at, Order.created_at < end_at),
+            select(ArchivedOrder.status, ArchivedOrder.items, ArchivedOrder.created_at)
+            .where(ArchivedOrder.created_at >= start_at, ArchivedOrder.created_at < end_at),
+        ).execution_options(yield_per=batch_size)
+    )
+    for order_status, items, created_at in rows:
+        day = created_at.date()
+        if day not in days or order_status is None:
+            continue
+        columns.order_day.append(day)
+        columns.order_status.append(order_status.value)
+        if order_status == OrderStatus.ACCEPTED:
+            for pastry_id, quantity, amount in order_lines(db, items, prices):
+                columns.line_day.append(day)
+                columns.line_pastry.append(pastry_id)
+                columns.line_quantity.append(quantity)
+                columns.line_amount.append(amount)
+    return columns
+
+
+def _aggregate_arrow(columns: ReportColumns) -> Tuple[List[dict], List[dict]]:
+    orders = pa.table({
+        "day": pa.array(columns.order_day, pa.date32()),
+        "status": pa.array(columns.order_status, pa.string()),
+    })
+    lines = pa.table({
+        "day": pa.array(columns.line_day, pa.date32()),
+        "pastry_id": pa.array(columns.line_pastry, pa.int64()),
+        "quantity": pa.array(columns.line_quantity, pa.float64()),
+        "amount": pa.array(columns.line_amount, pa.float64()),
+    })
+    counts = orders.group_by(["day", "status"]).aggregate([("status", "count")]).to_pylist()
+    sales = lines.group_by(["day", "pastry_id"]).aggregate([("quantity", "sum"), ("amount", "sum")]).to_pylist()
+    return (
+        [{"day": r["day"], "status": r["status"], "count": r["status_count"]} for r in counts],
+        [{"day": r["day"], "pastry_id": r["pastry_id"], "units_sold": r["quantity_sum"], "revenue": r["amount_sum"]} for r in sales],
+    )
+
+
+def _aggregate_python(columns: ReportColumns) -> Tuple[List[dict], List[dict]]:
+    counts = defaultdict(int)
+    for key in zip(columns.order_day, columns.order_status):
+        counts[key] += 1
+    sales = defaultdict(lambda: [0.0, 0.0])
+    for day, pastry_id, quantity, amount in zip(columns.line_day, columns.line_pastry, columns.line_quantity, columns.line_amount):
+        totals = sales[day, pastry_id]
+        totals[0] += quantity
+        totals[1] += amount
+    return (
+        [{"day": day, "status": s, "count": count} for (day, s), count in counts.items()],
+        [{"day": day, "pastry_id": pid, "units_sold": units, "revenue": revenue} for (day, pid), (units, revenue) in sales.items()],
+    )
+
+
+def _day_rows(days: Set[date], counts: List[dict], pastry_rows: List[dict]) -> List[dict]:
+    totals = {day: {"day": day, "orders": 0, "accepted": 0, "rejected": 0, "units_sold": 0.0, "revenue": 0.0} for day in days}
+    for row in counts:
+        totals[row["day"]]["orders"] += row["count"]
+        if row["status"] == OrderStatus.ACCEPTED.value:
+            totals[row["day"]]["accepted"] += row["count"]
+        elif row["status"] == OrderStatus.REJECTED.value:
+            totals[row["day"]]["rejected"] += row["count"]
+    for row in pastry_rows:
+        totals[row["day"]]["units_sold"] += row["units_sold"]
+        totals[row["day"]]["revenue"] += row["revenue"]
+    for row in totals.values():
+        decided = row["accepted"] + row["rejected"]
+        row["acceptance_rate"] = row["accepted"] / decided if decided else None
+    return sorted(totals.values(), key=lambda row: row["day"])
+
+
+def _write_partition(root: Path, partition: str, rows: List[dict], fields: List[str]):
+    """
+    Replaces one partition directory's file with `rows`.
+    """
+    directory = root / partition
+    directory.mkdir(parents=True, exist_ok=True)
+    for stale in directory.glob("part-0.*"):
+        stale.unlink()
+    if pa is not None:
+        table = pa.Table.from_pylist(rows) if rows else pa.table({name: [] for name in fields})
+        pq.write_table(table.select(fields), directory / "part-0.parquet", compression="zstd")
+        return
+    with open(directory / "part-0.csv", "w", encoding="utf-8", newline="") as output:
+        writer = csv.DictWriter(output, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _write_monthly(db: Session, output_dir: Path, months: Set[str]):
+    """
+    Rebuilds the month files from the summary tables, which are small.
+    """
+    for month in sorted(months):
+        start, end = _month_range(month)
+        days = db.execute(
+            select(*(getattr(SalesReportDay, name) for name in DAY_FIELDS))
+            .where(SalesReportDay.day >= start, SalesReportDay.day < end)
+            .order_by(SalesReportDay.day)
+        )
+        _write_partition(output_dir / "days", f"month={month}", [row._asdict() for row in days], DAY_FIELDS)
+        pastries = db.execute(
+            select(
+                SalesReportPastryDay.pastry_id,
+                func.sum(SalesReportPastryDay.units_sold).label("units_sold"),
+                func.sum(SalesReportPastryDay.revenue).label("revenue"),
+            )
+            .where(SalesReportPastryDay.day >= start, SalesReportPastryDay.day < end)
+            .group_by(SalesReportPastryDay.pastry_id)
+            .order_by(SalesReportPastryDay.pastry_id)
+        )
+        rows = [{"month": month, **row._asdict()} for row in pastries]
+        _write_partition(output_dir / "pastries_monthly", f"month={month}", rows, MONTHLY_PASTRY_FIELDS)
+
+
+def build_sales_report(
+    db: Session,
+    output_dir: Path = SALES_REPORT_DIR,
+    full: bool = False,
+    batch_size: int = REPORT_BATCH_SIZE,
+    now: Optional[datetime] = None,
+) -> SalesReportResult:
+    """
+    Brings the sales report up to date and moves the watermark. Each chunk
+    of days is committed on its own; if the run fails, the watermark stays
+    put and the next run redoes the same days. `full` rebuilds every day.
+    """
+    started = time.perf_counter()
+    until = (now or _utcnow()).replace(tzinfo=None) - timedelta(seconds=REPORT_SETTLE_SECONDS)
+    watermark = None if full else db.scalar(select(ReportWatermark.value).where(ReportWatermark.name == WATERMARK_NAME))
+    aggregate = _aggregate_arrow if pa is not None else _aggregate_python
+    prices = dict(db.query(Pastry.id, Pastry.price).all())
+
+    result = SalesReportResult(watermark=until)
+    months = set()
+    for start, end, days in _chunks(_changed_days(db, watermark, until, batch_size)):
+        columns = _read_orders(db, start, end, days, prices, batch_size)
+        counts, pastry_rows = aggregate(columns)
+        day_rows = _day_rows(days, counts, pastry_rows)
+
+        db.execute(delete(SalesReportDay).where(SalesReportDay.day.in_(days)))
+        db.execute(delete(SalesReportPastryDay).where(SalesReportPastryDay.day.in_(days)))
+        db.execute(insert(SalesReportDay), day_rows)
+        if pastry_rows:
+            db.execute(insert(SalesReportPastryDay), pastry_rows)
+        db.commit()
+
+        per_day = defaultdict(list)
+        for row in pastry_rows:
+            per_day[row["day"]].append(row)
+        for day in days:
+            rows = sorted(per_day[day], key=lambda row: row["pastry_id"])
+            _write_partition(output_dir / "pastries", f"day={day.isoformat()}", rows, PASTRY_FIELDS)
+        months.update(_month(day) for day in days)
+        result.days += len(days)
+        result.orders += len(columns.order_day)
+
+    _write_monthly(db, output_dir, months)
+    stmt = dialect_insert(db, ReportWatermark).values(name=WATERMARK_NAME, value=until)
+    db.execute(stmt.on_conflict_do_update(index_elements=[ReportWatermark.name], set_={"value": stmt.excluded.value}))
+    db.commit()
+    logger.info("Sales report updated", extra={
+        "days": result.days,
+        "orders": result.orders,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+    })
+    return result
@@ -0,0 +1,219 @@
+"""
+Short-lived stock holds in Redis.
+
+Creating an order holds its quantities, so pending orders cannot oversubscribe
+a pastry. Two counters are kept per pastry:
+
+    stock:level:{id}   cached pastries.stock (expires; dropped whenever stock changes)
+    stock:held:{id}    quantity held by pending orders
+
+and one hash per hold, stock:hold:{hold_id}, with the held quantities.
+stock:holds is a sorted set of hold ids scored by when they expire. A hold is
+placed under a temporary id before the order is inserted, so no database
+transaction stays open while Redis is awaited, and is then attached to the
+order id.
+
+A hold is committed when the order is accepted (the database decrement then
+takes over), released when it is rejected, and released by the
+release_expired_holds task once it expires. The database stays the source of
+truth: acceptance still checks and decrements pastries.stock.
+"""
+import os
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.models.pastry import Pastry
+
+STOCK_HOLD_SECONDS = int(os.getenv("STOCK_HOLD_SECONDS", "1800"))
+STOCK_LEVEL_TTL_SECONDS = 300
+EXPIRY_BATCH_SIZE = 500
+RESERVE_ATTEMPTS = 4  # a concurrent acceptance can drop a level we just seeded
+
+EXPIRY_KEY = "stock:holds"
+
+
+def level_key(pastry_id: int) -> str:
+    return f"stock:level:{pastry_id}"
+
+
+def held_key(pastry_id: int) -> str:
+    return f"stock:held:{pastry_id}"
+
+
+def hold_key(hold_id) -> str:
+    return f"stock:hold:{hold_id}"
+
+
+# KEYS: level and held key per pastry, then the hold hash and the expiry set
+# ARGV: hold id, expires at, then pastry id and quantity per pastry
+# Returns {0} when held, {1, i...} for pastries whose level is not cached,
+# {2, i} for the first pastry without enough free stock.
+RESERVE_SCRIPT = """
+local n = (#KEYS - 2) / 2
+local missing = {1}
+for i = 1, n do
+    if redis.call('EXISTS', KEYS[2 * i - 1]) == 0 then table.insert(missing, i) end
+end
+if #missing > 1 then return missing end
+for i = 1, n do
+    local level = tonumber(redis.call('GET', KEYS[2 * i - 1]))
+    local held = tonumber(redis.call('GET', KEYS[2 * i]) or '0')
+    if level - held < tonumber(ARGV[2 + 2 * i]) then return {2, i} end
+end
+for i = 1, n do
+    redis.call('INCRBY', KEYS[2 * i], ARGV[2 + 2 * i])
+    redis.call('HSET', KEYS[2 * n + 1], ARGV[1 + 2 * i], ARGV[2 + 2 * i])
+end
+redis.call('ZADD', KEYS[2 * n + 2], ARGV[2], ARGV[1])
+return {0}
+"""
+
+# The scripts below build stock:held keys from the hold contents, so they assume
+# a single Redis node rather than a cluster.
+
+# KEYS: hold hash, expiry set; ARGV: hold id. Returns 1 if a hold was released.
+RELEASE_SCRIPT = """
+local items = redis.call('HGETALL', KEYS[1])
+for i = 1, #items, 2 do
+    redis.call('DECRBY', 'stock:held:' .. items[i], items[i + 1])
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return #items > 0 and 1 or 0
+"""
+
+# KEYS: expiry set; ARGV: now, batch size. Returns the number of holds released.
+EXPIRE_SCRIPT = """
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, hold_id in ipairs(expired) do
+    local hold = 'stock:hold:' .. hold_id
+    local items = redis.call('HGETALL', hold)
+    for i = 1, #items, 2 do
+        redis.call('DECRBY', 'stock:held:' .. items[i], items[i + 1])
+    end
+    redis.call('DEL', hold)
+    redis.call('ZREM', KEYS[1], hold_id)
+end
+return #expired
+"""
+
+# KEYS: temporary hold hash, order hold hash, expiry set; ARGV: temporary id, order id
+ATTACH_SCRIPT = """
+local expires_at = redis.call('ZSCORE', KEYS[3], ARGV[1])
+if not expires_at or redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+redis.call('RENAME', KEYS[1], KEYS[2])
+redis.call('ZREM', KEYS[3], ARGV[1])
+redis.call('ZADD', KEYS[3], expires_at, ARGV[2])
+return 1
+"""
+
+
+@dataclass
+class HoldResult:
+    ok: bool
+    missing: Optional[List[int]] = None  # pastry ids that do not exist
+    short: Optional[int] = None  # pastry id without enough free stock
+
+
+def _quantities(items: Iterable[dict]) -> Dict[int, int]:
+    quantities: Dict[int, int] = {}
+    for item in items:
+        quantities[item["pastry_id"]] = quantities.get(item["pastry_id"], 0) + item["quantity"]
+    return quantities
+
+
+async def _seed_levels(redis, db: Session, pastry_ids: List[int]) -> List[int]:
+    """
+    Caches the stock of the given pastries and returns the ids that do not exist.
+    Plain reads: no row locks are taken.
+    """
+    stocks = dict(db.query(Pastry.id, Pastry.stock).filter(Pastry.id.in_(pastry_ids)).all())
+    async with redis.pipeline(transaction=False) as pipe:
+        for pastry_id, stock in stocks.items():
+            pipe.set(level_key(pastry_id), int(stock), nx=True, ex=STOCK_LEVEL_TTL_SECONDS)
+        await pipe.execute()
+    return [pastry_id for pastry_id in pastry_ids if pastry_id not in stocks]
+
+
+def new_hold_id() -> str:
+    return f"new-{uuid.uuid4().hex}"
+
+
+async def hold_stock(redis, db: Session, hold_id: str, items: Iterable[dict], now: Optional[float] = None) -> HoldResult:
+    """
+    Atomically holds the quantities of an order, or holds nothing.
+    """
+    quantities = _quantities(items)
+    pastry_ids = list(quantities)
+    keys = [key for pastry_id in pastry_ids for key in (level_key(pastry_id), held_key(pastry_id))]
+    keys += [hold_key(hold_id), EXPIRY_KEY]
+    args = [hold_id, (now or time.time()) + STOCK_HOLD_SECONDS]
+    args += [value for pastry_id in pastry_ids for value in (pastry_id, quantities[pastry_id])]
+
+    reserve = redis.register_script(RESERVE_SCRIPT)
+    for attempt in range(RESERVE_ATTEMPTS):
+        outcome, *indexes = await reserve(keys=keys, args=args)
+        if outcome == 0:
+            return HoldResult(ok=True)
+        if outcome == 2:
+            return HoldResult(ok=False, short=pastry_ids[indexes[0] - 1])
+        if attempt == RESERVE_ATTEMPTS - 1:
+            break
+        missing = await _seed_levels(redis, db, [pastry_ids[i - 1] for i in indexes])
+        if missing:
+            return HoldResult(ok=False, missing=missing)
+    # Levels kept being invalidated between seeding and reserving; treat as contention
+    return HoldResult(ok=False, short=pastry_ids[indexes[0] - 1])
+
+
+async def attach_hold(redis, hold_id: str, order_id: int) -> bool:
+    """
+    Re-keys a hold placed before the order existed under the order's id.
+    """
+    attach = redis.register_script(ATTACH_SCRIPT)
+    keys = [hold_key(hold_id), hold_key(order_id), EXPIRY_KEY]
+    return bool(await attach(keys=keys, args=[hold_id, order_id]))
+
+
+async def release_hold(redis, hold_id) -> bool:
+    """
+    Gives the held quantities back, e.g. when an order is rejected.
+    """
+    release = redis.register_script(RELEASE_SCRIPT)
+    return bool(await release(keys=[hold_key(hold_id), EXPIRY_KEY], args=[hold_id]))
+
+
+async def commit_holds(redis, order_ids: Iterable[int], pastry_ids: Iterable[int]):
+    """
+    Called once accepted orders' stock has been decremented in the database:
+    their holds are dropped and the cached levels are refreshed.
+    """
+    # Levels first: until the holds are released free stock is underestimated, never overestimated
+    await invalidate_levels(redis, pastry_ids)
+    for order_id in order_ids:
+        await release_hold(redis, order_id)
+
+
+async def invalidate_levels(redis, pastry_ids: Iterable[int]):
+    keys = [level_key(pastry_id) for pastry_id in set(pastry_ids)]
+    if keys:
+        await redis.delete(*keys)
+
+
+async def invalidate_all_levels(redis):
+    async for key in redis.scan_iter(match="stock:level:*", count=1000):
+        await redis.delete(key)
+
+
+async def release_expired_holds(redis, now: Optional[float] = None, batch_size: int = EXPIRY_BATCH_SIZE) -> int:
+    expire = redis.register_script(EXPIRE_SCRIPT)
+    released = 0
+    while True:
+        count = await expire(keys=[EXPIRY_KEY], args=[now or time.time(), batch_size])
+        released += count
+        if count < batch_size:
+            return released
@@ -0,0 +1,51 @@
+import csv
+import enum
+import io
+import json
+from typing import Iterable, Iterator, List
+
+CHUNK_SIZE = 64 * 1024  # flush to the client roughly every 64KB
+
+
+class ExportFormat(enum.Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+
+def csv_chunks(rows: Iterable[dict], fieldnames: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(rows: Iterable[dict]) -> Iterator[str]:
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(json.dumps(row, default=str))
+        buffer.write("\n")
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_chunks(rows: Iterable[dict], fieldnames: List[str], export_format: ExportFormat) -> Iterator[str]:
+    """
+    Serializes rows lazily, so only one chunk is held in memory at a time.
+    """
+    if export_format == ExportFormat.CSV:
+        return csv_chunks(rows, fieldnames)
+    return ndjson_chunks(rows)
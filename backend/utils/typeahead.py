@@ -0,0 +1,87 @@
+import bisect
+import os
+import re
+import time
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.models.pastry import Pastry
+
+# Other workers pick up catalog changes after at most this many seconds
+TYPEAHEAD_REFRESH_SECONDS = float(os.getenv("TYPEAHEAD_REFRESH_SECONDS", 60))
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# Arabic code points commonly typed on Persian keyboards
+_ARABIC_TO_PERSIAN = str.maketrans({"ي": "ی", "ى": "ی", "ك": "ک"})
+
+
+def normalize(value: str) -> str:
+    return value.translate(_ARABIC_TO_PERSIAN).casefold()
+
+
+class TypeaheadIndex:
+    """
+    In-memory prefix index over the names of active pastries.
+
+    Every word of every name is kept in one sorted list, so a prefix lookup
+    is a binary search plus a short scan. The index is rebuilt lazily: right
+    after a catalog change in this worker (`invalidate`), or once it is
+    older than TYPEAHEAD_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self.terms: List[str] = []
+        self.term_ids: List[int] = []
+        self.entries = {}
+        self.built_at: Optional[float] = None
+
+    def invalidate(self):
+        self.built_at = None
+
+    def is_stale(self) -> bool:
+        return self.built_at is None or time.monotonic() - self.built_at > TYPEAHEAD_REFRESH_SECONDS
+
+    def build(self, db: Session):
+        rows = db.query(Pastry.id, Pastry.name, Pastry.image_url, Pastry.price).filter(Pastry.is_deleted == 0).all()
+        entries = {}
+        postings = []
+        for row in rows:
+            words = _WORD.findall(normalize(row.name or ""))
+            entries[row.id] = {"id": row.id, "name": row.name, "image_url": row.image_url, "price": row.price, "words": words}
+            postings.extend((word, row.id) for word in set(words))
+        postings.sort()
+        self.terms = [term for term, _ in postings]
+        self.term_ids = [pastry_id for _, pastry_id in postings]
+        self.entries = entries
+        self.built_at = time.monotonic()
+
+    def suggest(self, db: Session, q: str, limit: int) -> List[dict]:
+        if self.is_stale():
+            self.build(db)
+        tokens = _WORD.findall(normalize(q))
+        if not tokens:
+            return []
+
+        # Candidates come from the first token; every other token must
+        # prefix-match some word of the same name
+        first, rest = tokens[0], tokens[1:]
+        start = bisect.bisect_left(self.terms, first)
+        matches = []
+        seen = set()
+        for position in range(start, len(self.terms)):
+            if not self.terms[position].startswith(first):
+                break
+            pastry_id = self.term_ids[position]
+            if pastry_id in seen:
+                continue
+            seen.add(pastry_id)
+            entry = self.entries[pastry_id]
+            if all(any(word.startswith(token) for word in entry["words"]) for token in rest):
+                matches.append(entry)
+
+        matches.sort(key=lambda entry: (normalize(entry["name"]), entry["id"]))
+        return [{key: value for key, value in entry.items() if key != "words"} for entry in matches[:limit]]
+
+
+typeahead_index = TypeaheadIndex()
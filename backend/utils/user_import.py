@@ -0,0 +1,144 @@
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from pydantic import EmailStr, TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.core.security import hash_password
+from backend.database.database import dialect_insert
+from backend.models.user import User
+from backend.utils.catalog_io import ImportReport
+
+USER_IMPORT_FIELDS = ["email", "name", "password", "is_admin", "is_verified"]
+USER_IMPORT_BATCH_SIZE = 500
+TRUE_VALUES = {"1", "true", "yes", "y"}
+
+_email = TypeAdapter(EmailStr)
+
+
+@dataclass
+class UserImportReport(ImportReport):
+    skipped: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.updated + self.skipped + self.failed
+
+    @property
+    def rate(self) -> float:
+        return self.processed / self.elapsed if self.elapsed else 0.0
+
+
+def _flag(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def _clean_user(record) -> dict:
+    if isinstance(record, Exception):
+        raise ValueError(f"Invalid JSON: {record}")
+    if not isinstance(record, dict):
+        raise ValueError("Record must be an object")
+    missing = [name for name in ("email", "name", "password") if not record.get(name)]
+    if missing:
+        raise ValueError(f"Users need {', '.join(missing)}")
+    try:
+        email = _email.validate_python(str(record["email"]).strip())
+    except ValidationError:
+        raise ValueError(f"Invalid email {record['email']!r}") from None
+    return {
+        # Stored as registration stores it: EmailStr lowercases the domain only,
+        # and logins compare the address exactly
+        "email": email,
+        "name": str(record["name"]),
+        "password": str(record["password"]),
+        "is_admin": _flag(record.get("is_admin", False)),
+        "is_verified": _flag(record.get("is_verified", True)),
+    }
+
+
+def _flush(db: Session, executor: Executor, chunksize: int, batch: List[Tuple[int, dict]], report: UserImportReport, update_existing: bool):
+    # Duplicates within one batch would hit the same row twice in one statement
+    unique = {}
+    for line_number, values in batch:
+        if values["email"] in unique:
+            report.add_error(line_number, f"Duplicate email {values['email']}")
+        else:
+            unique[values["email"]] = values
+    existing = set(db.scalars(select(User.email).where(User.email.in_(unique))))
+    if not update_existing:
+        # Don't spend a bcrypt hash on rows that will be skipped
+        report.skipped += len(existing)
+        unique = {email: values for email, values in unique.items() if email not in existing}
+    if not unique:
+        return
+
+    rows = list(unique.values())
+    passwords = [values["password"] for values in rows]
+    for values, hashed in zip(rows, executor.map(hash_password, passwords, chunksize=chunksize)):
+        values["password"] = hashed
+
+    stmt = dialect_insert(db, User)
+    if update_existing:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[User.email],
+            set_={name: stmt.excluded[name] for name in ("name", "password", "is_admin", "is_verified")},
+        )
+    else:
+        # Rows created since the lookup above are skipped too
+        stmt = stmt.on_conflict_do_nothing(index_elements=[User.email])
+    db.execute(stmt, rows)
+    db.commit()
+    updated = len(existing & unique.keys())
+    report.updated += updated
+    report.created += len(rows) - updated
+
+
+def import_users(
+    db: Session,
+    records: Iterable[Tuple[int, object]],
+    workers: Optional[int] = None,
+    batch_size: int = USER_IMPORT_BATCH_SIZE,
+    update_existing: bool = False,
+    progress: Optional[Callable[[UserImportReport], None]] = None,
+) -> UserImportReport:
+    """
+    Creates users from parsed records in batches. Passwords are bcrypt-hashed
+    in a pool of `workers` processes (default: one per core). Each batch
+    is one INSERT ... ON CONFLICT (email). Existing users are skipped, or
+    have their name, password and flags replaced with `update_existing`.
+    `progress` is called with the running report after every batch.
+    """
+    workers = workers or os.cpu_count() or 1
+    # A few chunks per process keeps every core busy without a round trip per hash
+    chunksize = max(1, batch_size // (workers * 4))
+    report = UserImportReport()
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        _flush(db, executor, chunksize, batch, report, update_existing)
+        batch.clear()
+        report.elapsed = time.perf_counter() - started
+        if progress is not None:
+            progress(report)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for line_number, record in records:
+            try:
+                batch.append((line_number, _clean_user(record)))
+            except (TypeError, ValueError) as e:
+                report.add_error(line_number, str(e))
+                continue
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    report.elapsed = time.perf_counter() - started
+    return report
@@ -0,0 +1,57 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+
+import redis.asyncio as redis
+from dotenv import load_dotenv
+
+from backend.core.logging_config import setup_logging, stop_logging
+from backend.worker.queue import DEFAULT_QUEUE, requeue_dead
+from backend.worker.runner import Worker
+import backend.models.user  # noqa: F401  (registers the User mapper for Order.user)
+import backend.worker.tasks  # noqa: F401  (registers the tasks)
+
+# Runs background jobs from Redis.
+#
+#   python -m backend.worker --concurrency 8
+#   python -m backend.worker --requeue-dead
+
+logger = logging.getLogger("backend.worker")
+
+
+async def main(args):
+    redis_url = os.getenv("REDIS_URL")
+    if not redis_url:
+        raise SystemExit("REDIS_URL is not set")
+    client = redis.from_url(redis_url, encoding="utf-8", decode_responses=True)
+    try:
+        if args.requeue_dead:
+            moved = await requeue_dead(client, args.queue)
+            print(f"Requeued {moved} dead jobs.")
+            return
+
+        worker = Worker(client, args.queue, args.concurrency, args.poll_interval)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, worker.stop)
+        await worker.run()
+    finally:
+        await client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs from Redis")
+    parser.add_argument("--queue", default=os.getenv("WORKER_QUEUE", DEFAULT_QUEUE))
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("WORKER_CONCURRENCY", "4")))
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to block waiting for a job")
+    parser.add_argument("--requeue-dead", action="store_true", help="Move dead-letter jobs back onto the queue and exit")
+    args = parser.parse_args()
+
+    load_dotenv()
+    setup_logging()
+    try:
+        asyncio.run(main(args))
+    finally:
+        stop_logging()
@@ -0,0 +1,136 @@
+"""
+A small job queue on Redis.
+
+Keys for a queue named Q:
+    jobs:Q:ready           list of jobs waiting to run
+    jobs:Q:scheduled       sorted set of delayed jobs and retries, scored by due time
+    jobs:Q:processing:W    jobs worker W has taken and not finished yet
+    jobs:Q:dead            jobs that failed on every attempt
+
+Tasks are declared with @task and enqueued by name, so the API process only
+needs to import the module that declares them.
+"""
+import json
+import os
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_QUEUE = "default"
+DEFAULT_MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "5"))
+MAX_RETRY_DELAY_SECONDS = 3600
+DEAD_LETTER_LIMIT = 10_000
+
+# Redis client of the worker running the current job, for tasks that need Redis
+current_redis: ContextVar = ContextVar("current_redis", default=None)
+
+
+class QueueKeys:
+    def __init__(self, queue: str):
+        self.ready = f"jobs:{queue}:ready"
+        self.scheduled = f"jobs:{queue}:scheduled"
+        self.dead = f"jobs:{queue}:dead"
+        self.workers = f"jobs:{queue}:workers"
+        self.promote_lock = f"jobs:{queue}:promote-lock"
+        self._queue = queue
+
+    def processing(self, worker_id: str) -> str:
+        return f"jobs:{self._queue}:processing:{worker_id}"
+
+    def heartbeat(self, worker_id: str) -> str:
+        return f"jobs:{self._queue}:worker:{worker_id}"
+
+    def periodic(self, task_name: str) -> str:
+        return f"jobs:{self._queue}:periodic:{task_name}"
+
+
+@dataclass
+class Job:
+    task: str
+    args: List[Any] = field(default_factory=list)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    max_retries: int = DEFAULT_MAX_RETRIES
+    attempts: int = 0
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    enqueued_at: float = field(default_factory=time.time)
+    error: Optional[str] = None
+
+    def dumps(self) -> str:
+        return json.dumps(asdict(self), default=str)
+
+    @classmethod
+    def loads(cls, raw: str) -> "Job":
+        return cls(**json.loads(raw))
+
+    def retry_delay(self) -> float:
+        """
+        Exponential backoff: 5s, 10s, 20s, ... capped at an hour.
+        """
+        return min(RETRY_BACKOFF_SECONDS * 2 ** (self.attempts - 1), MAX_RETRY_DELAY_SECONDS)
+
+
+@dataclass
+class Task:
+    name: str
+    func: Callable
+    max_retries: int = DEFAULT_MAX_RETRIES
+    queue: str = DEFAULT_QUEUE
+    every: Optional[float] = None  # seconds between runs of a periodic task
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    async def enqueue(self, redis, *args, **kwargs) -> str:
+        return await enqueue(redis, self.name, args, kwargs)
+
+    async def enqueue_in(self, redis, seconds: float, *args, **kwargs) -> str:
+        return await enqueue(redis, self.name, args, kwargs, delay=seconds)
+
+
+registry: Dict[str, Task] = {}
+
+
+def task(name: Optional[str] = None, *, max_retries: int = DEFAULT_MAX_RETRIES, queue: str = DEFAULT_QUEUE, every: Optional[float] = None):
+    """
+    Declares a job function. It can be sync (run in a thread by the worker)
+    or async. With `every`, workers also enqueue it once per that many seconds.
+    """
+    def decorator(func: Callable) -> Task:
+        declared = Task(name or func.__name__, func, max_retries, queue, every)
+        registry[declared.name] = declared
+        return declared
+    return decorator
+
+
+async def enqueue(redis, task_name: str, args=(), kwargs=None, delay: Optional[float] = None, now: Optional[float] = None) -> str:
+    """
+    Adds a job for `task_name` and returns its id. With `delay` the job only
+    becomes ready that many seconds from now.
+    """
+    declared = registry.get(task_name)
+    if declared is None:
+        raise LookupError(f"Unknown task {task_name!r}")
+    job = Job(task=task_name, args=list(args), kwargs=dict(kwargs or {}), max_retries=declared.max_retries)
+    keys = QueueKeys(declared.queue)
+    if delay:
+        await redis.zadd(keys.scheduled, {job.dumps(): (now or time.time()) + delay})
+    else:
+        await redis.rpush(keys.ready, job.dumps())
+    return job.id
+
+
+async def requeue_dead(redis, queue: str = DEFAULT_QUEUE) -> int:
+    """
+    Moves every dead job back onto the ready list with a fresh retry budget.
+    """
+    keys = QueueKeys(queue)
+    moved = 0
+    while (raw := await redis.rpop(keys.dead)) is not None:
+        job = Job.loads(raw)
+        job.attempts, job.error = 0, None
+        await redis.rpush(keys.ready, job.dumps())
+        moved += 1
+    return moved
@@ -0,0 +1,179 @@
+import asyncio
+import inspect
+import logging
+import math
+import time
+import uuid
+from typing import Callable, Optional
+
+from backend.worker.queue import DEAD_LETTER_LIMIT, DEFAULT_QUEUE, Job, QueueKeys, current_redis, enqueue, registry
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL_SECONDS = 10
+HEARTBEAT_TTL_SECONDS = 3 * HEARTBEAT_INTERVAL_SECONDS
+PROMOTE_BATCH_SIZE = 100
+
+
+class Worker:
+    """
+    Runs jobs from one queue with `concurrency` consumers on a single event
+    loop. Sync tasks run in the default thread pool, async tasks on the loop.
+
+    A job stays on this worker's processing list while it runs, so if the
+    process dies the job is handed back to the queue by the next worker that
+    notices the missing heartbeat.
+    """
+
+    def __init__(self, redis, queue: str = DEFAULT_QUEUE, concurrency: int = 4, poll_interval: float = 1.0, clock: Callable[[], float] = time.time):
+        self.redis = redis
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.id = uuid.uuid4().hex[:12]
+        self.keys = QueueKeys(queue)
+        self.processing = self.keys.processing(self.id)
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        """
+        Stops taking new jobs; jobs already running are allowed to finish.
+        """
+        self._stopping.set()
+
+    async def run(self):
+        await self._heartbeat()
+        await self.recover_orphans()
+        housekeeping = asyncio.create_task(self._housekeeping())
+        logger.info("Worker started", extra={"worker_id": self.id, "queue": self.queue, "concurrency": self.concurrency})
+        try:
+            await asyncio.gather(*(self._consume() for _ in range(self.concurrency)))
+        finally:
+            housekeeping.cancel()
+            await self.redis.srem(self.keys.workers, self.id)
+            await self.redis.delete(self.keys.heartbeat(self.id))
+            logger.info("Worker stopped", extra={"worker_id": self.id})
+
+    async def run_until_idle(self) -> int:
+        """
+        Processes jobs until nothing is ready or due. Returns the number of
+        jobs processed. Used by tests and one-off runs.
+        """
+        processed = 0
+        while True:
+            await self.promote_due()
+            raw = await self.redis.lmove(self.keys.ready, self.processing, "LEFT", "RIGHT")
+            if raw is None:
+                return processed
+            await self.process(raw)
+            processed += 1
+
+    async def _consume(self):
+        while not self._stopping.is_set():
+            raw = await self.redis.blmove(self.keys.ready, self.processing, self.poll_interval, "LEFT", "RIGHT")
+            if raw is not None:
+                await self.process(raw)
+
+    async def _housekeeping(self):
+        last_heartbeat = 0.0
+        while True:
+            try:
+                if self.clock() - last_heartbeat >= HEARTBEAT_INTERVAL_SECONDS:
+                    await self._heartbeat()
+                    await self.recover_orphans()
+                    last_heartbeat = self.clock()
+                await self.promote_due()
+                await self.schedule_periodic()
+            except Exception:
+                logger.exception("Worker housekeeping failed")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _heartbeat(self):
+        await self.redis.sadd(self.keys.workers, self.id)
+        await self.redis.set(self.keys.heartbeat(self.id), self.clock(), ex=HEARTBEAT_TTL_SECONDS)
+
+    async def process(self, raw: str):
+        job = Job.loads(raw)
+        declared = registry.get(job.task)
+        job.attempts += 1
+        started = time.perf_counter()
+        try:
+            if declared is None:
+                raise LookupError(f"Unknown task {job.task!r}")
+            await self._call(declared.func, job)
+        except Exception as exc:
+            await self._fail(raw, job, exc, retryable=declared is not None)
+        else:
+            await self.redis.lrem(self.processing, 1, raw)
+            logger.info("Job finished", extra={"job_id": job.id, "task": job.task, "duration_ms": round((time.perf_counter() - started) * 1000, 2)})
+
+    async def _call(self, func: Callable, job: Job):
+        token = current_redis.set(self.redis)
+        try:
+            if inspect.iscoroutinefunction(func):
+                await func(*job.args, **job.kwargs)
+            else:
+                # to_thread copies the context, so current_redis is visible there too
+                await asyncio.to_thread(func, *job.args, **job.kwargs)
+        finally:
+            current_redis.reset(token)
+
+    async def _fail(self, raw: str, job: Job, exc: Exception, retryable: bool):
+        job.error = f"{type(exc).__name__}: {exc}"
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if retryable and job.attempts <= job.max_retries:
+                delay = job.retry_delay()
+                pipe.zadd(self.keys.scheduled, {job.dumps(): self.clock() + delay})
+                logger.warning("Job failed, retrying", extra={"job_id": job.id, "task": job.task, "attempt": job.attempts, "retry_in_s": delay, "error": job.error})
+            else:
+                pipe.lpush(self.keys.dead, job.dumps())
+                pipe.ltrim(self.keys.dead, 0, DEAD_LETTER_LIMIT - 1)
+                logger.error("Job moved to the dead-letter list", extra={"job_id": job.id, "task": job.task, "attempts": job.attempts, "error": job.error})
+            pipe.lrem(self.processing, 1, raw)
+            await pipe.execute()
+
+    async def promote_due(self, now: Optional[float] = None) -> int:
+        """
+        Moves scheduled jobs whose time has come onto the ready list. A short
+        lock keeps two workers from promoting the same job twice.
+        """
+        now = self.clock() if now is None else now
+        if not await self.redis.set(self.keys.promote_lock, self.id, nx=True, ex=5):
+            return 0
+        try:
+            due = await self.redis.zrangebyscore(self.keys.scheduled, "-inf", now, start=0, num=PROMOTE_BATCH_SIZE)
+            if due:
+                async with self.redis.pipeline(transaction=True) as pipe:
+                    pipe.rpush(self.keys.ready, *due)
+                    pipe.zrem(self.keys.scheduled, *due)
+                    await pipe.execute()
+            return len(due)
+        finally:
+            await self.redis.delete(self.keys.promote_lock)
+
+    async def schedule_periodic(self):
+        """
+        Enqueues each periodic task at most once per interval across all
+        workers: the first to set the interval key wins.
+        """
+        for declared in registry.values():
+            if declared.every and declared.queue == self.queue:
+                if await self.redis.set(self.keys.periodic(declared.name), self.id, nx=True, ex=math.ceil(declared.every)):
+                    await enqueue(self.redis, declared.name)
+
+    async def recover_orphans(self) -> int:
+        """
+        Returns jobs held by workers whose heartbeat expired to the ready list.
+        """
+        recovered = 0
+        for worker_id in await self.redis.smembers(self.keys.workers):
+            if worker_id == self.id or await self.redis.exists(self.keys.heartbeat(worker_id)):
+                continue
+            processing = self.keys.processing(worker_id)
+            while await self.redis.lmove(processing, self.keys.ready, "LEFT", "RIGHT") is not None:
+                recovered += 1
+            await self.redis.srem(self.keys.workers, worker_id)
+        if recovered:
+            logger.warning("Recovered jobs from dead workers", extra={"jobs": recovered})
+        return recovered
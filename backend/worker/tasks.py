@@ -0,0 +1,61 @@
+"""
+Background tasks. Import this module wherever tasks are enqueued so they are
+registered, and run them with `python -m backend.worker`.
+"""
+import asyncio
+import logging
+import os
+
+from backend.database.archive import archive_orders
+from backend.database.config import SessionLocal, engine
+from backend.database.partitioning import ensure_order_partitions
+from backend.utils.email_service import email_service
+from backend.utils.sales_report import build_sales_report
+from backend.utils.stock_holds import release_expired_holds
+from backend.worker.queue import current_redis, task
+
+logger = logging.getLogger(__name__)
+
+ORDER_ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ORDER_ARCHIVE_INTERVAL_SECONDS", str(24 * 3600)))
+STOCK_HOLD_REAP_INTERVAL_SECONDS = 60
+SALES_REPORT_INTERVAL_SECONDS = int(os.getenv("SALES_REPORT_INTERVAL_SECONDS", str(24 * 3600)))
+
+
+@task(max_retries=5)
+async def send_otp_email(email: str, expire: str):
+    # The code is read from otp:{email} rather than passed in, so it never sits
+    # in the queue, the dead-letter list or the job logs
+    otp = await current_redis.get().hget(f"otp:{email}", "code")
+    if otp is None:
+        logger.info("OTP expired before it was sent; skipping")
+        return
+    await asyncio.to_thread(email_service.send_otp_email, email, otp, expire)
+
+
+@task(every=ORDER_ARCHIVE_INTERVAL_SECONDS, max_retries=1)
+def archive_old_orders():
+    db = SessionLocal()
+    try:
+        moved = archive_orders(db)
+    finally:
+        db.close()
+    with engine.begin() as conn:
+        ensure_order_partitions(conn)
+    logger.info("Order archival finished", extra={"archived": moved})
+
+
+@task(every=SALES_REPORT_INTERVAL_SECONDS, max_retries=1)
+def update_sales_report():
+    db = SessionLocal()
+    try:
+        result = build_sales_report(db)
+    finally:
+        db.close()
+    logger.info("Sales report job finished", extra={"days": result.days, "orders": result.orders})
+
+
+@task(every=STOCK_HOLD_REAP_INTERVAL_SECONDS, max_retries=0)
+async def release_expired_stock_holds():
+    released = await release_expired_holds(current_redis.get())
+    if released:
+        logger.info("Expired stock holds released", extra={"holds": released})